@@ -0,0 +1,236 @@
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from cleaning_rules import complete_mask, google_place_id_mask, is_blank, text
+from provider_snapshot import load_providers
+
+# Single-pass data-quality audit.
+#
+# The provider file is loaded once and every check below is evaluated as a
+# column mask over it. The row-level results are written in the shape of
+# validation-report.json (see scripts/validate-and-clean-providers.ts); the
+# per-check counts and field completeness ride along under 'checks' and
+# 'completeness'. The report goes to its own file (audit-report.json) so the
+# committed validation-report.json is left to the TS validator.
+
+AUDIT_REPORT_PATH = 'audit-report.json'
+
+PHONE_PATTERN = r'^\d{7,15}$'
+EMAIL_PATTERN = r'^[^\s@]+@[^\s@]+\.[^\s@]+$'
+URL_PATTERN = r'^\s*(?i:https?)://[^\s/?#]+'
+PLACEHOLDER_NAME_PATTERN = r'^\s*\|\s*(?i:medical laboratory)\s*$'
+
+
+# Same heuristics as containsGibberish() in scripts/validate-and-clean-providers.ts
+def gibberish_mask(series):
+    values = text(series)
+    lengths = values.str.len()
+    special = values.str.count(r'[^a-zA-Z0-9\s.,\-]')
+    mask = values.str.contains(r'\S{100,}', regex=True) | ((lengths > 0) & (special / lengths.clip(lower=1) > 0.3))
+
+    # Mostly repeated words; only names of more than ten words can qualify
+    long_names = values.str.count(r'\s+') >= 10
+    if long_names.any():
+        words = values[long_names].str.lower().str.split(r'\s+', regex=True)
+        repeated = words.map(lambda w: len(w) > 10 and len(set(w)) / len(w) < 0.3)
+        mask |= repeated.reindex(values.index, fill_value=False).astype(bool)
+    return mask
+
+
+# Not missing and not just whitespace
+def _present(df, col):
+    return df[col].notna() & text(df[col]).str.contains(r'\S', regex=True)
+
+
+def _invalid(df, col, pattern):
+    return _present(df, col) & ~text(df[col]).str.contains(pattern, regex=True)
+
+
+def _invalid_phone(df):
+    digits = text(df['phone']).str.replace(r'[\s\-().+]', '', regex=True)
+    return _present(df, 'phone') & ~digits.str.match(PHONE_PATTERN)
+
+
+def _invalid_name(df):
+    return ~_present(df, 'name') | text(df['name']).str.match(PLACEHOLDER_NAME_PATTERN) | gibberish_mask(df['name'])
+
+
+def _no_location(df):
+    return ~(_present(df, 'street') | _present(df, 'city') | _present(df, 'state'))
+
+
+def _labelled(label, col):
+    return lambda df: label + text(df[col])
+
+
+# Declarative audit checks.
+#
+# Every check is (check, severity, when, message): `when(df)` returns the mask
+# of failing rows and `message` is either a constant or `message(df)`
+# returning a column. Rows with an 'error' are the ones validation would
+# remove; the rest of the row issues are warnings.
+AUDIT_CHECKS = [
+    ('invalid_name', 'error',
+        _invalid_name, 'Invalid or gibberish provider name'),
+    ('invalid_phone', 'warning',
+        _invalid_phone, _labelled('Invalid phone number: ', 'phone')),
+    ('invalid_email', 'warning',
+        lambda df: _invalid(df, 'email', EMAIL_PATTERN), _labelled('Invalid email: ', 'email')),
+    ('invalid_website', 'warning',
+        lambda df: _invalid(df, 'website', URL_PATTERN), _labelled('Invalid website URL: ', 'website')),
+    ('gibberish_name', 'error',
+        lambda df: gibberish_mask(df['name']), 'Provider name contains gibberish or excessive repetition'),
+    ('missing_location', 'warning',
+        _no_location, 'Missing location information'),
+    ('google_id_testimonials', 'warning',
+        lambda df: google_place_id_mask(df['testimonials']), 'Google Place ID in testimonials'),
+    ('google_id_insuranceAmount', 'warning',
+        lambda df: google_place_id_mask(df['insuranceAmount']), 'Google Place ID in insuranceAmount'),
+    ('google_id_bio', 'warning',
+        lambda df: google_place_id_mask(df['bio']), 'Google Place ID in bio'),
+    ('empty_languages', 'warning',
+        lambda df: is_blank(df['languages']), 'languages is empty'),
+    ('empty_emergencyAvailable', 'warning',
+        lambda df: is_blank(df['emergencyAvailable']), 'emergencyAvailable is empty'),
+    ('empty_weekendAvailable', 'warning',
+        lambda df: is_blank(df['weekendAvailable']), 'weekendAvailable is empty'),
+    ('invalid_logo_url', 'warning',
+        lambda df: _invalid(df, 'logo', URL_PATTERN), _labelled('Invalid logo URL: ', 'logo')),
+    ('invalid_profileImage_url', 'warning',
+        lambda df: _invalid(df, 'profileImage', URL_PATTERN), _labelled('Invalid profileImage URL: ', 'profileImage')),
+]
+
+# Fields whose fill rate is reported
+COMPLETENESS_COLUMNS = ['phone', 'email', 'website', 'bio', 'regions serviced', 'certifications', 'logo', 'profileImage']
+
+# Every column the audit reads
+AUDIT_COLUMNS = [
+    'name', 'street', 'city', 'state', 'website', 'phone', 'email', 'bio', 'testimonials', 'insuranceAmount',
+    'languages', 'emergencyAvailable', 'weekendAvailable', 'logo', 'profileImage', 'regions serviced', 'certifications',
+]
+
+
+# Evaluate every check and return (masks, messages): a rows x checks boolean
+# matrix and, per check, the constant or per-row message
+def evaluate_checks(df):
+    masks = np.zeros((len(df), len(AUDIT_CHECKS)), dtype=bool)
+    messages = []
+    for i, (_, _, when, message) in enumerate(AUDIT_CHECKS):
+        masks[:, i] = when(df).to_numpy(dtype=bool)
+        messages.append(message(df).to_numpy() if callable(message) and masks[:, i].any() else message)
+    return masks, messages
+
+
+def completeness(df):
+    total = len(df)
+    result = {}
+    for col in COMPLETENESS_COLUMNS:
+        count = int(_present(df, col).sum())
+        result[col] = {'count': count, 'percent': round(count / total * 100, 1) if total else 0.0}
+    count = int(complete_mask(df).sum())
+    result['critical_fields'] = {'count': count, 'percent': round(count / total * 100, 1) if total else 0.0}
+    return result
+
+
+# Build the report for `df`. Line numbers assume one CSV line per record
+# (header on line 1), as the TypeScript validator does.
+def audit(df):
+    df = df.reset_index(drop=True)
+    masks, messages = evaluate_checks(df)
+    severities = np.array([severity for _, severity, _, _ in AUDIT_CHECKS])
+    is_error = (masks & (severities == 'error')).any(axis=1)
+    names = text(df['name']).to_numpy()
+
+    errors, warnings, removed = [], [], []
+    for position in np.flatnonzero(masks.any(axis=1)):
+        failed = np.flatnonzero(masks[position])
+        issue = {
+            'lineNumber': int(position) + 2,
+            'provider': names[position],
+            'issues': [messages[i] if isinstance(messages[i], str) else messages[i][position] for i in failed],
+            'severity': 'error' if is_error[position] else 'warning',
+        }
+        if is_error[position]:
+            errors.append(issue)
+            removed.append(f"Line {issue['lineNumber']}: {issue['provider']}")
+        else:
+            warnings.append(issue)
+
+    now = datetime.now(timezone.utc)
+    return {
+        'timestamp': now.strftime('%Y-%m-%dT%H:%M:%S.') + f'{now.microsecond // 1000:03d}Z',
+        'totalProviders': len(df),
+        'validProviders': len(df) - len(removed),
+        'removedProviders': len(removed),
+        'issuesFound': len(errors) + len(warnings),
+        'errors': errors,
+        'warnings': warnings,
+        'removedProvidersList': removed,
+        'checks': {check: {'severity': severity, 'count': int(masks[:, i].sum())}
+                   for i, (check, severity, _, _) in enumerate(AUDIT_CHECKS)},
+        'completeness': completeness(df),
+    }
+
+
+def print_report(report, report_path, limit=20):
+    print("=" * 80)
+    print("DATA QUALITY AUDIT")
+    print("=" * 80)
+    print(f"Total providers analyzed: {report['totalProviders']}")
+    print(f"Valid providers: {report['validProviders']}")
+    print(f"Providers with errors: {report['removedProviders']}")
+    print(f"Total issues found: {report['issuesFound']}")
+    print(f"  - Errors: {len(report['errors'])}")
+    print(f"  - Warnings: {len(report['warnings'])}")
+
+    print("\n" + "=" * 80)
+    print("CHECKS")
+    print("=" * 80)
+    for check, result in report['checks'].items():
+        print(f"  {check:<28} {result['severity']:<8} {result['count']}")
+
+    print("\n" + "=" * 80)
+    print("FIELD COMPLETENESS")
+    print("=" * 80)
+    total = report['totalProviders']
+    for col, result in report['completeness'].items():
+        print(f"  {col:<28} {result['count']}/{total} ({result['percent']:.1f}%)")
+
+    issues = sorted(report['errors'] + report['warnings'], key=lambda issue: issue['lineNumber'])
+    if issues:
+        print("\n" + "=" * 80)
+        print("ISSUES FOUND")
+        print("=" * 80)
+        for issue in issues[:limit]:
+            print(f"\n[{issue['severity'].upper()}] Line {issue['lineNumber']}: {issue['provider'][:80]}")
+            for message in issue['issues']:
+                print(f"   - {message[:120]}")
+        if len(issues) > limit:
+            print(f"\n... and {len(issues) - limit} more issues")
+
+    print(f"\n[OK] Full report written to: {report_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Audit provider data quality in one pass')
+    parser.add_argument('--input', default='cleaned_providers.csv')
+    parser.add_argument('--report', default=AUDIT_REPORT_PATH)
+    parser.add_argument('--limit', type=int, default=20, help='Issues to print (default: 20)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = load_providers(args.input, AUDIT_COLUMNS)
+    report = audit(df)
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print_report(report, args.report, args.limit)
+    print(f"Audit time: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
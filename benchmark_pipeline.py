@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# Pipeline benchmarks on synthetic data.
+#
+# For each scale, a seeded synthetic batch is written to a scratch directory
+# and every stage runs there as its own process, exactly as it would from the
+# repo root. Wall time and the stage's peak RSS are appended to a JSON history
+# and compared against a stored baseline; a stage that got slower or bigger
+# than the allowed margin is reported as a regression.
+#
+# The peak RSS is measured by the stage process itself (STAGE_WRAPPER), from
+# /proc/self/status where available: ru_maxrss as seen by the parent starts at
+# the parent's own size when it forked, which would bury the stage's memory
+# under the harness's. The synthetic data is generated by a child process for
+# the same reason.
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_PATH = os.path.join('benchmarks', 'history.json')
+BASELINE_PATH = os.path.join('benchmarks', 'baseline.json')
+
+DEFAULT_SCALES = [10_000, 100_000, 1_000_000]
+
+# Site data the stages read, copied into the scratch directory
+SITE_DATA = ['data/cities-full.ts', 'data/top-metros.ts']
+
+# (stage, command, files to copy first as (source, destination)), run in order
+STAGES = [
+    ('clean', ['clean_and_export.py', '--input', 'synthetic.csv'], []),
+    ('clean_streaming', ['clean_and_export.py', '--input', 'synthetic.csv', '--chunksize', '50000'], []),
+    ('convert', ['convert_csv.py'], [('cleaned_providers.csv', 'enriched_mobile_phlebotomy_providers_updated.csv')]),
+    ('metro_counts', ['verify_metro_counts.py'], []),
+    ('audit', ['audit_providers.py', '--report', 'validation-report.json'], []),
+    ('dedupe', ['dedupe_providers.py'], []),
+]
+
+
+# Runs a stage script as __main__ with the remaining arguments and, on exit
+# (failures included), writes the process's own peak RSS in MB to the file
+# named by its first argument. VmHWM is reset by exec; ru_maxrss, the
+# fallback, is not on Linux. Only the standard library is imported here so
+# the wrapper adds nothing to the measured peak.
+STAGE_WRAPPER = '''
+import atexit, runpy, sys
+
+def report(path=sys.argv[1]):
+    peak = ''
+    try:
+        with open('/proc/self/status', 'r') as f:
+            peak = next(int(line.split()[1]) / 1024 for line in f if line.startswith('VmHWM:'))
+    except (OSError, StopIteration):
+        try:
+            import resource
+        except ImportError:
+            resource = None
+        if resource is not None:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            peak = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    with open(path, 'w') as f:
+        f.write(str(peak))
+
+atexit.register(report)
+sys.argv = sys.argv[2:]
+runpy.run_path(sys.argv[0], run_name='__main__')
+'''
+
+
+def python_process(script, args, workdir):
+    env = dict(os.environ, PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    return subprocess.run([sys.executable] + script + args, cwd=workdir, env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+
+# Run one stage as a child process; returns (seconds, peak RSS in MB or None
+# when the platform cannot tell, exit code)
+def run_stage(command, workdir):
+    fd, peak_path = tempfile.mkstemp(prefix='peak-', suffix='.txt', dir=workdir)
+    os.close(fd)
+    start = time.perf_counter()
+    process = python_process(['-c', STAGE_WRAPPER, peak_path, os.path.join(REPO_DIR, command[0])],
+                             command[1:], workdir)
+    seconds = time.perf_counter() - start
+    if process.returncode:
+        print(process.stderr.decode('utf-8', errors='replace').rstrip()[-2000:], file=sys.stderr)
+
+    with open(peak_path, 'r', encoding='utf-8') as f:
+        peak = f.read().strip()
+    os.remove(peak_path)
+    return seconds, float(peak) if peak else None, process.returncode
+
+
+def prepare_workdir(rows, seed):
+    workdir = tempfile.mkdtemp(prefix=f'provider-bench-{rows}-')
+    for path in SITE_DATA:
+        os.makedirs(os.path.join(workdir, os.path.dirname(path)), exist_ok=True)
+        shutil.copyfile(os.path.join(REPO_DIR, path), os.path.join(workdir, path))
+    os.makedirs(os.path.join(workdir, 'public', 'data'), exist_ok=True)
+    process = python_process([os.path.join(REPO_DIR, 'synthetic_providers.py')],
+                             [str(rows), '--output', 'synthetic.csv', '--seed', str(seed)], workdir)
+    if process.returncode:
+        raise RuntimeError(f"Generating {rows} synthetic providers failed:\n"
+                           f"{process.stderr.decode('utf-8', errors='replace').rstrip()[-2000:]}")
+    return workdir
+
+
+def run_benchmarks(scales, stages, seed, keep=False):
+    results = []
+    for rows in scales:
+        start = time.perf_counter()
+        workdir = prepare_workdir(rows, seed)
+        print(f"\n{rows:,} rows (generated in {time.perf_counter() - start:.1f}s, {workdir})")
+        try:
+            # Every later stage reads the cleaned output, so produce it untimed
+            # when the clean stage itself is not being measured
+            if 'clean' not in stages:
+                run_stage(STAGES[0][1], workdir)
+
+            for stage, command, copies in STAGES:
+                if stage not in stages:
+                    continue
+                for source, destination in copies:
+                    shutil.copyfile(os.path.join(workdir, source), os.path.join(workdir, destination))
+                seconds, peak, code = run_stage(command, workdir)
+                results.append({'stage': stage, 'rows': rows, 'seconds': round(seconds, 3),
+                                'peak_rss_mb': round(peak, 1) if peak is not None else None, 'ok': code == 0})
+                status = 'ok' if code == 0 else f'FAILED ({code})'
+                memory = f"{peak:8.1f} MB" if peak is not None else '       ? MB'
+                print(f"  {stage:<16} {seconds:8.2f}s  {memory}  {status}")
+        finally:
+            if not keep:
+                shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+
+
+def result_key(result):
+    return f"{result['stage']}@{result['rows']}"
+
+
+# Results that are slower or use more memory than the baseline allows
+def find_regressions(results, baseline, threshold):
+    regressions = []
+    for result in results:
+        expected = baseline.get(result_key(result))
+        if not expected or not result['ok']:
+            continue
+        for metric in ('seconds', 'peak_rss_mb'):
+            if result[metric] is None or expected.get(metric) is None:
+                continue
+            if result[metric] > expected[metric] * (1 + threshold):
+                regressions.append((result, metric, expected[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the provider pipeline on synthetic data')
+    parser.add_argument('--scales', default=','.join(str(rows) for rows in DEFAULT_SCALES),
+                        help='Comma-separated row counts (default: 10000,100000,1000000)')
+    parser.add_argument('--stages', default=','.join(stage for stage, _, _ in STAGES),
+                        help='Comma-separated stages to run (default: all)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--history', default=HISTORY_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed slowdown/growth over the baseline before flagging (default: 0.2 = 20%%)')
+    parser.add_argument('--keep', action='store_true', help='Keep the scratch directories')
+    args = parser.parse_args()
+
+    scales = [int(rows) for rows in args.scales.split(',') if rows]
+    stages = set(args.stages.split(','))
+    unknown = stages - {stage for stage, _, _ in STAGES}
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    print("=" * 80)
+    print("PIPELINE BENCHMARK")
+    print("=" * 80)
+    results = run_benchmarks(scales, stages, args.seed, args.keep)
+
+    history = load_json(args.history, [])
+    history.append({
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'seed': args.seed,
+        'results': results,
+    })
+    write_json(args.history, history)
+    print(f"\n[OK] Appended results to {args.history}")
+
+    baseline = load_json(args.baseline, {})
+    regressions = find_regressions(results, baseline, args.threshold)
+
+    if args.save_baseline:
+        baseline.update({result_key(result): {'seconds': result['seconds'], 'peak_rss_mb': result['peak_rss_mb']}
+                         for result in results if result['ok']})
+        write_json(args.baseline, baseline)
+        print(f"[OK] Saved baseline to {args.baseline}")
+    elif not baseline:
+        print(f"No baseline at {args.baseline} yet (store one with --save-baseline)")
+
+    failed = [result for result in results if not result['ok']]
+    for result in failed:
+        print(f"[FAILED] {result['stage']} at {result['rows']:,} rows")
+    for result, metric, expected in regressions:
+        print(f"[REGRESSION] {result['stage']} at {result['rows']:,} rows: "
+              f"{metric} {result[metric]} vs baseline {expected} (+{result[metric] / expected - 1:.0%})")
+    if not regressions and baseline and not args.save_baseline:
+        print("[OK] No regressions against the baseline")
+
+    sys.exit(1 if regressions or failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+import argparse
+import string
+import time
+
+import numpy as np
+import pandas as pd
+
+from cleaning_rules import BIO_TEMPLATE_SUFFIX, bio_template
+from dedupe_providers import Clusters
+from provider_snapshot import load_providers
+
+# Near-duplicate bios across the whole provider table.
+#
+# Each bio becomes a set of word shingles (runs of SHINGLE_SIZE words), with
+# the provider's own name, city and state replaced by placeholders so that
+# "{name} provides mobile phlebotomy services in {city}, {state}." bios all
+# read the same. Identical texts are collapsed first; every distinct text
+# then gets a MinHash signature, whose positions agree between two texts
+# about as often as their shingle sets overlap (Jaccard similarity).
+#
+# Signatures are cut into bands; texts with an identical band land in the
+# same bucket and are candidates. Small buckets are compared pairwise; in a
+# big one each member is compared with the bucket's first text only, so even
+# a bucket holding thousands of copies of one template costs one comparison
+# per member. Pairs whose estimated similarity reaches the threshold are
+# joined into clusters.
+#
+# With 16 bands of 4 rows, pairs at 0.8 similarity become candidates with
+# probability 0.9998 and pairs at 0.3 with probability 0.12.
+
+SHINGLE_SIZE = 3
+PERMUTATIONS = 64
+BANDS = 16
+MIN_SIMILARITY = 0.8
+
+# Buckets larger than this are compared against their first text only
+MAX_BUCKET_PAIRS = 32
+
+# Byte table keeping lowercase letters and digits and blanking everything else
+WORD_BYTES = bytes(byte if chr(byte) in string.ascii_lowercase + string.digits else 32 for byte in range(256))
+
+CLUSTER_COLUMNS = ['name', 'city', 'state', 'bio']
+
+# Odd multipliers mixing the words of a shingle, and the rows of a band
+_SHINGLE_MIX = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9,
+                         0xD6E8FEB86659FD93, 0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53], dtype=np.uint64)
+
+
+# Lowercased ASCII words separated by single spaces ('' for missing
+# values); each distinct value is normalized once
+def _words(series):
+    codes, values = pd.factorize(series.fillna('').astype(str))
+    words = np.array([' '.join(value.lower().encode('ascii', 'ignore').translate(WORD_BYTES).decode('ascii').split())
+                      for value in values], dtype=object)
+    return pd.Series(words[codes] if len(codes) else [], index=series.index, dtype=object)
+
+
+# Bios lowercased down to their words, with the provider's own name, city and
+# state swapped for placeholders (longest first, so a city named like the
+# state does not split it). The template's fixed wording is never masked: a
+# city named Mobile leaves "mobile phlebotomy" alone. Missing bios come out
+# as ''.
+def normalized_bios(df, mask_names=True):
+    bios = _words(df['bio'])
+    if not mask_names:
+        return bios
+    columns = [column for column in ('name', 'city', 'state') if column in df]
+    placeholders = [f' {column}placeholder ' for column in columns]
+    fixed = f" {_words(pd.Series([BIO_TEMPLATE_SUFFIX]))[0]} "
+    masked = []
+    for bio, *values in zip(bios.tolist(), *(_words(df[column]).tolist() for column in columns)):
+        if bio:
+            bio = f' {bio} '.replace(fixed, ' templateplaceholder ')
+            for value, placeholder in sorted(zip(values, placeholders), key=lambda item: -len(item[0])):
+                if value:
+                    bio = bio.replace(f' {value} ', placeholder)
+            bio = ' '.join(bio.replace(' templateplaceholder ', fixed).split())
+        masked.append(bio)
+    return pd.Series(masked, index=df.index)
+
+
+# Shingle hashes of every text, concatenated, with the start offset of each
+# text's run. Texts shorter than the shingle size get one shingle of all
+# their words.
+def shingle_hashes(texts, size=SHINGLE_SIZE):
+    vocabulary = {}
+    ids, lengths = [], []
+    for text in texts:
+        tokens = [vocabulary.setdefault(token, len(vocabulary) + 1) for token in text.split()]
+        ids.extend(tokens)
+        lengths.append(len(tokens))
+    ids = np.asarray(ids, dtype=np.uint64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    starts = np.cumsum(lengths) - lengths
+    ends = starts + lengths
+
+    counts = np.maximum(lengths - size + 1, 1)
+    text_of = np.repeat(np.arange(len(lengths)), counts)
+    positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + starts[text_of]
+
+    hashes = np.zeros(len(positions), dtype=np.uint64)
+    for offset in range(size):
+        index = positions + offset
+        inside = index < ends[text_of]
+        hashes ^= np.where(inside, ids[np.minimum(index, len(ids) - 1)], np.uint64(0)) * _SHINGLE_MIX[offset % len(_SHINGLE_MIX)]
+    return hashes, np.cumsum(counts) - counts
+
+
+# MinHash signatures (texts x permutations, uint32) using multiply-shift
+# hashing: h(x) = (a * x + b) >> 32 with random odd a
+def minhash_signatures(hashes, starts, permutations=PERMUTATIONS, seed=0):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, size=permutations, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=permutations, dtype=np.uint64)
+    signatures = np.empty((len(starts), permutations), dtype=np.uint32)
+    for i in range(permutations):
+        signatures[:, i] = np.minimum.reduceat((hashes * a[i] + b[i]) >> np.uint64(32), starts)
+    return signatures
+
+
+# Candidate pairs of text positions. Per band, texts with the same band
+# values share a bucket; buckets of up to MAX_BUCKET_PAIRS texts yield every
+# pair, bigger ones (copies of a template) pair each text with the first.
+def candidate_pairs(signatures, bands=BANDS):
+    rows = signatures.shape[1] // bands
+    pairs = []
+    for band in range(bands):
+        block = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+        keys = (block * _SHINGLE_MIX[:rows]).sum(axis=1)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        new_bucket = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+        bucket_starts = np.flatnonzero(new_bucket)
+        bucket = np.cumsum(new_bucket) - 1
+        sizes = np.diff(np.r_[bucket_starts, len(keys)])[bucket]
+        rank = np.arange(len(keys)) - bucket_starts[bucket]
+
+        # Big buckets: every member with the bucket's first text
+        star = (sizes > MAX_BUCKET_PAIRS) & (rank > 0)
+        pairs.append(np.stack([order[bucket_starts[bucket[star]]], order[star]], axis=1))
+
+        # Small buckets: each text with every later text of its bucket
+        later = np.where(sizes <= MAX_BUCKET_PAIRS, sizes - rank - 1, 0)
+        left = np.repeat(np.arange(len(keys)), later)
+        right = left + 1 + np.arange(later.sum()) - np.repeat(np.cumsum(later) - later, later)
+        pairs.append(np.stack([order[left], order[right]], axis=1))
+    pairs = np.concatenate(pairs)
+    return np.unique(np.sort(pairs, axis=1), axis=0)
+
+
+def estimated_similarity(signatures, left, right):
+    return (signatures[left] == signatures[right]).mean(axis=1)
+
+
+# Cluster the bios of `df`. Returns a frame aligned with `df` holding
+# cluster_id (the position of the first row carrying the cluster's
+# representative text; -1 for rows without a bio), cluster_size and
+# similarity (estimated Jaccard with the representative), plus stats.
+def find_bio_clusters(df, shingle_size=SHINGLE_SIZE, permutations=PERMUTATIONS, bands=BANDS,
+                      min_similarity=MIN_SIMILARITY, mask_names=True, seed=0):
+    if permutations % bands:
+        raise ValueError(f"{permutations} permutations cannot be split into {bands} bands")
+    texts = normalized_bios(df, mask_names).to_numpy()
+    has_bio = texts != ''
+    positions = np.flatnonzero(has_bio)
+    distinct, first, text_ids = np.unique(texts[has_bio], return_index=True, return_inverse=True)
+    stats = {'bios': len(positions), 'distinct': len(distinct), 'shingles': 0, 'candidates': 0, 'matched': 0}
+
+    labels = np.full(len(df), -1, dtype=np.int64)
+    score = np.full(len(df), np.nan)
+    if len(distinct):
+        hashes, starts = shingle_hashes(distinct, shingle_size)
+        signatures = minhash_signatures(hashes, starts, permutations, seed)
+        pairs = candidate_pairs(signatures, bands)
+        matched = pairs[estimated_similarity(signatures, pairs[:, 0], pairs[:, 1]) >= min_similarity]
+        stats.update(shingles=len(hashes), candidates=len(pairs), matched=len(matched))
+
+        # Clusters of distinct texts; rows with the same text share one
+        clusters = Clusters(len(distinct))
+        for left, right in matched:
+            clusters.union(left, right)
+        representative = clusters.labels()[text_ids]
+        labels[positions] = positions[first][representative]
+        score[positions] = estimated_similarity(signatures, text_ids, representative)
+
+    sizes = pd.Series(labels).map(pd.Series(labels[positions]).value_counts()).fillna(0).astype(int).to_numpy()
+    result = pd.DataFrame({'cluster_id': labels, 'cluster_size': sizes, 'similarity': score.round(3)},
+                          index=df.index)
+    return result, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find clusters of near-identical provider bios')
+    parser.add_argument('--input', default='cleaned_providers.csv')
+    parser.add_argument('--output', default='bio_clusters.csv',
+                        help='Where to write the rows of every cluster with more than one bio')
+    parser.add_argument('--min-similarity', type=float, default=MIN_SIMILARITY,
+                        help='Estimated Jaccard similarity needed to join two bios (default: 0.8)')
+    parser.add_argument('--shingle-size', type=int, default=SHINGLE_SIZE, help='Words per shingle (default: 3)')
+    parser.add_argument('--permutations', type=int, default=PERMUTATIONS, help='MinHash length (default: 64)')
+    parser.add_argument('--bands', type=int, default=BANDS, help='LSH bands (default: 16)')
+    parser.add_argument('--keep-names', action='store_true',
+                        help="Compare bios as written, without masking the provider's name, city and state")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    df = load_providers(args.input, CLUSTER_COLUMNS).reset_index(drop=True)
+    start = time.perf_counter()
+    clusters, stats = find_bio_clusters(df, args.shingle_size, args.permutations, args.bands,
+                                        args.min_similarity, not args.keep_names, args.seed)
+    elapsed = time.perf_counter() - start
+
+    report = pd.concat([clusters, df[CLUSTER_COLUMNS]], axis=1)
+    report.insert(3, 'template', df['bio'].fillna('').astype(str).str.strip() == bio_template(df))
+    report = report[report['cluster_size'] > 1].sort_values(['cluster_size', 'cluster_id', 'similarity'],
+                                                             ascending=[False, True, False])
+    report.to_csv(args.output, index=False, encoding='utf-8')
+
+    sizes = report.groupby('cluster_id')['cluster_size'].first().sort_values(ascending=False, kind='stable')
+
+    print("=" * 80)
+    print("NEAR-DUPLICATE BIOS")
+    print("=" * 80)
+    print(f"Providers: {len(df)} ({stats['bios']} with a bio, {stats['distinct']} distinct texts)")
+    print(f"Shingles: {stats['shingles']}, candidate pairs: {stats['candidates']} ({stats['matched']} matched)")
+    print(f"Clusters: {len(sizes)} covering {int(sizes.sum())} providers")
+    print(f"Time: {elapsed:.2f}s")
+
+    print("\nLargest clusters:")
+    for cluster_id, size in sizes.head(10).items():
+        members = report[report['cluster_id'] == cluster_id]
+        names = ' | '.join(str(name)[:30] for name in members['name'].head(3))
+        kind = 'template, ' if members['template'].any() else ''
+        print(f"  {cluster_id} ({size} providers, {kind}min similarity {members['similarity'].min():.2f}): {names}")
+        print(f"      {str(members['bio'].iloc[0])[:100]}")
+
+    print(f"\n[OK] Cluster members: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
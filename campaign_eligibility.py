@@ -0,0 +1,83 @@
+import argparse
+import os
+import time
+
+from field_normalizers import normalize_emails
+from provider_snapshot import load_providers
+from send_log import LEGACY_PATH, LOG_PATH, SendLog
+
+# Eligible recipients per campaign.
+#
+# A provider is eligible for a campaign when it has a valid email address
+# that the campaign has not been sent to (a failed send stays eligible).
+# Providers sharing an address are emailed once, under the first of them.
+# --exclude-campaign also drops every address an earlier campaign reached,
+# e.g. the previous waves of the same outreach.
+#
+# The sent sets come from the send log index (see send_log.py), so the join
+# is one isin() over the provider addresses per campaign. Sends the scripts
+# wrote to the legacy JSON log that are not imported yet are counted too
+# (with a warning), so a recent send never makes an address eligible again.
+
+OUTPUT_DIR = 'eligible_recipients'
+
+RECIPIENT_COLUMNS = ['email', 'name', 'city', 'state']
+
+
+# One row per valid, distinct provider address
+def provider_recipients(df):
+    emails, valid = normalize_emails(df['email'])
+    recipients = df.assign(email=emails)[valid]
+    return recipients.drop_duplicates('email')[RECIPIENT_COLUMNS].reset_index(drop=True)
+
+
+def eligible_recipients(recipients, log, campaign, exclude_campaigns=()):
+    excluded = log.sent_emails(campaign)
+    for other in exclude_campaigns:
+        excluded |= log.sent_emails(other)
+    return recipients[~recipients['email'].isin(excluded)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List the providers each campaign can still be sent to')
+    parser.add_argument('--input', default='cleaned_providers.csv')
+    parser.add_argument('--log', default=LOG_PATH)
+    parser.add_argument('--campaign', action='append', default=[],
+                        help='Campaign to list (repeatable; default: every campaign in the log)')
+    parser.add_argument('--exclude-campaign', action='append', default=[],
+                        help='Also drop addresses this campaign was sent to (repeatable)')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    log = SendLog.open(args.log)
+    log.save_index()
+    pending = log.pending_legacy(LEGACY_PATH)
+    log.merge(pending)
+    recipients = provider_recipients(load_providers(args.input, RECIPIENT_COLUMNS))
+    campaigns = args.campaign or sorted(log.campaigns)
+
+    start = time.perf_counter()
+    lists = {campaign: eligible_recipients(recipients, log, campaign, args.exclude_campaign) for campaign in campaigns}
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for campaign, eligible in lists.items():
+        eligible.to_csv(os.path.join(args.output_dir, f"{campaign}.csv"), index=False, encoding='utf-8')
+
+    print("=" * 80)
+    print("CAMPAIGN ELIGIBILITY")
+    print("=" * 80)
+    print(f"Provider addresses: {len(recipients)} ({log.entries} sends logged)")
+    if pending:
+        print(f"[WARNING] {len(pending)} sends in {LEGACY_PATH} are not in {args.log} yet; they are counted here. "
+              f"Record them with: python send_log.py --import-legacy")
+    if args.exclude_campaign:
+        print(f"Also excluding recipients of: {', '.join(args.exclude_campaign)}")
+    for campaign, eligible in lists.items():
+        print(f"  {campaign:<44} {len(eligible):>6} eligible")
+    print(f"\nJoined {len(campaigns)} campaigns in {elapsed * 1000:.1f} ms")
+    print(f"[OK] Lists written to {args.output_dir}/")
+
+
+if __name__ == '__main__':
+    main()
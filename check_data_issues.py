@@ -1,7 +1,7 @@
-import pandas as pd
+from provider_snapshot import load_providers
 
-# Load the cleaned data
-df = pd.read_csv('cleaned_providers.csv')
+# Load the cleaned data (only the columns checked below)
+df = load_providers('cleaned_providers.csv', ['name', 'zipCodes', 'businessImages', 'profileImage', 'logo'])
 
 print("=" * 80)
 print("CHECKING ZIP CODES ISSUE")
@@ -0,0 +1,471 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import re
+import ssl
+import struct
+import time
+from urllib.parse import urljoin, urlsplit
+
+from provider_shards import write_atomic
+from provider_snapshot import load_providers
+
+# Live check of every provider image URL (logo, profileImage and each entry
+# of businessImages).
+#
+# Each URL gets one ranged GET for its first SNIFF_BYTES, which yields the
+# status, content type, full size (from Content-Range, or Content-Length
+# when the server ignores the range) and the image dimensions from the file
+# header. --no-dimensions sends HEAD requests instead. Redirects are
+# followed.
+#
+# Requests go through a small asyncio HTTP/1.1 client with a keep-alive
+# connection pool: at most --concurrency requests in flight overall and
+# --per-host against any one host, so CDNs hosting hundreds of logos are
+# not hammered. Results are cached in <input>.image-cache.json; a rerun
+# only requests URLs whose result is older than --ttl-hours.
+
+IMAGE_COLUMNS = ['logo', 'profileImage', 'businessImages']
+
+SNIFF_BYTES = 64 * 1024
+MAX_REDIRECTS = 5
+USER_AGENT = 'mobilephlebotomy-image-check/1.0'
+
+# Thresholds for reporting an image as slow or heavy
+SLOW_MS = 2000
+LARGE_BYTES = 1024 * 1024
+
+DEFAULT_TTL_HOURS = 24 * 7
+
+# businessImages joins URLs with commas, and URLs may contain commas
+# themselves (w_608,h_408), so split only where a new URL starts
+IMAGE_URL_SEPARATOR = re.compile(r',\s*(?=(?:https?:|data:))', re.IGNORECASE)
+
+
+def split_image_urls(value):
+    if not isinstance(value, str):
+        return []
+    return [url.strip() for url in IMAGE_URL_SEPARATOR.split(value) if url.strip()]
+
+
+# (row label, column, url) for every image URL of every provider
+def provider_image_urls(df):
+    entries = []
+    for column in IMAGE_COLUMNS:
+        if column not in df:
+            continue
+        for label, value in df[column].dropna().items():
+            entries.extend((label, column, url) for url in split_image_urls(value))
+    return entries
+
+
+def cache_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.image-cache.json'
+
+
+# --- Image headers ---------------------------------------------------------
+
+SVG_LENGTH = re.compile(rb'<svg\b[^>]*?\b(width|height)\s*=\s*["\']\s*([\d.]+)(?:px)?\s*["\']', re.IGNORECASE)
+SVG_VIEWBOX = re.compile(rb'<svg\b[^>]*?\bviewBox\s*=\s*["\']\s*[-\d.]+[\s,]+[-\d.]+[\s,]+([\d.]+)[\s,]+([\d.]+)',
+                         re.IGNORECASE)
+JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _jpeg_size(data):
+    position = 2
+    while position + 9 < len(data):
+        if data[position] != 0xFF:
+            return None
+        marker = data[position + 1]
+        if marker == 0xFF:
+            position += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            position += 2
+            continue
+        length = struct.unpack('>H', data[position + 2:position + 4])[0]
+        if marker in JPEG_SOF:
+            height, width = struct.unpack('>HH', data[position + 5:position + 9])
+            return width, height
+        position += 2 + length
+    return None
+
+
+def _svg_size(data):
+    lengths = {name.lower(): float(value) for name, value in SVG_LENGTH.findall(data[:4096])}
+    if b'width' in lengths and b'height' in lengths:
+        return round(lengths[b'width']), round(lengths[b'height'])
+    viewbox = SVG_VIEWBOX.search(data[:4096])
+    if viewbox:
+        return round(float(viewbox.group(1))), round(float(viewbox.group(2)))
+    return None
+
+
+# (width, height) from the first bytes of an image, or None when the format
+# is unknown or the header is cut off
+def image_size(data):
+    if data.startswith(b'\x89PNG\r\n\x1a\n') and len(data) >= 24:
+        return struct.unpack('>II', data[16:24])
+    if data[:6] in (b'GIF87a', b'GIF89a') and len(data) >= 10:
+        return struct.unpack('<HH', data[6:10])
+    if data.startswith(b'\xff\xd8'):
+        return _jpeg_size(data)
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP' and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', data[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            bits = int.from_bytes(data[21:25], 'little')
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b'VP8X':
+            return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+    if data[:2] == b'BM' and len(data) >= 26:
+        width, height = struct.unpack('<ii', data[18:26])
+        return width, abs(height)
+    if data[4:8] == b'ftyp' and data[8:12] in (b'avif', b'avis', b'heic', b'heix', b'mif1'):
+        spatial_extents = data.find(b'ispe')
+        if spatial_extents != -1 and len(data) >= spatial_extents + 16:
+            return struct.unpack('>II', data[spatial_extents + 8:spatial_extents + 16])
+    head = data[:4096].lstrip().lower()
+    if head.startswith(b'<?xml') or head.startswith(b'<svg') or b'<svg' in head:
+        return _svg_size(data)
+    return None
+
+
+# --- HTTP client -----------------------------------------------------------
+
+class HTTPError(Exception):
+    pass
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+class Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.reused = False
+
+    def close(self):
+        self.writer.close()
+
+
+# Keep-alive connections by (scheme, host, port), with a global and a
+# per-host limit on requests in flight
+class ConnectionPool:
+    def __init__(self, concurrency, per_host):
+        self.slots = asyncio.Semaphore(concurrency)
+        self.per_host = per_host
+        self.host_slots = {}
+        self.idle = {}
+        self.ssl_context = ssl.create_default_context()
+
+    def host_slot(self, key):
+        if key not in self.host_slots:
+            self.host_slots[key] = asyncio.Semaphore(self.per_host)
+        return self.host_slots[key]
+
+    async def connect(self, key):
+        idle = self.idle.get(key)
+        while idle:
+            connection = idle.pop()
+            if not connection.reader.at_eof():
+                connection.reused = True
+                return connection
+            connection.close()
+        scheme, host, port = key
+        reader, writer = await asyncio.open_connection(
+            host, port, ssl=self.ssl_context if scheme == 'https' else None,
+            server_hostname=host if scheme == 'https' else None)
+        return Connection(reader, writer)
+
+    def release(self, key, connection, reusable):
+        if reusable:
+            connection.reused = False
+            self.idle.setdefault(key, []).append(connection)
+        else:
+            connection.close()
+
+    def close(self):
+        for connections in self.idle.values():
+            for connection in connections:
+                connection.close()
+        self.idle = {}
+
+
+async def _read_headers(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError('connection closed before the response')
+    parts = status_line.decode('latin-1').split(None, 2)
+    if len(parts) < 2 or not parts[0].startswith('HTTP/') or not parts[1].isdigit():
+        raise HTTPError(f'bad status line: {status_line[:80]!r}')
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return parts[0], int(parts[1]), headers
+
+
+# Read at most `limit` body bytes; returns (body, whether the whole body was
+# consumed, so the connection can be reused)
+async def _read_body(reader, headers, limit):
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        body = b''
+        while True:
+            size = int((await reader.readline()).split(b';')[0].strip() or b'0', 16)
+            if size == 0:
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return body, True
+            if len(body) + size > limit:
+                body += await reader.readexactly(limit - len(body))
+                return body, False
+            body += await reader.readexactly(size)
+            await reader.readline()
+    if 'content-length' in headers:
+        length = int(headers['content-length'])
+        body = await reader.readexactly(min(length, limit))
+        return body, length <= limit
+    body = b''
+    while len(body) < limit:
+        data = await reader.read(limit - len(body))
+        if not data:
+            break
+        body += data
+    return body, False
+
+
+# Time spent on requests while holding a pool slot, so waiting in the
+# --per-host queue is never counted as the server being slow
+class RequestTimer:
+    def __init__(self):
+        self.seconds = 0.0
+
+
+# One request/response exchange on a pooled connection. A pooled connection
+# the server already dropped gets one retry on a fresh connection.
+async def _exchange(pool, key, method, request, limit):
+    for attempt in range(2):
+        connection = await pool.connect(key)
+        reusable = False
+        try:
+            connection.writer.write(request)
+            await connection.writer.drain()
+            version, status, headers = await _read_headers(connection.reader)
+            if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+                body, complete = b'', True
+            else:
+                body, complete = await _read_body(connection.reader, headers, limit)
+            reusable = (complete and version == 'HTTP/1.1' and
+                        headers.get('connection', '').lower() != 'close')
+            return Response(status, headers, body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            if not connection.reused or attempt:
+                raise
+        finally:
+            pool.release(key, connection, reusable)
+
+
+# Request `url` once a per-host and then a global slot are free; `timeout`
+# (and `timer`) start only then. Taking the host slot first means requests
+# queued behind a busy host never hold global slots other hosts could use.
+async def http_request(pool, method, url, timeout, timer=None, limit=SNIFF_BYTES):
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    key = (parts.scheme, parts.hostname, port)
+    target = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    host = parts.hostname if parts.port is None else f'{parts.hostname}:{parts.port}'
+    request = (f'{method} {target} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: {USER_AGENT}\r\n'
+               f'Accept: image/*,*/*;q=0.8\r\n')
+    if method == 'GET':
+        request += f'Range: bytes=0-{limit - 1}\r\n'
+    request = (request + '\r\n').encode('latin-1')
+
+    async with pool.host_slot(key), pool.slots:
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(_exchange(pool, key, method, request, limit), timeout)
+        finally:
+            if timer is not None:
+                timer.seconds += time.perf_counter() - start
+
+
+# --- Checks ----------------------------------------------------------------
+
+def _total_size(response):
+    content_range = response.headers.get('content-range', '')
+    if '/' in content_range and content_range.rsplit('/', 1)[1].strip().isdigit():
+        return int(content_range.rsplit('/', 1)[1])
+    if response.status == 200 and response.headers.get('content-length', '').isdigit():
+        return int(response.headers['content-length'])
+    return None
+
+
+# The problem worth reporting for a result, or None when the image is fine
+def problem(result):
+    if result['error']:
+        return 'unreachable'
+    if result['status'] >= 400:
+        return 'broken'
+    content_type = result['contentType'] or ''
+    if not content_type.startswith('image/'):
+        return 'not_image'
+    if result['elapsedMs'] > SLOW_MS:
+        return 'slow'
+    if result['bytes'] and result['bytes'] > LARGE_BYTES:
+        return 'large'
+    return None
+
+
+async def check_url(pool, url, timeout, dimensions=True):
+    result = {'url': url, 'status': None, 'contentType': None, 'bytes': None, 'width': None, 'height': None,
+              'finalUrl': url, 'elapsedMs': None, 'error': None, 'checkedAt': time.time()}
+    timer = RequestTimer()
+    try:
+        if urlsplit(url).scheme not in ('http', 'https'):
+            raise HTTPError(f'unsupported URL scheme: {url[:40]}')
+        method = 'GET' if dimensions else 'HEAD'
+        current = url
+        for _ in range(MAX_REDIRECTS + 1):
+            response = await http_request(pool, method, current, timeout, timer)
+            location = response.headers.get('location')
+            if response.status not in (301, 302, 303, 307, 308) or not location:
+                break
+            current = urljoin(current, location)
+        else:
+            raise HTTPError('too many redirects')
+
+        result['status'] = response.status
+        result['finalUrl'] = current
+        result['contentType'] = response.headers.get('content-type', '').split(';')[0].strip().lower() or None
+        result['bytes'] = _total_size(response)
+        size = image_size(response.body) if response.body else None
+        if size:
+            result['width'], result['height'] = int(size[0]), int(size[1])
+    except asyncio.TimeoutError:
+        result['error'] = f'timed out after {timeout}s'
+    except (OSError, HTTPError, ValueError, asyncio.IncompleteReadError) as error:
+        result['error'] = str(error) or type(error).__name__
+    result['elapsedMs'] = round(timer.seconds * 1000, 1)
+    result['problem'] = problem(result)
+    return result
+
+
+# Check every URL; returns {url: result}. `progress(done, total)` is called
+# as results come in.
+async def check_urls(urls, concurrency=64, per_host=6, timeout=10.0, dimensions=True, progress=None):
+    pool = ConnectionPool(concurrency, per_host)
+    results = {}
+    try:
+        tasks = [asyncio.ensure_future(check_url(pool, url, timeout, dimensions)) for url in urls]
+        for task in asyncio.as_completed(tasks):
+            result = await task
+            results[result['url']] = result
+            if progress:
+                progress(len(results), len(tasks))
+    finally:
+        pool.close()
+    return results
+
+
+class ImageCache:
+    def __init__(self, path):
+        self.path = path
+        self.results = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.results = json.load(f)
+
+    def stale(self, urls, ttl_hours, now=None):
+        cutoff = (now or time.time()) - ttl_hours * 3600
+        return [url for url in urls if url not in self.results or self.results[url]['checkedAt'] < cutoff]
+
+    def update(self, results):
+        self.results.update(results)
+
+    def save(self):
+        write_atomic(self.path, json.dumps(self.results, indent=1, sort_keys=True).encode('utf-8'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that provider image URLs load and are real images')
+    parser.add_argument('--input', default='cleaned_providers.csv')
+    parser.add_argument('--cache', help='Result cache (default: <input>.image-cache.json)')
+    parser.add_argument('--ttl-hours', type=float, default=DEFAULT_TTL_HOURS,
+                        help='Recheck URLs whose cached result is older than this (default: one week)')
+    parser.add_argument('--concurrency', type=int, default=64, help='Requests in flight overall (default: 64)')
+    parser.add_argument('--per-host', type=int, default=6, help='Requests in flight per host (default: 6)')
+    parser.add_argument('--timeout', type=float, default=10.0,
+                        help='Seconds per request, not counting time queued for a free slot (default: 10)')
+    parser.add_argument('--no-dimensions', action='store_true',
+                        help='Send HEAD requests only (no image dimensions)')
+    parser.add_argument('--report', help='Write one CSV row per provider image with a problem')
+    args = parser.parse_args()
+
+    df = load_providers(args.input, ['name'] + IMAGE_COLUMNS)
+    entries = provider_image_urls(df)
+    urls = list(dict.fromkeys(url for _, _, url in entries if not url.lower().startswith('data:')))
+    inline = sum(1 for _, _, url in entries if url.lower().startswith('data:'))
+
+    cache = ImageCache(args.cache or cache_path(args.input))
+    stale = cache.stale(urls, args.ttl_hours)
+    print(f"{len(entries)} image URLs on {len(df)} providers: {len(urls)} distinct, {inline} inline data: URLs")
+    print(f"Checking {len(stale)} URLs ({len(urls) - len(stale)} cached results are fresh)")
+
+    def progress(done, total):
+        if done % 500 == 0 or done == total:
+            print(f"  ... {done}/{total}")
+
+    start = time.perf_counter()
+    results = asyncio.run(check_urls(stale, args.concurrency, args.per_host, args.timeout,
+                                     not args.no_dimensions, progress))
+    elapsed = time.perf_counter() - start
+    if stale:
+        print(f"Checked {len(stale)} URLs in {elapsed:.1f}s ({len(stale) / elapsed * 60:.0f}/min)")
+    cache.update(results)
+    cache.save()
+
+    problems = {}
+    rows = []
+    for label, column, url in entries:
+        result = cache.results.get(url)
+        if result is None or not result['problem']:
+            continue
+        problems[result['problem']] = problems.get(result['problem'], 0) + 1
+        rows.append({'name': df.at[label, 'name'], 'column': column, 'url': url, 'problem': result['problem'],
+                     'status': result['status'], 'contentType': result['contentType'], 'bytes': result['bytes'],
+                     'elapsedMs': result['elapsedMs'], 'error': result['error']})
+
+    print("\n" + "=" * 80)
+    print("IMAGE URL CHECK")
+    print("=" * 80)
+    print(f"Provider images OK: {len(entries) - inline - len(rows)}/{len(entries) - inline}")
+    for name, count in sorted(problems.items(), key=lambda item: -item[1]):
+        print(f"  - {name}: {count}")
+    for row in rows[:10]:
+        detail = row['error'] or f"HTTP {row['status']} {row['contentType'] or ''}".strip()
+        print(f"  {row['problem']:<12} {str(row['name'])[:30]:<30} {row['column']:<15} {detail[:60]}")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['name', 'column', 'url', 'problem', 'status', 'contentType',
+                                                   'bytes', 'elapsedMs', 'error'])
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"\n[OK] Wrote {len(rows)} problem images to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
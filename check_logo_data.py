@@ -1,7 +1,7 @@
-import pandas as pd
+from provider_snapshot import load_providers
 
-# Load the cleaned data
-df = pd.read_csv('cleaned_providers.csv')
+# Load the cleaned data (only the columns checked below)
+df = load_providers('cleaned_providers.csv', ['name', 'logo', 'profileImage'])
 
 print("=" * 80)
 print("LOGO DATA ANALYSIS")
@@ -44,21 +44,10 @@ print("URL VALIDATION CHECK")
 print("=" * 80)
 
 # Check URL formats
-valid_logo_urls = 0
-valid_profile_urls = 0
-
-for idx, row in df.iterrows():
-    # Check logo URLs
-    if pd.notna(row['logo']):
-        logo_str = str(row['logo'])
-        if logo_str.startswith('http://') or logo_str.startswith('https://'):
-            valid_logo_urls += 1
-
-    # Check profile image URLs
-    if pd.notna(row['profileImage']):
-        profile_str = str(row['profileImage'])
-        if profile_str.startswith('http://') or profile_str.startswith('https://'):
-            valid_profile_urls += 1
+logo_valid = df['logo'].astype(str).str.startswith(('http://', 'https://')) & df['logo'].notna()
+profile_valid = df['profileImage'].astype(str).str.startswith(('http://', 'https://')) & df['profileImage'].notna()
+valid_logo_urls = int(logo_valid.sum())
+valid_profile_urls = int(profile_valid.sum())
 
 print(f"Valid logo URLs (http/https): {valid_logo_urls}/{logo_count}")
 print(f"Valid profile URLs (http/https): {valid_profile_urls}/{profile_count}")
@@ -68,16 +57,11 @@ print("\n" + "=" * 80)
 print("INVALID URL EXAMPLES")
 print("=" * 80)
 
-invalid_count = 0
-for idx, row in df.iterrows():
-    if invalid_count >= 5:
-        break
-
-    if pd.notna(row['logo']):
-        logo_str = str(row['logo'])
-        if not (logo_str.startswith('http://') or logo_str.startswith('https://')):
-            print(f"Invalid logo: {row['name'][:30]} -> {logo_str}")
-            invalid_count += 1
+invalid_logos = df[df['logo'].notna() & ~logo_valid].head(5)
+invalid_count = len(invalid_logos)
+for name, logo in zip(invalid_logos['name'], invalid_logos['logo']):
+    print(f"Invalid logo: {name[:30]} -> {logo}")
 
 if invalid_count == 0:
-    print("No invalid logo URLs found in sample")
\ No newline at end of file
+    print("No invalid logo URLs found in sample")
+print("\nThis only checks URL formats; run check_image_urls.py to request every image")
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+
+from field_normalizers import EMAIL_PATTERN
+from pipeline_trace import NULL_TRACE
+
+# Shared patterns
+GOOGLE_PLACE_ID_PATTERN = r'ChI[a-zA-Z0-9_-]+'
+
+BIO_TEMPLATE_SUFFIX = ' provides mobile phlebotomy services in '
+
+
+# Column as plain strings, with missing values turned into ''
+def text(series):
+    return series.fillna('').astype(str)
+
+
+# Column formatted the way an f-string would format each value (NaN -> 'nan')
+def formatted(series):
+    return series.fillna('nan').astype(str)
+
+
+# Missing, empty or the literal string 'nan' (any case)
+def is_blank(series):
+    values = text(series)
+    return series.isna() | (values == '') | (values.str.lower() == 'nan')
+
+
+# Missing or empty (the definition used for critical fields)
+def is_missing(series):
+    return series.isna() | (text(series) == '')
+
+
+# Addresses valid exactly as written: surrounding whitespace makes one
+# invalid (and cleared), as it always has
+def valid_email_mask(series):
+    return series.notna() & text(series).str.match(EMAIL_PATTERN)
+
+
+def google_place_id_mask(series):
+    return series.notna() & text(series).str.contains(GOOGLE_PLACE_ID_PATTERN, regex=True)
+
+
+def bio_template(df):
+    return formatted(df['name']) + BIO_TEMPLATE_SUFFIX + formatted(df['city']) + ', ' + formatted(df['state']) + '.'
+
+
+def _has_location(df):
+    return df['city'].notna() & df['state'].notna()
+
+
+def _stripped_bio(df):
+    bio = text(df['bio'])
+    return bio.where(~bio.str.endswith('*'), bio.str.rstrip('*'))
+
+
+def _bio_is_only_location(df):
+    bio = _stripped_bio(df)
+    city = formatted(df['city'])
+    state = formatted(df['state'])
+    only_location = (bio == state) | (bio == city) | (bio == state + '*') | (bio == city + '*')
+    return ~is_blank(df['bio']) & _has_location(df) & only_location
+
+
+# Declarative cleaning rules.
+#
+# Every rule is (stat, column, when, value): `when(df)` returns the mask of rows
+# the rule applies to and `value` is either a constant or `value(df)` returning a
+# column. Masks and values are computed from the *input* frame, then applied in
+# table order, so a later rule on the same column overrides an earlier one for
+# the rows both match (e.g. a bio that is stripped of its asterisk and then
+# expanded from the template).
+CLEANING_RULES = [
+    ('emails_cleaned', 'email',
+        lambda df: ~valid_email_mask(df['email']), ''),
+    ('languages_set', 'languages',
+        lambda df: is_blank(df['languages']), 'English'),
+    ('testimonials_cleaned', 'testimonials',
+        lambda df: google_place_id_mask(df['testimonials']), np.nan),
+    ('insuranceAmount_cleaned', 'insuranceAmount',
+        lambda df: google_place_id_mask(df['insuranceAmount']), 'Licensed and Insured'),
+    ('bio_created', 'bio',
+        lambda df: is_blank(df['bio']) & df['name'].notna() & _has_location(df), bio_template),
+    ('bio_asterisk_removed', 'bio',
+        lambda df: ~is_blank(df['bio']) & text(df['bio']).str.endswith('*'), _stripped_bio),
+    ('bio_expanded', 'bio',
+        _bio_is_only_location, bio_template),
+    ('certifications_set', 'certifications',
+        lambda df: is_blank(df['certifications']), 'ASCP Certified'),
+    ('emergencyAvailable_set', 'emergencyAvailable',
+        lambda df: is_blank(df['emergencyAvailable']), 'No'),
+    ('weekendAvailable_set', 'weekendAvailable',
+        lambda df: is_blank(df['weekendAvailable']), 'Yes'),
+    ('regions_serviced_set', 'regions serviced',
+        lambda df: is_blank(df['regions serviced']) & _has_location(df),
+        lambda df: formatted(df['city']) + ', ' + formatted(df['state']) + ' area'),
+]
+
+CRITICAL_FIELDS = ['name', 'phone', 'city', 'state']
+
+
+def empty_cleaning_stats():
+    stats = {stat: 0 for stat, _, _, _ in CLEANING_RULES}
+    for field in CRITICAL_FIELDS:
+        stats[f'critical_missing_{field}'] = 0
+    return stats
+
+
+# Apply every cleaning rule to `df` in place and return the cleaning stats
+# (each rule is timed as its own stage when a trace is given)
+def apply_cleaning_rules(df, trace=NULL_TRACE):
+    stats = empty_cleaning_stats()
+
+    # Evaluate every rule against the untouched input first...
+    updates = []
+    for stat, column, when, value in CLEANING_RULES:
+        with trace.stage(f'rule:{stat}', rows=len(df)):
+            mask = when(df)
+            stats[stat] = int(mask.sum())
+            if stats[stat]:
+                updates.append((stat, column, mask, value(df) if callable(value) else value))
+
+    # ...then write the results back in table order
+    for stat, column, mask, new_values in updates:
+        with trace.stage(f'write:{stat}', rows=stats[stat]):
+            df[column] = df[column].mask(mask, new_values)
+
+    with trace.stage('critical_fields', rows=len(df)):
+        for field in CRITICAL_FIELDS:
+            stats[f'critical_missing_{field}'] = int(is_missing(df[field]).sum())
+
+    return stats
+
+
+# Rows missing a name or phone number
+def flagged_mask(df):
+    return is_missing(df['name']) | is_missing(df['phone'])
+
+
+# Rows with all critical fields present
+def complete_mask(df):
+    mask = pd.Series(True, index=df.index)
+    for field in CRITICAL_FIELDS:
+        mask &= ~is_missing(df[field])
+    return mask
+
+
+# Text fields that must not carry Google Place IDs after cleaning
+PLACE_ID_CHECK_COLUMNS = ['testimonials', 'insuranceAmount', 'bio']
+
+
+# Post-cleaning validation counters for one frame (or one chunk of it)
+def validation_stats(df):
+    stats = {f'google_ids_{col}': int(google_place_id_mask(df[col]).sum()) for col in PLACE_ID_CHECK_COLUMNS}
+    stats['valid_emails'] = int(valid_email_mask(df['email']).sum())
+    stats['complete_records'] = int(complete_mask(df).sum())
+    return stats
+
+
+# Add the counters from one chunk into the running totals
+def merge_stats(totals, stats):
+    for key, value in stats.items():
+        totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+# Column types used when streaming, where pandas would otherwise infer types
+# per chunk (a column could come out as float in one chunk and text in the next)
+NUMERIC_COLUMNS = ['totalScore', 'reviewsCount', 'foundedYear', 'teamSize', 'yearsExperience', 'serviceRadius']
+FLAG_COLUMNS = ['emergencyAvailable', 'weekendAvailable']
+FLAG_VALUES = {'True': True, 'TRUE': True, 'true': True, 'False': False, 'FALSE': False, 'false': False}
+
+
+def _parse_flag(value):
+    if value == '':
+        return np.nan
+    return FLAG_VALUES.get(value, value)
+
+
+# Yield the CSV as DataFrames of at most `chunksize` rows, or as one frame
+# when no chunk size is given. Row labels keep counting across chunks.
+def read_chunks(path, chunksize=None):
+    if not chunksize:
+        yield pd.read_csv(path)
+        return
+
+    columns = pd.read_csv(path, nrows=0).columns
+    dtype = {col: float if col in NUMERIC_COLUMNS else str for col in columns if col not in FLAG_COLUMNS}
+    converters = {col: _parse_flag for col in FLAG_COLUMNS if col in columns}
+    yield from pd.read_csv(path, chunksize=chunksize, dtype=dtype, converters=converters)
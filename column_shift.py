@@ -0,0 +1,352 @@
+import argparse
+import csv
+import json
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from provider_schema import STATE_ALIASES
+
+# Column-shift detection and realignment for crawler CSVs.
+#
+# Enrichment writes free text (bios, page scrapes) without always quoting it,
+# so a comma in the text splits one field into several and every later value
+# lands in the wrong column: place ids in `specialties`, 'CERTIFIED' in
+# `weekendAvailable`, emails off the end of the row. A line break in the text
+# cuts the record short instead.
+#
+# Every cell is classified into a value shape (place id, email, URL, phone,
+# yes/no flag, state, ZIP list, number or plain text) and each column has an
+# expected shape: declared below for the provider columns, learned from the
+# first chunk for any other column. A cell whose shape its column does not
+# accept is a mismatch. Then:
+#
+#   rows of the right length   kept; rows with mismatches are reported as suspect
+#   rows with k extra fields   realigned by joining k+1 consecutive fields back
+#                              into one free-text column, when exactly one
+#                              choice of column fits the expected shapes best
+#                              and most joined fields read as text split at ', '
+#   rows that are cut short    stitched to the short records right after
+#                              them when the field counts add up: n pieces of
+#                              one record have width + n - 1 fields, as each
+#                              line break splits one field in two
+#
+# Anything else is written unchanged to a rejects file for a person to look at.
+
+SHAPES = ['empty', 'place_id', 'email', 'url', 'phone', 'flag', 'state', 'zip', 'number', 'text']
+SHAPE_CODES = {shape: code for code, shape in enumerate(SHAPES)}
+EMPTY, TEXT = SHAPE_CODES['empty'], SHAPE_CODES['text']
+
+_STATE_NAMES = '|'.join(re.escape(name) for name in sorted(STATE_ALIASES, key=len, reverse=True))
+
+# One alternative per shape, tried in order; no match means plain text
+SHAPE_PATTERN = re.compile(
+    r'^\s*(?:'
+    r'(?P<place_id>ChI[A-Za-z0-9_-]{10,})'
+    r'|(?P<email>[^\s@,;]+@[^\s@,;]+\.[A-Za-z]{2,})'
+    r'|(?P<url>(?:(?i:https?)://|www\.|data:image/)\S*)'
+    r'|(?P<phone>\+?1?[\s.-]?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}(?:\s*(?i:ext\.?|x)\s*\d+)?)'
+    r'|(?P<flag>(?i:yes|no|true|false|unknown))'
+    rf'|(?P<state>(?i:{_STATE_NAMES}))'
+    r'|(?P<zip>\d{5}(?:-\d{4})?(?:\s*[,;]\s*\d{5}(?:-\d{4})?)*)'
+    r'|(?P<number>-?\d+(?:\.\d+)?)'
+    r')\s*$')
+
+# Expected shapes of the provider columns; other columns are profiled
+EXPECTED_SHAPES = {
+    'totalScore': 'number', 'reviewsCount': 'number', 'foundedYear': 'number', 'teamSize': 'number',
+    'yearsExperience': 'number', 'serviceRadius': 'number',
+    'state': 'state', 'zipCodes': 'zip', 'phone': 'phone', 'email': 'email', 'googlePlaceId': 'place_id',
+    'website': 'url', 'url': 'url', 'logo': 'url', 'profileImage': 'url', 'businessImages': 'url',
+    'is_mobile_phlebotomy': 'flag', 'is_nationwide': 'flag', 'emergencyAvailable': 'flag', 'weekendAvailable': 'flag',
+}
+
+# Shapes a column accepts besides its own: a five-digit count looks like a
+# ZIP, and a ZIP read back from a float column looks like a number
+COMPATIBLE_SHAPES = {'number': ['zip'], 'zip': ['number']}
+
+# Shapes that never belong in a free-text column on their own
+DISTINCTIVE_SHAPES = ['place_id', 'email', 'url', 'phone']
+
+# A profiled column takes a shape when this share of its values has it
+PROFILE_THRESHOLD = 0.9
+PROFILE_MIN_VALUES = 20
+
+# Examples kept in the report, per status
+EXAMPLES_PER_STATUS = 20
+
+
+def _shape_of(value):
+    if not value.strip():
+        return EMPTY
+    match = SHAPE_PATTERN.match(value)
+    return SHAPE_CODES[match.lastgroup] if match else TEXT
+
+
+# Shape code of every value; each distinct value is classified once
+def classify(series):
+    codes, uniques = pd.factorize(series.fillna('').astype(str))
+    if not len(uniques):
+        return np.full(len(series), EMPTY, dtype=np.int8)
+    return np.array([_shape_of(value) for value in uniques], dtype=np.int8)[codes]
+
+
+def shape_matrix(frame):
+    return np.column_stack([classify(frame[col]) for col in frame.columns]) if len(frame) else \
+        np.zeros((0, len(frame.columns)), dtype=np.int8)
+
+
+# Expected shape per column: declared, else the dominant shape of the sample
+def profile_columns(frame):
+    codes = shape_matrix(frame)
+    profile = {}
+    for j, col in enumerate(frame.columns):
+        if col in EXPECTED_SHAPES:
+            profile[col] = {'expected': EXPECTED_SHAPES[col], 'declared': True}
+            continue
+        values = codes[:, j][codes[:, j] != EMPTY]
+        counts = np.bincount(values, minlength=len(SHAPES))
+        dominant = int(counts.argmax())
+        learned = (len(values) >= PROFILE_MIN_VALUES and dominant != TEXT
+                   and counts[dominant] >= PROFILE_THRESHOLD * len(values))
+        profile[col] = {'expected': SHAPES[dominant] if learned else 'text', 'declared': False}
+    return profile
+
+
+# allowed[column, shape]: whether the column accepts the shape
+def allowed_shapes(profile):
+    allowed = np.zeros((len(profile), len(SHAPES)), dtype=bool)
+    allowed[:, EMPTY] = True
+    for j, column in enumerate(profile.values()):
+        if column['expected'] == 'text':
+            allowed[j] = True
+            allowed[j, [SHAPE_CODES[shape] for shape in DISTINCTIVE_SHAPES]] = False
+        else:
+            for shape in [column['expected']] + COMPATIBLE_SHAPES.get(column['expected'], []):
+                allowed[j, SHAPE_CODES[shape]] = True
+    return allowed
+
+
+def mismatch_matrix(codes, allowed):
+    return ~allowed[np.arange(codes.shape[1]), codes]
+
+
+# The candidate ways of folding `extra` surplus fields of `record` back into
+# one free-text column, as (column, realigned record)
+def overflow_candidates(record, extra, text_columns):
+    for j in text_columns:
+        if j + extra < len(record):
+            merged = ','.join(record[j:j + extra + 1])
+            yield j, record[:j] + [merged] + record[j + extra + 1:]
+
+
+# Fields after the first that do not read as a continuation of prose split
+# at ', ' (so a join there is less likely)
+def _hard_joins(record, j, extra):
+    return sum(1 for value in record[j + 1:j + extra + 1] if value and not value[0].isspace())
+
+
+# Runs of adjacent short records that stitch back into one record of `width`
+# fields, joining the field split at each break with the line break. Returns
+# (stitched rows as (first position, last position, row), positions of the
+# short records that stitch into nothing).
+def stitch_short_records(records, width):
+    stitched, orphans = [], []
+    i = 0
+    while i < len(records):
+        if len(records[i]) >= width:
+            i += 1
+            continue
+        row, end = list(records[i]), i
+        while len(row) < width and end + 1 < len(records) and len(records[end + 1]) < width:
+            end += 1
+            row = row[:-1] + [row[-1] + '\n' + records[end][0]] + records[end][1:]
+        if len(row) == width:
+            stitched.append((i, end, row))
+            i = end + 1
+        else:
+            orphans.append(i)
+            i += 1
+    return stitched, orphans
+
+
+class ShiftDetector:
+    def __init__(self, columns, profile):
+        self.columns = list(columns)
+        self.profile = profile
+        self.allowed = allowed_shapes(profile)
+        self.text_columns = [j for j, column in enumerate(profile.values()) if column['expected'] == 'text']
+        self.stats = {'records': 0, 'well_formed': 0, 'suspect': 0, 'realigned': 0, 'stitched': 0, 'rejected': 0}
+        self.column_mismatches = np.zeros(len(self.columns), dtype=np.int64)
+        self.examples = {}
+
+    def _frame(self, rows):
+        return pd.DataFrame(rows, columns=self.columns, dtype=object)
+
+    def _mismatches(self, rows):
+        return mismatch_matrix(shape_matrix(self._frame(rows)), self.allowed)
+
+    def _example(self, line, status, detail):
+        examples = self.examples.setdefault(status, [])
+        if len(examples) < EXAMPLES_PER_STATUS:
+            examples.append({'line': line, **detail})
+
+    # Realign one chunk of raw records. Returns (rows to keep, rejected
+    # records), both with their line numbers.
+    def process(self, records, lines):
+        width = len(self.columns)
+        self.stats['records'] += len(records)
+        kept, rejected = [], []
+
+        # Too short: a line break inside a field ends the record early and
+        # the rest of it follows as the next records. Stitch those back
+        # together; reject any other short record rather than padding it.
+        stitched, orphans = stitch_short_records(records, width)
+        self.stats['stitched'] += len(stitched)
+        for i, end, _ in stitched:
+            self._example(lines[i], 'stitched', {'lines': lines[i:end + 1]})
+        for i in orphans:
+            rejected.append((lines[i], records[i]))
+            self.stats['rejected'] += 1
+            self._example(lines[i], 'rejected', {'fields': len(records[i]), 'reason': 'truncated'})
+
+        # Right length, as read or stitched: flag cells whose shape does not fit
+        rows = [(lines[i], record) for i, record in enumerate(records) if len(record) == width]
+        self.stats['well_formed'] += len(rows)
+        rows += [(lines[i], row) for i, _, row in stitched]
+        if rows:
+            bad = self._mismatches([row for _, row in rows])
+            self.column_mismatches += bad.sum(axis=0)
+            for (line, _), row_bad in zip(rows, bad):
+                if row_bad.any():
+                    self.stats['suspect'] += 1
+                    self._example(line, 'suspect', {'columns': [self.columns[j] for j in np.flatnonzero(row_bad)]})
+        kept += rows
+
+        # Too long: score every way of folding the surplus back into one column
+        candidates = []
+        for i, record in enumerate(records):
+            if len(record) > width:
+                for j, row in overflow_candidates(record, len(record) - width, self.text_columns):
+                    candidates.append((i, j, row))
+        if candidates:
+            bad = self._mismatches([row for _, _, row in candidates]).sum(axis=1)
+            by_record = {}
+            for (i, j, row), count in zip(candidates, bad):
+                score = (int(count), _hard_joins(records[i], j, len(records[i]) - width))
+                by_record.setdefault(i, []).append((score, j, row))
+            for i, record in enumerate(records):
+                if len(record) <= width:
+                    continue
+                # Accept the best fold only if it is the single best and most
+                # joined fields read as text that was split at ', '
+                extra = len(record) - width
+                options = sorted(by_record.get(i, []), key=lambda option: option[0])
+                if (options and 2 * options[0][0][1] < extra
+                        and (len(options) == 1 or options[0][0] < options[1][0])):
+                    score, j, row = options[0]
+                    kept.append((lines[i], row))
+                    self.stats['realigned'] += 1
+                    self._example(lines[i], 'realigned', {'fields': len(record), 'mergedInto': self.columns[j],
+                                                          'remainingMismatches': score[0]})
+                else:
+                    rejected.append((lines[i], record))
+                    self.stats['rejected'] += 1
+                    self._example(lines[i], 'rejected', {'fields': len(record), 'reason': 'ambiguous overflow'})
+
+        kept.sort(key=lambda item: item[0])
+        rejected.sort(key=lambda item: item[0])
+        return kept, rejected
+
+    def report(self, input_path):
+        return {
+            'input': input_path,
+            **self.stats,
+            'columns': {col: {**self.profile[col], 'mismatches': int(count)}
+                        for col, count in zip(self.columns, self.column_mismatches)},
+            'examples': self.examples,
+        }
+
+
+# (records, starting line numbers) in chunks of `chunksize` records. A chunk
+# never ends on a short record, so both halves of a record split by a line
+# break reach the detector together.
+def read_records(path, chunksize):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        yield header, None
+        records, lines = [], []
+        line = reader.line_num + 1
+        for record in reader:
+            if record:
+                records.append(record)
+                lines.append(line)
+            line = reader.line_num + 1
+            if len(records) >= chunksize and len(records[-1]) >= len(header):
+                yield records, lines
+                records, lines = [], []
+        if records:
+            yield records, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Detect and realign shifted columns in a crawler CSV')
+    parser.add_argument('--input', default='fully_enriched_providers_batch.csv')
+    parser.add_argument('--output', help='Realigned CSV (default: <input>.realigned.csv)')
+    parser.add_argument('--rejects', help='Records that could not be realigned (default: <input>.rejects.csv)')
+    parser.add_argument('--report', default='column-shift-report.json')
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    args = parser.parse_args()
+    root = os.path.splitext(args.input)[0]
+    output_path = args.output or f'{root}.realigned.csv'
+    rejects_path = args.rejects or f'{root}.rejects.csv'
+
+    start = time.perf_counter()
+    chunks = read_records(args.input, args.chunksize)
+    columns, _ = next(chunks)
+    detector = None
+    with open(output_path, 'w', encoding='utf-8', newline='') as out, \
+            open(rejects_path, 'w', encoding='utf-8', newline='') as rejects:
+        writer, reject_writer = csv.writer(out), csv.writer(rejects)
+        writer.writerow(columns)
+        reject_writer.writerow(['line'] + columns)
+        for records, lines in chunks:
+            if detector is None:
+                sample = [record for record in records if len(record) == len(columns)]
+                detector = ShiftDetector(columns, profile_columns(pd.DataFrame(sample, columns=columns, dtype=object)))
+            kept, rejected = detector.process(records, lines)
+            writer.writerows(row for _, row in kept)
+            reject_writer.writerows([line] + record for line, record in rejected)
+    if detector is None:
+        detector = ShiftDetector(columns, profile_columns(pd.DataFrame([], columns=columns, dtype=object)))
+
+    report = detector.report(args.input)
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    elapsed = time.perf_counter() - start
+
+    print("=" * 80)
+    print("COLUMN SHIFT CHECK")
+    print("=" * 80)
+    print(f"Records: {report['records']}")
+    print(f"  Right length: {report['well_formed']} ({report['suspect']} with misplaced values)")
+    print(f"  Realigned (extra fields folded back): {report['realigned']}")
+    print(f"  Stitched (split by a line break): {report['stitched']}")
+    print(f"  Rejected: {report['rejected']}")
+
+    print("\nColumns with misplaced values:")
+    for col, column in report['columns'].items():
+        if column['mismatches']:
+            print(f"  {col:<24} expects {column['expected']:<9} {column['mismatches']}")
+
+    print(f"\n[OK] Realigned CSV: {output_path}")
+    print(f"[OK] Rejected records: {rejects_path}")
+    print(f"[OK] Report: {args.report} ({elapsed:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,110 @@
 import pandas as pd
+import argparse
+import hashlib
 import json
+import os
+import re
 from datetime import datetime
 
-# State name to abbreviation mapping
-STATE_MAPPING = {
-    'Alabama': 'AL', 'Alaska': 'AK', 'Arizona': 'AZ', 'Arkansas': 'AR', 'California': 'CA',
-    'Colorado': 'CO', 'Connecticut': 'CT', 'Delaware': 'DE', 'Florida': 'FL', 'Georgia': 'GA',
-    'Hawaii': 'HI', 'Idaho': 'ID', 'Illinois': 'IL', 'Indiana': 'IN', 'Iowa': 'IA',
-    'Kansas': 'KS', 'Kentucky': 'KY', 'Louisiana': 'LA', 'Maine': 'ME', 'Maryland': 'MD',
-    'Massachusetts': 'MA', 'Michigan': 'MI', 'Minnesota': 'MN', 'Mississippi': 'MS', 'Missouri': 'MO',
-    'Montana': 'MT', 'Nebraska': 'NE', 'Nevada': 'NV', 'New Hampshire': 'NH', 'New Jersey': 'NJ',
-    'New Mexico': 'NM', 'New York': 'NY', 'North Carolina': 'NC', 'North Dakota': 'ND', 'Ohio': 'OH',
-    'Oklahoma': 'OK', 'Oregon': 'OR', 'Pennsylvania': 'PA', 'Rhode Island': 'RI', 'South Carolina': 'SC',
-    'South Dakota': 'SD', 'Tennessee': 'TN', 'Texas': 'TX', 'Utah': 'UT', 'Vermont': 'VT',
-    'Virginia': 'VA', 'Washington': 'WA', 'West Virginia': 'WV', 'Wisconsin': 'WI', 'Wyoming': 'WY'
-}
+from field_normalizers import normalize_states, slugify
+from pipeline_trace import Trace, add_trace_arguments, check_trace_arguments
+from provider_json import JsonArrayWriter, file_sha256, iter_elements, serialize
+from provider_shards import SHARD_DIR, load_manifest, load_top_metros, write_shards
+from provider_snapshot import load_providers
+
+SOURCE_CSV = 'enriched_mobile_phlebotomy_providers_updated.csv'
+OUTPUT_PATHS = ['data/providers.json', 'public/data/providers.json']
+
+# Per-provider content hashes and timestamps from the previous export.
+# Bump EXPORT_FORMAT whenever the shape of a provider record changes.
+EXPORT_STATE_PATH = 'data/providers.export-state.json'
+EXPORT_FORMAT = 1
+
+PLACE_ID_PATTERN = re.compile(r'query_place_id=([A-Za-z0-9_-]+)')
+
+
+def sha256_hex(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def load_export_state():
+    if not os.path.exists(EXPORT_STATE_PATH):
+        return {}
+    with open(EXPORT_STATE_PATH, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    return state if state.get('format') == EXPORT_FORMAT else {}
+
+
+# Identity of a provider, independent of its position in the CSV:
+# the Google place id from the booking URL, else name + city + state
+def provider_key(row):
+    match = PLACE_ID_PATTERN.search(safe_get(row, 'url'))
+    if match:
+        return match.group(1)
+    return '|'.join(safe_get(row, col).lower() for col in ('name', 'city', 'state'))
+
+
+# Hash of everything in a record except its timestamps
+def content_hash(provider):
+    return sha256_hex(json.dumps(provider, sort_keys=True, ensure_ascii=False).encode('utf-8'))[:16]
+
+
+# Serialized text of the previous export's providers, read in step with the
+# new export. Providers keep their CSV order, so lookups move forward through
+# the file and only one element is held at a time; a provider that moved
+# back is simply serialized again.
+class PreviousFragments:
+    def __init__(self, state, compact):
+        usable = (state and state.get('compact', False) == compact and
+                  file_sha256(OUTPUT_PATHS[0]) == state.get('outputHash'))
+        self.positions = {provider_id: i for i, provider_id in enumerate(state['providers'])} if usable else {}
+        self.elements = iter_elements(OUTPUT_PATHS[0]) if usable else iter(())
+        self.position = 0
+
+    def get(self, provider_id):
+        target = self.positions.get(provider_id)
+        if target is None or target < self.position:
+            return None
+        for _ in range(target - self.position):
+            next(self.elements)
+        self.position = target + 1
+        return next(self.elements)
+
+    # Release the previous export file, which is about to be replaced
+    def close(self):
+        if hasattr(self.elements, 'close'):
+            self.elements.close()
+
+
+parser = argparse.ArgumentParser(description='Convert the enriched provider CSV to the site JSON')
+parser.add_argument('--shards', action='store_true',
+                    help=f'Also write per-state shards and a manifest under {SHARD_DIR}')
+parser.add_argument('--metro-shards', action='store_true',
+                    help='With --shards, also write a shard per metro in data/top-metros.ts')
+parser.add_argument('--compact', action='store_true',
+                    help='Write one provider per line without indentation')
+add_trace_arguments(parser)
+args = parser.parse_args()
+check_trace_arguments(parser, args)
+trace = Trace.from_args('convert_csv', args)
+
+with trace.stage('fingerprint'):
+    state = load_export_state()
+    source_hash = file_sha256(SOURCE_CSV)
+
+# Nothing changed since the last run: same CSV, outputs (and shards) untouched
+if (state.get('sourceHash') == source_hash and state.get('compact', False) == args.compact and
+        all(file_sha256(path) == state.get('outputHash') for path in OUTPUT_PATHS) and
+        (not args.shards or (load_manifest().get('export') == state.get('outputHash') and
+                             state.get('metroShards') == args.metro_shards))):
+    print(f"{SOURCE_CSV} unchanged since the last export, nothing to do")
+    trace.close()
+    raise SystemExit(0)
 
 # Read your updated dataset
-df = pd.read_csv('enriched_mobile_phlebotomy_providers_updated.csv')
+with trace.stage('load') as call:
+    df = load_providers(SOURCE_CSV)
+    call.rows = len(df)
 
 # Function to safely get value or return empty string
 def safe_get(row, column, default=''):
@@ -31,88 +118,156 @@ print(f"Total rows in CSV: {len(df)}")
 
 # Apply filters
 df_filtered = df[
-    (df['is_mobile_phlebotomy'].astype(str).str.lower() == 'yes') & 
+    (df['is_mobile_phlebotomy'].astype(str).str.lower() == 'yes') &
     (df['is_nationwide'].astype(str).str.lower() != 'yes')
 ]
 
 print(f"Rows after filtering (mobile phlebotomy only, excluding nationwide): {len(df_filtered)}")
 
-# Convert to the JSON format your site expects
-providers = []
-for index, row in df_filtered.iterrows():
-    # Skip if no name
-    if pd.isna(row.get('name')) or not str(row.get('name')).strip():
-        continue
-    
-    # Get state and convert to abbreviation
-    state_full = safe_get(row, 'state')
-    state_abbr = STATE_MAPPING.get(state_full, state_full)
-    
-    # Handle regions serviced and new enriched fields
-    regions_serviced = safe_get(row, 'regions serviced')
-    verified_service_areas = safe_get(row, 'verified_service_areas')
-    validation_notes = safe_get(row, 'validation_notes')
-    
-    # Build description using validation notes
-    base_description = f"Professional mobile phlebotomy services. {safe_get(row, 'categoryName', 'Medical services')} providing at-home blood draw services."
-    if validation_notes:
-        base_description = f"{base_description} {validation_notes}"
-    
-    provider = {
-        "id": str(index + 1),
-        "name": safe_get(row, 'name'),
-        "slug": safe_get(row, 'name').lower().replace(' ', '-').replace('&', 'and').replace(',', '').replace('.', '').replace('(', '').replace(')', ''),
-        "phone": safe_get(row, 'phone'),
-        "website": safe_get(row, 'website'),
-        "bookingUrl": safe_get(row, 'url'),
-        "description": base_description,
-        "services": ["At-Home Blood Draw", "Specimen Pickup", "Lab Partner"],
-        "coverage": {
-            "states": [state_abbr] if state_abbr else [],
-            "cities": [safe_get(row, 'city')] if safe_get(row, 'city') else [],
-            "serviceAreas": verified_service_areas if verified_service_areas else regions_serviced
-        },
-        "address": {
-            "street": safe_get(row, 'street'),
-            "city": safe_get(row, 'city'),
-            "state": state_abbr,
-            "zip": ""
-        },
-        "availability": ["Weekdays"],
-        "payment": ["Cash", "Major Insurance"],
-        "rating": float(row.get('totalScore', 0)) if pd.notna(row.get('totalScore')) and row.get('totalScore') != 0 else None,
-        "reviewsCount": int(row.get('reviewsCount', 0)) if pd.notna(row.get('reviewsCount')) and row.get('reviewsCount') != 0 else None,
-        "badges": ["Certified", "Insured", "Mobile Service"],
-        "isMobilePhlebotomy": True,
-        "createdAt": datetime.now().isoformat(),
-        "updatedAt": datetime.now().isoformat()
-    }
-    
-    # Add verified service areas to description if available
-    if verified_service_areas:
-        provider["description"] += f" Verified service areas: {verified_service_areas}."
-    elif regions_serviced:
-        provider["description"] += f" Serving: {regions_serviced}."
-    
-    providers.append(provider)
-
-# Save to JSON
-with open('data/providers.json', 'w', encoding='utf-8') as f:
-    json.dump(providers, f, indent=2, ensure_ascii=False)
-
-# Also save to public folder for the website
-with open('public/data/providers.json', 'w', encoding='utf-8') as f:
-    json.dump(providers, f, indent=2, ensure_ascii=False)
-
-print(f"Converted {len(providers)} mobile phlebotomy providers to data/providers.json and public/data/providers.json")
+# Convert to the JSON format your site expects, one provider at a time
+def build_providers(df_filtered):
+    # Normalized columns, computed once for the whole frame
+    slugs = slugify(df_filtered['name'])[0]
+    state_abbrs = normalize_states(df_filtered['state'])[0].astype(object)
 
-# Show state distribution
+    seen_ids = set()
+    for index, row in df_filtered.iterrows():
+        # Skip if no name
+        if pd.isna(row.get('name')) or not str(row.get('name')).strip():
+            continue
+
+        # State abbreviation; unrecognised values are exported as written
+        state_abbr = state_abbrs[index] if pd.notna(state_abbrs[index]) else safe_get(row, 'state')
+
+        # Handle regions serviced and new enriched fields
+        regions_serviced = safe_get(row, 'regions serviced')
+        verified_service_areas = safe_get(row, 'verified_service_areas')
+        validation_notes = safe_get(row, 'validation_notes')
+
+        # Build description using validation notes
+        base_description = f"Professional mobile phlebotomy services. {safe_get(row, 'categoryName', 'Medical services')} providing at-home blood draw services."
+        if validation_notes:
+            base_description = f"{base_description} {validation_notes}"
+
+        provider = {
+            "id": None,
+            "name": safe_get(row, 'name'),
+            "slug": slugs[index],
+            "phone": safe_get(row, 'phone'),
+            "website": safe_get(row, 'website'),
+            "bookingUrl": safe_get(row, 'url'),
+            "description": base_description,
+            "services": ["At-Home Blood Draw", "Specimen Pickup", "Lab Partner"],
+            "coverage": {
+                "states": [state_abbr] if state_abbr else [],
+                "cities": [safe_get(row, 'city')] if safe_get(row, 'city') else [],
+                "serviceAreas": verified_service_areas if verified_service_areas else regions_serviced
+            },
+            "address": {
+                "street": safe_get(row, 'street'),
+                "city": safe_get(row, 'city'),
+                "state": state_abbr,
+                "zip": ""
+            },
+            "availability": ["Weekdays"],
+            "payment": ["Cash", "Major Insurance"],
+            "rating": float(row.get('totalScore', 0)) if pd.notna(row.get('totalScore')) and row.get('totalScore') != 0 else None,
+            "reviewsCount": int(row.get('reviewsCount', 0)) if pd.notna(row.get('reviewsCount')) and row.get('reviewsCount') != 0 else None,
+            "badges": ["Certified", "Insured", "Mobile Service"],
+            "isMobilePhlebotomy": True
+        }
+
+        # Add verified service areas to description if available
+        if verified_service_areas:
+            provider["description"] += f" Verified service areas: {verified_service_areas}."
+        elif regions_serviced:
+            provider["description"] += f" Serving: {regions_serviced}."
+
+        # Stable id derived from the provider's identity (suffixed if the key repeats)
+        key = provider_key(row)
+        provider_id = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+        duplicate = 1
+        while provider_id in seen_ids:
+            duplicate += 1
+            provider_id = hashlib.sha1(f"{key}#{duplicate}".encode('utf-8')).hexdigest()[:12]
+        seen_ids.add(provider_id)
+        provider["id"] = provider_id
+
+        yield provider
+
+
+# Keep timestamps (and the already-serialized text) of unchanged providers;
+# only new or edited providers are stamped and serialized again. Providers
+# are written to both outputs as they are built, in a single pass.
+now = datetime.now().isoformat()
+previous = state.get('providers', {})
+fragments = PreviousFragments(state, args.compact)
+export_providers = {}
 states = {}
-for p in providers:
-    state = p['address']['state']
-    if state:
-        states[state] = states.get(state, 0) + 1
+shard_providers, shard_parts = [], []
+changed = 0
+
+# Save to JSON, and also to the public folder for the website
+# (files that already hold exactly this export are left alone)
+with JsonArrayWriter(OUTPUT_PATHS, compact=args.compact) as writer:
+    for provider in trace.iter('build', build_providers(df_filtered)):
+        provider_id = provider["id"]
+        digest = content_hash(provider)
+        before = previous.get(provider_id)
 
+        if before and before['hash'] == digest:
+            provider["createdAt"] = before['createdAt']
+            provider["updatedAt"] = before['updatedAt']
+        else:
+            provider["createdAt"] = before['createdAt'] if before else now
+            provider["updatedAt"] = now
+            changed += 1
+
+        with trace.stage('serialize', rows=1):
+            text = fragments.get(provider_id) if before and before['hash'] == digest else None
+            part = writer.write_text(text or serialize(provider, args.compact))
+        export_providers[provider_id] = {
+            'hash': digest,
+            'createdAt': provider["createdAt"],
+            'updatedAt': provider["updatedAt"],
+        }
+
+        state_abbr = provider['address']['state']
+        if state_abbr:
+            states[state_abbr] = states.get(state_abbr, 0) + 1
+        if args.shards:
+            shard_providers.append(provider)
+            shard_parts.append(part)
+
+    fragments.close()
+    with trace.stage('write_outputs', rows=len(export_providers)):
+        output_hash, _ = writer.close()
+
+# Per-state (and per-metro) shards for pages that only need part of the list
+if args.shards:
+    metros = load_top_metros() if args.metro_shards else None
+    with trace.stage('shards', rows=len(shard_providers)):
+        manifest, shards_written = write_shards(shard_providers, shard_parts, output_hash, metros)
+    print(f"Wrote {shards_written} of {len(manifest['shards'])} shards to {SHARD_DIR} (others unchanged)")
+
+with open(EXPORT_STATE_PATH, 'w', encoding='utf-8') as f:
+    json.dump({
+        'format': EXPORT_FORMAT,
+        'sourceHash': source_hash,
+        'outputHash': output_hash,
+        'compact': args.compact,
+        'metroShards': args.metro_shards,
+        'providers': export_providers,
+    }, f, indent=2)
+
+removed = len(set(previous) - set(export_providers))
+print(f"Changed providers: {changed}, removed: {removed}, unchanged: {len(export_providers) - changed}")
+print(f"Converted {len(export_providers)} mobile phlebotomy providers to data/providers.json and public/data/providers.json")
+
+# Show state distribution
 print("\nProviders by state:")
 for state, count in sorted(states.items(), key=lambda x: x[1], reverse=True)[:10]:
-    print(f"  {state}: {count}")
\ No newline at end of file
+    print(f"  {state}: {count}")
+
+if trace.close():
+    print(f"\nTiming trace written to {args.trace}")
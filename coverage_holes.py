@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import re
+import time
+from datetime import date
+
+from coverage_matrix import MATRIX_COLUMNS, CoverageMatrix, city_id, load_page_cities, matrix_path
+from provider_snapshot import load_providers
+
+# Coverage holes: site cities with no provider to show.
+#
+# Every city page in data/cities-full.ts and data/cities.json is classified by
+# its best coverage: 'city' (a provider in that city or naming it in its
+# service areas), 'state' (another local provider in the state) or
+# 'nationwide'. Nationwide providers are listed on every page, so by default a
+# city they alone cover is still a hole: it is a recruitment target either
+# way. Pass --count-nationwide to treat them as coverage.
+#
+# Classification reads the persisted coverage matrix (see coverage_matrix.py),
+# so a run after a provider import only recomputes the rows that changed.
+# The hole list is written in the shape of data/zero-provider-cities.json,
+# along with what changed since the previous run, but to its own file: that
+# one is generated by scripts/unify-cities-full.ts from the coverage DB.
+
+HOLES_PATH = 'data/coverage-holes.json'
+
+CITY_PAGE_PATTERN = re.compile(r'name:\s*"([^"]+)",\s*state:\s*"([A-Z]{2})",\s*citySlug:\s*"([^"]+)"')
+
+COVERAGE_LEVELS = ['city', 'state', 'nationwide', 'none']
+
+STRING_LIST_PATTERN = re.compile(r'\[(?:\s*"[^"]*",?)+\s*\]')
+
+
+# (name, state abbreviation, city slug) for every city page
+def load_city_pages(cities_path='data/cities-full.ts', cities_json_path='data/cities.json'):
+    with open(cities_path, 'r', encoding='utf-8') as f:
+        pages = CITY_PAGE_PATTERN.findall(f.read())
+    if os.path.exists(cities_json_path):
+        with open(cities_json_path, 'r', encoding='utf-8') as f:
+            pages += [(city['name'], city['stateAbbr'], city['slug']) for city in json.load(f)]
+    return list(dict.fromkeys(pages))
+
+
+def coverage_level(matrix, city, state):
+    if matrix.by_city.get(city_id(city, state)):
+        return 'city'
+    if matrix.by_state.get(state):
+        return 'state'
+    if matrix.nationwide:
+        return 'nationwide'
+    return 'none'
+
+
+# {state: sorted city slugs} of the pages whose level counts as a hole
+def find_holes(matrix, pages, count_nationwide=False):
+    uncovered = {'none'} if count_nationwide else {'none', 'nationwide'}
+    holes = {}
+    for name, state, slug in pages:
+        if coverage_level(matrix, name, state) in uncovered:
+            holes.setdefault(state, set()).add(slug)
+    return {state: sorted(holes[state]) for state in sorted(holes)}
+
+
+def load_previous(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _flatten(by_state):
+    return {(state, slug) for state, slugs in by_state.items() for slug in slugs}
+
+
+def _group(pairs):
+    grouped = {}
+    for state, slug in sorted(pairs):
+        grouped.setdefault(state, []).append(slug)
+    return grouped
+
+
+# New and closed holes relative to the previous hole list
+def diff_holes(previous, holes):
+    before, after = _flatten(previous.get('byState', {})), _flatten(holes)
+    return {
+        'previousGeneratedOn': previous.get('generatedOn'),
+        'newHoles': _group(after - before),
+        'closedHoles': _group(before - after),
+    }
+
+
+def build_report(matrix, pages, holes, diff, count_nationwide):
+    dark_states = sorted(state for state in holes if not matrix.by_state.get(state))
+    eligible = len(matrix.nationwide) + sum(len(keys) for keys in matrix.by_state.values())
+    counted = 'city-specific, statewide or nationwide' if count_nationwide else 'city-specific or statewide'
+    return {
+        '_comment': f"Cities with a dedicated /us/[state]/[city] page but ZERO {counted} providers in "
+                    "the cleaned provider data. These are demand-side coverage holes = provider-recruitment "
+                    "targets. Regenerate: python coverage_holes.py",
+        'generatedOn': date.today().isoformat(),
+        'eligibleProvidersAtGeneration': eligible,
+        'totalCities': len(pages),
+        'totalExcluded': sum(len(slugs) for slugs in holes.values()),
+        'note': f"{len(dark_states)} of the {len(holes)} states below have no local provider coverage at all — "
+                "recruiting one statewide provider per state lights up every city in it.",
+        'byState': holes,
+        'changes': diff,
+    }
+
+
+# Indented JSON with each slug list kept on one line, as the file has always
+# been laid out
+def format_report(report):
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    text = STRING_LIST_PATTERN.sub(lambda m: '[' + ', '.join(re.findall(r'"[^"]*"', m.group(0))) + ']', text)
+    return text + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find city pages without provider coverage')
+    parser.add_argument('--input', default='cleaned_providers.csv')
+    parser.add_argument('--matrix', help='Coverage matrix file (default: next to the input)')
+    parser.add_argument('--output', default=HOLES_PATH)
+    parser.add_argument('--count-nationwide', action='store_true',
+                        help='Treat cities covered only by nationwide providers as covered')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = load_providers(args.input, MATRIX_COLUMNS)
+    pages = load_city_pages()
+    path = args.matrix or matrix_path(args.input)
+    matrix = CoverageMatrix.load(path, load_page_cities())
+    added, changed, removed = matrix.sync(df)
+    if added or changed or removed:
+        matrix.save(path)
+
+    holes = find_holes(matrix, pages, args.count_nationwide)
+    diff = diff_holes(load_previous(args.output), holes)
+    report = build_report(matrix, pages, holes, diff, args.count_nationwide)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        f.write(format_report(report))
+    elapsed = time.perf_counter() - start
+
+    levels = dict.fromkeys(COVERAGE_LEVELS, 0)
+    for name, state, _ in pages:
+        levels[coverage_level(matrix, name, state)] += 1
+
+    print("=" * 80)
+    print("COVERAGE HOLES")
+    print("=" * 80)
+    print(f"City pages: {len(pages)} ({added} providers added, {changed} changed, {removed} removed since last run)")
+    for level in COVERAGE_LEVELS:
+        print(f"  Best coverage {level:<11} {levels[level]}")
+    print(f"Holes: {report['totalExcluded']} cities in {len(holes)} states")
+
+    for label, key in (('New holes', 'newHoles'), ('Closed holes', 'closedHoles')):
+        pairs = _flatten(diff[key])
+        print(f"\n{label}: {len(pairs)}")
+        for state, slugs in diff[key].items():
+            print(f"  {state}: {', '.join(slugs)}")
+
+    print(f"\n[OK] Written to {args.output} in {elapsed * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import re
+import time
+from collections import deque
+
+from provider_schema import apply_schema, load_typed_providers
+
+# Free-text columns searched for city mentions
+SERVICE_AREA_COLUMNS = ['verified_service_areas', 'validation_notes']
+
+# Every column the index reads
+COVERAGE_COLUMNS = ['city', 'state', 'is_mobile_phlebotomy', 'is_nationwide'] + SERVICE_AREA_COLUMNS
+
+CITY_ENTRY_PATTERN = re.compile(r'name:\s*"([^"]+)",\s*state:\s*"([A-Z]{2})"')
+
+
+# Read (city, state abbreviation) pairs from data/cities-full.ts
+def load_site_cities(path='data/cities-full.ts'):
+    with open(path, 'r', encoding='utf-8') as f:
+        return CITY_ENTRY_PATTERN.findall(f.read())
+
+
+# Multi-pattern substring matcher (Aho-Corasick). Finds every pattern that
+# occurs anywhere in a text, overlapping matches included, in one pass.
+class PatternMatcher:
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [set()]
+
+        for pattern in patterns:
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(set())
+                state = next_state
+            self.output[state].add(pattern)
+
+        # Breadth-first pass to wire up failure links
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] |= self.output[self.fail[next_state]]
+
+    def find_all(self, text):
+        found = set()
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+
+# Prebuilt lookup tables for the metro page coverage logic:
+#   state code -> provider ids, lower-cased city -> ids, mentioned city -> ids
+# Provider ids are row positions in the frame the index was built from.
+class CoverageIndex:
+    def __init__(self, df, cities=None):
+        # Typed columns: 2-letter state categories and nullable boolean flags
+        self.df = apply_schema(df.reset_index(drop=True))
+        mobile = self.df[(self.df['is_mobile_phlebotomy'] != False).fillna(True)]
+
+        nationwide = (mobile['is_nationwide'] == True).fillna(False)
+        self.nationwide = set(mobile.index[nationwide])
+        local = mobile[~nationwide]
+
+        # Keyed by state code; 'CA' and 'California' rows share one entry
+        self.by_state = {}
+        for state, ids in local.groupby('state', observed=True).groups.items():
+            self.by_state[state] = set(ids)
+
+        self.by_city = {}
+        city_names = local['city'].dropna().astype(str).str.lower()
+        for city, ids in city_names.groupby(city_names).groups.items():
+            self.by_city[city] = set(ids)
+
+        # Lower-cased service-area text per local provider
+        self.texts = {}
+        for column in SERVICE_AREA_COLUMNS:
+            for i, value in local[column].dropna().astype(str).str.lower().items():
+                self.texts.setdefault(i, []).append(value)
+
+        patterns = {city.lower() for city, _ in cities or []}
+        self.by_mention = {pattern: set() for pattern in patterns}
+        matcher = PatternMatcher(patterns)
+        for i, values in self.texts.items():
+            for pattern in set().union(*(matcher.find_all(value) for value in values)):
+                self.by_mention[pattern].add(i)
+
+    # Providers whose service-area text mentions `normalized_city`
+    def mentions(self, normalized_city):
+        if normalized_city not in self.by_mention:
+            # Not one of the indexed city names, scan once and remember
+            self.by_mention[normalized_city] = {
+                i for i, values in self.texts.items() if any(normalized_city in value for value in values)
+            }
+        return self.by_mention[normalized_city]
+
+    def state_ids(self, state_abbr):
+        return set(self.by_state.get(state_abbr.upper(), ()))
+
+    # City-specific / regional / nationwide provider ids for a metro
+    def breakdown(self, city, state_abbr):
+        normalized_city = city.lower()
+        in_state = self.state_ids(state_abbr)
+        city_specific = in_state & (self.by_city.get(normalized_city, set()) | self.mentions(normalized_city))
+        return {
+            'city_specific': city_specific,
+            'regional': in_state - city_specific,
+            'nationwide': self.nationwide,
+        }
+
+    # Every in-state provider counts (directly, by service area or regionally),
+    # so the total does not depend on the city itself
+    def count(self, city, state_abbr):
+        return len(self.state_ids(state_abbr)) + len(self.nationwide)
+
+
+if __name__ == '__main__':
+    df = load_typed_providers('cleaned_providers.csv', COVERAGE_COLUMNS)
+    cities = load_site_cities()
+
+    start = time.perf_counter()
+    index = CoverageIndex(df, cities)
+    built = time.perf_counter()
+    counts = {(city, state): index.breakdown(city, state) for city, state in cities}
+    answered = time.perf_counter()
+
+    print(f"Indexed {len(df)} providers in {(built - start) * 1000:.1f} ms")
+    print(f"Answered {len(counts)} cities in {(answered - built) * 1000:.1f} ms")
+    print(f"Cities with city-specific coverage: {sum(1 for b in counts.values() if b['city_specific'])}")
+    print(f"Cities with no local providers: {sum(1 for b in counts.values() if not b['city_specific'] and not b['regional'])}")
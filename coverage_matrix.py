@@ -0,0 +1,273 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+from cleaning_rules import text
+from coverage_index import COVERAGE_COLUMNS, SERVICE_AREA_COLUMNS, PatternMatcher, load_site_cities
+from provider_schema import FLAG_VALUES, STATE_ALIASES
+from provider_shards import load_top_metros, write_atomic
+from provider_snapshot import load_providers
+
+# Persisted provider x city coverage matrix for the metro pages.
+#
+# Every provider gets one entry: its state code, its scope (local, nationwide
+# or not mobile) and the site cities it matches directly ('direct': same city
+# and state) or through its service-area text ('mention'). Only those two
+# kinds are stored per cell; 'regional' (in the state, no city match) and
+# 'nationwide' apply to whole states and to every city, so they are kept as
+# per-state and global provider sets instead of millions of cells.
+#
+# Entries carry a hash of the columns they were computed from. sync() compares
+# those hashes against a fresh load and recomputes only added or edited
+# providers; removed providers are dropped from the inverse indexes.
+
+MATRIX_FORMAT = 1
+
+# Columns an entry is computed from (plus 'url' and 'name' for the key)
+MATRIX_COLUMNS = ['name', 'url'] + COVERAGE_COLUMNS
+
+PLACE_ID_PATTERN = r'query_place_id=([A-Za-z0-9_-]+)'
+
+DIRECT = 'direct'
+MENTION = 'mention'
+
+
+def matrix_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.coverage.json'
+
+
+# Every (city, state abbreviation) the site has a page for: data/cities-full.ts,
+# the metros in data/top-metros.ts and data/cities.json, in first-seen order
+def load_page_cities(cities_path='data/cities-full.ts', metros_path='data/top-metros.ts',
+                     cities_json_path='data/cities.json'):
+    cities = list(load_site_cities(cities_path))
+    if os.path.exists(metros_path):
+        cities += [(city, state) for _, city, state in load_top_metros(metros_path)]
+    if os.path.exists(cities_json_path):
+        with open(cities_json_path, 'r', encoding='utf-8') as f:
+            cities += [(city['name'], city['stateAbbr']) for city in json.load(f)]
+    return list(dict.fromkeys(cities))
+
+
+def city_id(city, state):
+    return f"{city}, {state}"
+
+
+# Identity of each row, as convert_csv.py derives it: the Google place id from
+# the booking URL, else name + city + state. Repeats get a '#n' suffix.
+def provider_keys(df):
+    def lowered(col):
+        return text(df[col]).str.strip().str.lower()
+
+    url = text(df['url']) if 'url' in df else pd.Series('', index=df.index)
+    keys = url.str.extract(PLACE_ID_PATTERN)[0]
+    keys = keys.fillna(lowered('name') + '|' + lowered('city') + '|' + lowered('state'))
+    repeat = keys.groupby(keys).cumcount()
+    return keys.where(repeat == 0, keys + '#' + (repeat + 1).astype(str)).tolist()
+
+
+# Hash of the columns an entry depends on, one per row
+def row_hashes(df):
+    columns = [col for col in COVERAGE_COLUMNS if col in df]
+    values = df[columns].apply(text)
+    return [format(h, '016x') for h in pd.util.hash_pandas_object(values, index=False)]
+
+
+def _text(value):
+    return '' if pd.isna(value) else str(value)
+
+
+class CoverageMatrix:
+    def __init__(self, cities):
+        self.cities = list(dict.fromkeys(cities))
+        self.cities_hash = hashlib.sha256('\n'.join(city_id(*c) for c in self.cities).encode('utf-8')).hexdigest()[:16]
+        self.city_ids = {(city.lower(), state): city_id(city, state) for city, state in self.cities}
+        self.matcher = PatternMatcher({city.lower() for city, _ in self.cities})
+
+        self.entries = {}
+        self.by_state = {}
+        self.nationwide = set()
+        self.by_city = {city_id(*c): {} for c in self.cities}
+
+    # Entry for one provider row (a dict or Series with COVERAGE_COLUMNS)
+    def compute_entry(self, row, digest=None):
+        state = STATE_ALIASES.get(_text(row.get('state')).strip().lower())
+        mobile = FLAG_VALUES.get(_text(row.get('is_mobile_phlebotomy')).strip().lower()) is not False
+        nationwide = FLAG_VALUES.get(_text(row.get('is_nationwide')).strip().lower()) is True
+        entry = {'hash': digest, 'state': state, 'scope': 'excluded', 'cities': {}}
+        if not mobile:
+            return entry
+        if nationwide:
+            entry['scope'] = 'nationwide'
+            return entry
+
+        entry['scope'] = 'local'
+        if state is None:
+            return entry
+        mentioned = set()
+        for col in SERVICE_AREA_COLUMNS:
+            value = row.get(col)
+            if not pd.isna(value):
+                mentioned |= self.matcher.find_all(str(value).lower())
+        for name in mentioned:
+            cell = self.city_ids.get((name, state))
+            if cell:
+                entry['cities'][cell] = MENTION
+        direct = self.city_ids.get((_text(row.get('city')).lower(), state))
+        if direct:
+            entry['cities'][direct] = DIRECT
+        return entry
+
+    def _index(self, key, entry):
+        if entry['scope'] == 'nationwide':
+            self.nationwide.add(key)
+        elif entry['scope'] == 'local' and entry['state']:
+            self.by_state.setdefault(entry['state'], set()).add(key)
+        for cell, kind in entry['cities'].items():
+            self.by_city[cell][key] = kind
+
+    def _unindex(self, key, entry):
+        self.nationwide.discard(key)
+        if entry['state'] in self.by_state:
+            self.by_state[entry['state']].discard(key)
+        for cell in entry['cities']:
+            self.by_city[cell].pop(key, None)
+
+    # Add or replace one provider; only its own entry is recomputed
+    def set_provider(self, key, row, digest=None):
+        self.remove_provider(key)
+        entry = self.compute_entry(row, digest)
+        self.entries[key] = entry
+        self._index(key, entry)
+        return entry
+
+    def remove_provider(self, key):
+        entry = self.entries.pop(key, None)
+        if entry:
+            self._unindex(key, entry)
+        return entry is not None
+
+    # Bring the matrix in line with `df`, recomputing only rows whose
+    # coverage columns changed. Returns (added, changed, removed) counts.
+    def sync(self, df):
+        keys = provider_keys(df)
+        digests = row_hashes(df)
+        seen = set(keys)
+        removed = [key for key in self.entries if key not in seen]
+        for key in removed:
+            self.remove_provider(key)
+
+        added = changed = 0
+        columns = [col for col in COVERAGE_COLUMNS if col in df]
+        records = None
+        for position, (key, digest) in enumerate(zip(keys, digests)):
+            entry = self.entries.get(key)
+            if entry and entry['hash'] == digest:
+                continue
+            if records is None:
+                records = df[columns].to_dict('records')
+            if entry:
+                changed += 1
+            else:
+                added += 1
+            self.set_provider(key, records[position], digest)
+        return added, changed, len(removed)
+
+    # City-specific / regional / nationwide provider keys, as
+    # CoverageIndex.breakdown() reports them
+    def breakdown(self, city, state_abbr):
+        cell = self.by_city.get(city_id(city, state_abbr), {})
+        in_state = self.by_state.get(state_abbr, set())
+        city_specific = set(cell)
+        return {'city_specific': city_specific, 'regional': in_state - city_specific, 'nationwide': self.nationwide}
+
+    def count(self, city, state_abbr):
+        return len(self.by_state.get(state_abbr, ())) + len(self.nationwide)
+
+    # Per-city counts by match kind
+    def city_counts(self):
+        counts = {}
+        for city, state in self.cities:
+            cell = self.by_city[city_id(city, state)]
+            direct = sum(1 for kind in cell.values() if kind == DIRECT)
+            in_state = len(self.by_state.get(state, ()))
+            counts[city_id(city, state)] = {
+                DIRECT: direct,
+                MENTION: len(cell) - direct,
+                'regional': in_state - len(cell),
+                'nationwide': len(self.nationwide),
+                'total': in_state + len(self.nationwide),
+            }
+        return counts
+
+    def save(self, path):
+        data = {
+            'format': MATRIX_FORMAT,
+            'cities_hash': self.cities_hash,
+            'providers': self.entries,
+            'cities': self.city_counts(),
+        }
+        write_atomic(path, json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+    # Load a saved matrix; a missing or stale file (other format or city
+    # list) gives an empty matrix that the next sync() fills in full
+    @classmethod
+    def load(cls, path, cities):
+        matrix = cls(cities)
+        if not os.path.exists(path):
+            return matrix
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('format') != MATRIX_FORMAT or data.get('cities_hash') != matrix.cities_hash:
+            return matrix
+        for key, entry in data['providers'].items():
+            matrix.entries[key] = entry
+            matrix._index(key, entry)
+        return matrix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or update the provider x city coverage matrix')
+    parser.add_argument('--input', default='cleaned_providers.csv')
+    parser.add_argument('--matrix', help='Matrix file (default: next to the input, *.coverage.json)')
+    parser.add_argument('--rebuild', action='store_true', help='Ignore the saved matrix and recompute every provider')
+    parser.add_argument('--city', action='append', default=[], metavar='"CITY, ST"', help='Print the breakdown for a city')
+    args = parser.parse_args()
+    path = args.matrix or matrix_path(args.input)
+
+    print("=" * 80)
+    print("COVERAGE MATRIX")
+    print("=" * 80)
+    df = load_providers(args.input, MATRIX_COLUMNS)
+    cities = load_page_cities()
+
+    start = time.perf_counter()
+    matrix = CoverageMatrix(cities) if args.rebuild else CoverageMatrix.load(path, cities)
+    loaded = time.perf_counter()
+    added, changed, removed = matrix.sync(df)
+    synced = time.perf_counter()
+    matrix.save(path)
+    saved = time.perf_counter()
+
+    cells = sum(len(cell) for cell in matrix.by_city.values())
+    print(f"Providers: {len(matrix.entries)} ({added} added, {changed} changed, {removed} removed)")
+    print(f"Cities: {len(matrix.cities)}, direct/mention cells: {cells}, nationwide: {len(matrix.nationwide)}")
+    print(f"Load {(loaded - start) * 1000:.1f} ms, sync {(synced - loaded) * 1000:.1f} ms, save {(saved - synced) * 1000:.1f} ms")
+
+    for query in args.city:
+        city, _, state = query.rpartition(',')
+        breakdown = matrix.breakdown(city.strip(), state.strip().upper())
+        print(f"\n{city.strip()}, {state.strip().upper()}: {matrix.count(city.strip(), state.strip().upper())} providers")
+        print(f"  City-specific: {len(breakdown['city_specific'])}")
+        print(f"  Regional: {len(breakdown['regional'])}")
+        print(f"  Nationwide: {len(breakdown['nationwide'])}")
+
+    print(f"\n[OK] Matrix written to {path}")
+
+
+if __name__ == '__main__':
+    main()
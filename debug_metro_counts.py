@@ -1,69 +1,19 @@
 import pandas as pd
 
+from coverage_index import COVERAGE_COLUMNS, CoverageIndex, load_site_cities
+from provider_schema import load_typed_providers
+
 # Load the data
-df = pd.read_csv('cleaned_providers.csv')
+df = load_typed_providers('cleaned_providers.csv', ['name'] + COVERAGE_COLUMNS)
+
+# Build the coverage index once; every metro below is a set lookup
+index = CoverageIndex(df, load_site_cities())
 
-# State mapping
-state_map = {
-    'AL': 'Alabama', 'AK': 'Alaska', 'AZ': 'Arizona', 'AR': 'Arkansas', 'CA': 'California',
-    'CO': 'Colorado', 'CT': 'Connecticut', 'DE': 'Delaware', 'FL': 'Florida', 'GA': 'Georgia',
-    'HI': 'Hawaii', 'ID': 'Idaho', 'IL': 'Illinois', 'IN': 'Indiana', 'IA': 'Iowa',
-    'KS': 'Kansas', 'KY': 'Kentucky', 'LA': 'Louisiana', 'ME': 'Maine', 'MD': 'Maryland',
-    'MA': 'Massachusetts', 'MI': 'Michigan', 'MN': 'Minnesota', 'MS': 'Mississippi', 'MO': 'Missouri',
-    'MT': 'Montana', 'NE': 'Nebraska', 'NV': 'Nevada', 'NH': 'New Hampshire', 'NJ': 'New Jersey',
-    'NM': 'New Mexico', 'NY': 'New York', 'NC': 'North Carolina', 'ND': 'North Dakota', 'OH': 'Ohio',
-    'OK': 'Oklahoma', 'OR': 'Oregon', 'PA': 'Pennsylvania', 'RI': 'Rhode Island', 'SC': 'South Carolina',
-    'SD': 'South Dakota', 'TN': 'Tennessee', 'TX': 'Texas', 'UT': 'Utah', 'VT': 'Vermont',
-    'VA': 'Virginia', 'WA': 'Washington', 'WV': 'West Virginia', 'WI': 'Wisconsin', 'WY': 'Wyoming'
-}
 
 # Test the exact logic from the updated metros page
 def get_provider_count(metro_city, metro_state_abbr):
-    full_state_name = state_map.get(metro_state_abbr)
-    normalized_city = metro_city.lower()
-    normalized_state = metro_state_abbr.upper()
-
-    count = 0
-
-    for idx, provider in df.iterrows():
-        # Skip non-mobile phlebotomy services
-        if provider['is_mobile_phlebotomy'] == 'No':
-            continue
-
-        # Include nationwide providers
-        if provider['is_nationwide'] == 'Yes':
-            count += 1
-            continue
-
-        # Check if provider serves this state
-        serves_state = (
-            provider['state'] == normalized_state or
-            provider['state'] == full_state_name
-        )
-
-        if not serves_state:
-            continue
-
-        # 1. Direct city match
-        has_direct_city_match = False
-        if pd.notna(provider['city']):
-            has_direct_city_match = provider['city'].lower() == normalized_city
-
-        # 2. Service area match
-        service_area_match = False
-        if pd.notna(provider['verified_service_areas']):
-            service_area_match = normalized_city in provider['verified_service_areas'].lower()
-        if pd.notna(provider['validation_notes']):
-            service_area_match = service_area_match or (normalized_city in provider['validation_notes'].lower())
-
-        # 3. Regional match
-        has_regional_match = not has_direct_city_match and not service_area_match and serves_state
+    return index.count(metro_city, metro_state_abbr)
 
-        # Count all providers
-        if has_direct_city_match or service_area_match or has_regional_match:
-            count += 1
-
-    return count
 
 # Test top 10 metros
 top_metros = [
@@ -91,50 +41,22 @@ print("\n" + "=" * 60)
 print("DEBUGGING LOS ANGELES SPECIFICALLY:")
 print("=" * 60)
 
-normalized_city = "los angeles"
-normalized_state = "CA"
-full_state_name = "California"
-
-city_specific = 0
-regional = 0
-statewide = 0
+breakdown = index.breakdown("Los Angeles", "CA")
+city_specific = len(breakdown['city_specific'])
+regional = len(breakdown['regional'])
+statewide = len(breakdown['nationwide'])
 
+# List providers in file order, labelled by match kind
 debug_providers = []
-
-for idx, provider in df.iterrows():
-    if provider['is_mobile_phlebotomy'] == 'No':
-        continue
-
-    if provider['is_nationwide'] == 'Yes':
-        statewide += 1
+for idx in sorted(breakdown['city_specific'] | breakdown['regional'] | breakdown['nationwide']):
+    provider = df.iloc[idx]
+    city_label = provider['city'] if pd.notna(provider['city']) else 'N/A'
+    if idx in breakdown['nationwide']:
         debug_providers.append(f"Nationwide: {provider['name']}")
-        continue
-
-    serves_state = (
-        provider['state'] == normalized_state or
-        provider['state'] == full_state_name
-    )
-
-    if not serves_state:
-        continue
-
-    # Check matches
-    has_direct_city_match = False
-    if pd.notna(provider['city']):
-        has_direct_city_match = provider['city'].lower() == normalized_city
-
-    service_area_match = False
-    if pd.notna(provider['verified_service_areas']):
-        service_area_match = normalized_city in provider['verified_service_areas'].lower()
-    if pd.notna(provider['validation_notes']):
-        service_area_match = service_area_match or (normalized_city in provider['validation_notes'].lower())
-
-    if has_direct_city_match or service_area_match:
-        city_specific += 1
-        debug_providers.append(f"City-specific: {provider['name']} (city: {provider['city'] if pd.notna(provider['city']) else 'N/A'})")
-    elif serves_state:
-        regional += 1
-        debug_providers.append(f"Regional: {provider['name']} (city: {provider['city'] if pd.notna(provider['city']) else 'N/A'})")
+    elif idx in breakdown['city_specific']:
+        debug_providers.append(f"City-specific: {provider['name']} (city: {city_label})")
+    else:
+        debug_providers.append(f"Regional: {provider['name']} (city: {city_label})")
 
 print(f"City-specific: {city_specific}")
 print(f"Regional: {regional}")
@@ -143,4 +65,4 @@ print(f"Total: {city_specific + regional + statewide}")
 
 print(f"\nFirst 10 providers:")
 for i, prov in enumerate(debug_providers[:10]):
-    print(f"  {i+1}. {prov}")
\ No newline at end of file
+    print(f"  {i+1}. {prov}")
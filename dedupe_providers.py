@@ -0,0 +1,267 @@
+import argparse
+import time
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from field_normalizers import normalize_phones, url_hosts
+from provider_schema import state_codes
+from provider_snapshot import load_providers
+
+# Provider de-duplication with blocking.
+#
+# Rows sharing a Google place id are the same provider outright. Rows sharing
+# a looser key (phone number, website host, phonetic name bucket within a
+# state) are only candidates and are scored pairwise inside their block: a
+# chain's locations often share a central phone line as well as a name and a
+# website. Blocks are capped in size, so the work grows with the number of
+# rows rather than with the number of pairs.
+
+# Candidate blocks bigger than this are too generic to score (a chain's shared website)
+MAX_BLOCK_SIZE = 50
+
+# Minimum pair score for two candidate rows to be merged
+MATCH_THRESHOLD = 0.75
+
+# Hosts shared by unrelated businesses
+SHARED_HOSTS = {
+    'facebook.com', 'm.facebook.com', 'instagram.com', 'google.com', 'sites.google.com', 'business.site',
+    'linktr.ee', 'yelp.com', 'wixsite.com', 'squarespace.com', 'godaddysites.com', 'square.site',
+}
+
+# Legal suffixes dropped from names, and words too common to block on
+NAME_SUFFIXES = r'\b(?:llc|l l c|inc|corp|corporation|ltd|co|pllc|pc)\b'
+GENERIC_NAME_TOKENS = {
+    'the', 'and', 'of', 'a', 'at', 'in', 'mobile', 'phlebotomy', 'phlebotomist', 'phleb', 'services', 'service',
+    'lab', 'labs', 'laboratory', 'laboratories', 'blood', 'draw', 'draws', 'medical', 'health', 'testing',
+    'solutions', 'center', 'centre', 'care', 'group',
+}
+
+PLACE_ID_PATTERN = r'query_place_id=([A-Za-z0-9_-]+)'
+
+
+# Normalized columns
+
+def normalize_names(names):
+    return (names.fillna('').astype(str).str.lower()
+            .str.replace('&', ' and ', regex=False)
+            .str.replace(r'[^a-z0-9 ]+', ' ', regex=True)
+            .str.replace(NAME_SUFFIXES, ' ', regex=True)
+            .str.replace(r'\s+', ' ', regex=True)
+            .str.strip())
+
+
+# E.164 number, '' when there is none
+def phone_keys(phones):
+    return normalize_phones(phones)[0].fillna('')
+
+
+# Website host, '' for none or a shared host (directories, social sites)
+def host_keys(websites):
+    hosts = url_hosts(websites)
+    return hosts.where(~hosts.isin(SHARED_HOSTS), '')
+
+
+def place_ids(df):
+    ids = df['googlePlaceId'] if 'googlePlaceId' in df else pd.Series(np.nan, index=df.index)
+    from_url = df['url'].fillna('').astype(str).str.extract(PLACE_ID_PATTERN)[0] if 'url' in df else np.nan
+    return ids.fillna(from_url).fillna('').astype(str).str.strip()
+
+
+SOUNDEX_CODES = {c: str(d) for d, letters in enumerate(['aeiouyhw', 'bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r'])
+                 for c in letters}
+
+
+def soundex(token):
+    if not token:
+        return ''
+    if not token[0].isalpha():
+        return token[:4]
+    code = token[0].upper()
+    last = SOUNDEX_CODES.get(token[0], '')
+    for char in token[1:]:
+        digit = SOUNDEX_CODES.get(char, '')
+        if digit and digit != '0' and digit != last:
+            code += digit
+        if char not in 'hw':
+            last = digit
+    return (code + '000')[:4]
+
+
+# Words that tell one business from another, or every word of a name made
+# only of generic ones
+def distinctive_tokens(name):
+    tokens = name.split()
+    return [t for t in tokens if t not in GENERIC_NAME_TOKENS] or tokens
+
+
+# Phonetic bucket of a name: soundex of its first two distinctive tokens
+def name_buckets(normalized_names):
+    codes = {}
+    buckets = []
+    for name in normalized_names:
+        tokens = distinctive_tokens(name)[:2]
+        for token in tokens:
+            if token not in codes:
+                codes[token] = soundex(token)
+        buckets.append(' '.join(codes[t] for t in tokens))
+    return pd.Series(buckets, index=normalized_names.index)
+
+
+# Union-find over row positions
+class Clusters:
+    def __init__(self, size):
+        self.parent = np.arange(size)
+
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def union(self, i, j):
+        a, b = self.find(i), self.find(j)
+        if a != b:
+            # The smaller row position stays the root, so cluster ids are stable
+            self.parent[max(a, b)] = min(a, b)
+
+    def labels(self):
+        return np.array([self.find(i) for i in range(len(self.parent))])
+
+
+# Groups of row positions sharing a non-empty key
+def blocks(keys):
+    keys = keys[keys != '']
+    grouped = keys.groupby(keys).indices
+    labels = keys.index.to_numpy()
+    return [labels[positions] for positions in grouped.values() if len(positions) > 1]
+
+
+def token_similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+# Score two candidate rows: name overlap plus corroborating fields. A chain's
+# locations share a name and usually a website, often a central phone line
+# too, so rows in two different cities never match. Otherwise a match needs
+# the name and either the same city or the same phone number (a row without
+# a city still joins its listing elsewhere in the table).
+def score_pair(features, i, j):
+    city_i, city_j = features['city'][i], features['city'][j]
+    if city_i and city_j and city_i != city_j:
+        return 0.0
+    score = 0.6 * token_similarity(features['tokens'][i], features['tokens'][j])
+    if city_i and city_i == city_j:
+        score += 0.3
+    if features['phone'][i] and features['phone'][i] == features['phone'][j]:
+        score += 0.3
+    if features['host'][i] and features['host'][i] == features['host'][j]:
+        score += 0.1
+    return score
+
+
+def find_clusters(df):
+    df = df.reset_index(drop=True)
+    names = normalize_names(df['name'])
+    state = state_codes(df['state']).astype(object).fillna('')
+
+    features = {
+        'tokens': [frozenset(distinctive_tokens(name)) for name in names],
+        'city': df['city'].fillna('').astype(str).str.strip().str.lower().tolist(),
+        'host': host_keys(df['website']).tolist(),
+        'phone': phone_keys(df['phone']).tolist(),
+    }
+    clusters = Clusters(len(df))
+    stats = {'exact_links': 0, 'pairs_scored': 0, 'pairs_matched': 0, 'blocks_skipped': 0}
+
+    # Exact key: the same place id is the same provider
+    for positions in blocks(place_ids(df)):
+        for position in positions[1:]:
+            clusters.union(positions[0], position)
+            stats['exact_links'] += 1
+
+    # Candidate keys: score every pair inside each (small enough) block
+    name_keys = state + ':' + name_buckets(names)
+    name_keys = name_keys.where(names != '', '')
+    scored = set()
+    for keys in (pd.Series(features['phone']), pd.Series(features['host']), name_keys):
+        for positions in blocks(keys):
+            if len(positions) > MAX_BLOCK_SIZE:
+                stats['blocks_skipped'] += 1
+                continue
+            for i, j in combinations(positions.tolist(), 2):
+                if (i, j) in scored:
+                    continue
+                scored.add((i, j))
+                stats['pairs_scored'] += 1
+                if score_pair(features, i, j) >= MATCH_THRESHOLD:
+                    clusters.union(i, j)
+                    stats['pairs_matched'] += 1
+
+    return pd.Series(clusters.labels(), name='cluster_id'), stats
+
+
+# One record per cluster: each column takes the first non-empty value from
+# the cluster's rows, most complete row first
+def merge_clusters(df, cluster_ids):
+    df = df.reset_index(drop=True)
+    completeness = df.notna().sum(axis=1)
+    order = pd.DataFrame({'cluster_id': cluster_ids, 'completeness': completeness, 'position': df.index})
+    order = order.sort_values(['cluster_id', 'completeness', 'position'], ascending=[True, False, True])
+
+    ranked = df.loc[order['position']].replace('', np.nan)
+    ranked.insert(0, 'cluster_id', order['cluster_id'].to_numpy())
+    merged = ranked.groupby('cluster_id', sort=True).first()
+    merged.insert(0, 'cluster_size', pd.Series(cluster_ids).value_counts().sort_index())
+    return merged.reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find and merge duplicate providers')
+    parser.add_argument('--input', default='cleaned_providers.csv')
+    parser.add_argument('--clusters', default='provider_clusters.csv',
+                        help='Where to write every row with its cluster id')
+    parser.add_argument('--output', default='deduplicated_providers.csv',
+                        help='Where to write one merged record per cluster')
+    args = parser.parse_args()
+
+    df = load_providers(args.input)
+    start = time.perf_counter()
+    cluster_ids, stats = find_clusters(df)
+    merged = merge_clusters(df, cluster_ids)
+    elapsed = time.perf_counter() - start
+
+    clustered = df.reset_index(drop=True)
+    clustered.insert(0, 'cluster_id', cluster_ids)
+    clustered.to_csv(args.clusters, index=False, encoding='utf-8')
+    merged.to_csv(args.output, index=False, encoding='utf-8')
+
+    sizes = cluster_ids.value_counts()
+    duplicates = sizes[sizes > 1]
+
+    print("=" * 80)
+    print("PROVIDER DE-DUPLICATION")
+    print("=" * 80)
+    print(f"Rows: {len(df)}")
+    print(f"Clusters: {len(sizes)} ({len(duplicates)} with duplicates, {int(duplicates.sum() - len(duplicates))} rows merged)")
+    print(f"Exact-key links: {stats['exact_links']}")
+    print(f"Candidate pairs scored: {stats['pairs_scored']} ({stats['pairs_matched']} matched, "
+          f"{stats['blocks_skipped']} oversized blocks skipped)")
+    print(f"Time: {elapsed:.2f}s")
+
+    print("\nLargest duplicate clusters:")
+    for cluster_id, size in duplicates.head(10).items():
+        names = clustered.loc[clustered['cluster_id'] == cluster_id, 'name'].fillna('[NO NAME]').unique()
+        print(f"  {cluster_id} ({size} rows): {' | '.join(str(name)[:40] for name in names[:3])}")
+
+    print(f"\n[OK] Cluster assignments: {args.clusters}")
+    print(f"[OK] Merged providers: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+from provider_schema import state_codes
+
+# Column-at-a-time field normalizers.
+#
+# Each normalizer takes a Series and returns (normalized, valid): the
+# canonical form of every value and a boolean mask of the rows whose value is
+# well formed. Missing values stay missing and are never valid. Scripts should
+# call these rather than checking values one row at a time.
+
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+
+# Trailing extension: 'ext. 12', 'x12', '#12'
+PHONE_EXTENSION_PATTERN = r'(?i)\s*(?:ext\.?|extension|x|#)\s*\d+\s*$'
+
+URL_PARTS_PATTERN = r'^(?:(?P<scheme>[a-zA-Z][a-zA-Z0-9+.-]*)://)?(?P<host>[^/?#\s]*)(?P<rest>.*)$'
+HOST_PATTERN = r'^(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+[a-z]{2,}(?::\d{1,5})?$'
+DEFAULT_PORTS = {'http': ':80', 'https': ':443'}
+
+SLUG_PATTERN = r'^[a-z0-9]+(?:-[a-z0-9]+)*$'
+
+
+def _text(series):
+    return series.fillna('').astype(str)
+
+
+# Stripped, lower-cased addresses
+def normalize_emails(series):
+    emails = _text(series).str.strip().str.lower()
+    valid = series.notna() & emails.str.match(EMAIL_PATTERN)
+    return emails.where(series.notna()), valid
+
+
+# E.164 numbers. NANP numbers (10 digits, or 11 with a leading 1) become
+# '+1XXXXXXXXXX'; other numbers written with a leading '+' keep their
+# country code. Extensions are dropped; anything else is invalid.
+def normalize_phones(series):
+    values = _text(series).str.strip().str.replace(PHONE_EXTENSION_PATTERN, '', regex=True)
+    digits = values.str.replace(r'\D+', '', regex=True)
+    international = values.str.startswith('+') & ~digits.str.startswith('1')
+
+    nanp = digits.where(~((digits.str.len() == 11) & digits.str.startswith('1')), digits.str[1:])
+    nanp = nanp.where(~international & (nanp.str.len() == 10) & nanp.str.match(r'^[2-9]\d{2}[2-9]'))
+    other = digits.where(international & digits.str.len().between(8, 15))
+
+    phones = ('+1' + nanp).where(nanp.notna(), '+' + other)
+    return phones, phones.notna()
+
+
+# Canonical http(s) URLs: surrounding whitespace dropped, scheme and host
+# lower-cased, default ports removed, and 'https://' added to bare domains
+# ('www.example.com/book'). Path, query and fragment are kept as written.
+def normalize_urls(series):
+    values = _text(series).str.strip()
+    parts = values.str.extract(URL_PARTS_PATTERN)
+    scheme = parts['scheme'].str.lower()
+    host = parts['host'].str.lower()
+
+    bare = scheme.isna() & host.str.contains('.', regex=False) & ~values.str.contains(r'[\s@]', regex=True)
+    scheme = scheme.where(~bare, 'https')
+    for name, port in DEFAULT_PORTS.items():
+        host = host.where(~((scheme == name) & host.str.endswith(port)), host.str[:-len(port)])
+
+    urls = (scheme + '://' + host + parts['rest']).where(series.notna() & scheme.notna(), values.where(series.notna()))
+    valid = (series.notna() & scheme.isin(['http', 'https']) & host.str.match(HOST_PATTERN)
+             & ~parts['rest'].str.contains(r'\s', regex=True))
+    return urls, valid.fillna(False).astype(bool)
+
+
+# Host of each URL without 'www.' ('' when there is none)
+def url_hosts(series):
+    urls, valid = normalize_urls(series)
+    hosts = urls.str.extract(URL_PARTS_PATTERN)['host'].str.replace(r':\d+$', '', regex=True)
+    return hosts.str.replace(r'^www\d*\.', '', regex=True).where(valid, '')
+
+
+# 2-letter state codes (categorical); full names and any casing accepted
+def normalize_states(series):
+    codes = state_codes(series)
+    return codes, codes.notna()
+
+
+# URL slugs, the way the provider export has always built them: lower-cased,
+# spaces to hyphens, '&' to 'and', and , . ( ) dropped. Existing provider
+# URLs depend on this, so anything else is kept and reported as invalid.
+def slugify(series):
+    slugs = (_text(series).str.strip().str.lower()
+             .str.replace(' ', '-', regex=False)
+             .str.replace('&', 'and', regex=False)
+             .str.replace(r'[,.()]', '', regex=True))
+    return slugs.where(series.notna()), series.notna() & slugs.str.match(SLUG_PATTERN)
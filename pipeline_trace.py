@@ -0,0 +1,249 @@
+import cProfile
+import json
+import os
+import platform
+import pstats
+import signal
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Per-stage timing for the cleaning pipeline scripts.
+#
+# A script opens a Trace from its --trace/--profile arguments and wraps its
+# stages in `with trace.stage(name, rows=...)`. Stages nest ('clean/rule:bio_created')
+# and a stage entered again (once per chunk, say) adds to the same record, so
+# the trace holds one line per stage whatever the number of chunks:
+#
+#   {"clean/rule:bio_created": {"calls": 4, "rows": 200000, "seconds": 0.41,
+#                               "cpu_seconds": 0.40, "rows_per_second": 487804.9,
+#                               "peak_rss_mb": 512.3, "rss_growth_mb": 0.0}, ...}
+#
+# cpu_seconds includes worker processes that were reaped during the stage.
+# peak_rss_mb is the process high-water mark when the stage last ended and
+# rss_growth_mb how much the stage raised it. Without --trace every stage is a
+# no-op.
+#
+# The trace is written as one JSON document, or appended as one line when the
+# path ends in .jsonl, so runs on the same input can be compared over time.
+# --profile adds the hottest functions (cprofile, also dumped to <trace>.prof)
+# or stacks (sample: SIGPROF every few milliseconds, also written to
+# <trace>.folded for flame graph tools).
+
+PROFILERS = ['cprofile', 'sample']
+SAMPLE_INTERVAL = 0.005
+TOP_ENTRIES = 25
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+# CPU seconds of this process and of its reaped children
+def cpu_seconds():
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class Stage:
+    def __init__(self):
+        self.calls = 0
+        self.rows = None
+        self.seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_rss_mb = None
+        self.rss_growth_mb = 0.0
+
+    def as_dict(self):
+        result = {'calls': self.calls, 'rows': self.rows, 'seconds': round(self.seconds, 4),
+                  'cpu_seconds': round(self.cpu_seconds, 4)}
+        if self.rows is not None and self.seconds > 0:
+            result['rows_per_second'] = round(self.rows / self.seconds, 1)
+        if self.peak_rss_mb is not None:
+            result['peak_rss_mb'] = round(self.peak_rss_mb, 1)
+            result['rss_growth_mb'] = round(self.rss_growth_mb, 1)
+        return result
+
+
+# Rows of the current call; `rows` may be set inside the with block once known
+class StageCall:
+    def __init__(self, rows):
+        self.rows = rows
+
+
+# Statistical profiler: counts the interrupted stack on every SIGPROF tick
+class Sampler:
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+
+class Trace:
+    def __init__(self, name, path=None, profile=None):
+        self.name = name
+        self.path = path
+        self.enabled = path is not None
+        self.stages = {}
+        self.stack = []
+        self.profiler = None
+        self.sampler = None
+        self.start_seconds = time.perf_counter()
+        self.start_cpu = cpu_seconds()
+        if profile == 'cprofile':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif profile == 'sample':
+            self.sampler = Sampler()
+            self.sampler.start()
+
+    @classmethod
+    def from_args(cls, name, args):
+        return cls(name, args.trace, args.profile)
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        call = StageCall(rows)
+        if not self.enabled:
+            yield call
+            return
+
+        self.stack.append(name)
+        key = '/'.join(self.stack)
+        # Created on entry so the trace lists stages in the order they start
+        if key not in self.stages:
+            self.stages[key] = Stage()
+        peak_before = peak_rss_mb()
+        start_cpu = cpu_seconds()
+        start = time.perf_counter()
+        try:
+            yield call
+        finally:
+            seconds = time.perf_counter() - start
+            cpu = cpu_seconds() - start_cpu
+            self.stack.pop()
+            self._record(key, call.rows, seconds, cpu, peak_before)
+
+    # Yield the items of `iterable`, timing each step under `name`; `rows`
+    # gives the row count of an item (one row per item by default)
+    def iter(self, name, iterable, rows=None):
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name) as call:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    call.rows = 0
+                    return
+                call.rows = rows(item) if rows else 1
+            yield item
+
+    def _record(self, key, rows, seconds, cpu, peak_before):
+        stage = self.stages[key]
+        stage.calls += 1
+        stage.seconds += seconds
+        stage.cpu_seconds += cpu
+        if rows is not None:
+            stage.rows = (stage.rows or 0) + rows
+        peak = peak_rss_mb()
+        if peak is not None:
+            stage.peak_rss_mb = peak
+            stage.rss_growth_mb += peak - peak_before
+
+    def _profile_entries(self, base):
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(f"{base}.prof")
+            stats = pstats.Stats(self.profiler).stats
+            ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_ENTRIES]
+            return {'kind': 'cprofile', 'file': f"{base}.prof", 'functions': [
+                {'function': f"{function} ({os.path.basename(filename)}:{line})", 'calls': calls,
+                 'tottime': round(tottime, 4), 'cumtime': round(cumtime, 4)}
+                for (filename, line, function), (_, calls, tottime, cumtime, _) in ranked
+            ]}
+        if self.sampler is not None:
+            self.sampler.stop()
+            with open(f"{base}.folded", 'w', encoding='utf-8') as f:
+                for stack, count in self.sampler.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            return {'kind': 'sample', 'file': f"{base}.folded", 'interval': self.sampler.interval,
+                    'samples': sum(self.sampler.stacks.values()), 'stacks': [
+                        {'stack': stack, 'samples': count} for stack, count in self.sampler.stacks.most_common(TOP_ENTRIES)
+                    ]}
+        return None
+
+    # Stop profiling and write the trace; returns its path (None when disabled)
+    def close(self):
+        if not self.enabled:
+            return None
+
+        base = os.path.splitext(self.path)[0]
+        record = {
+            'script': self.name,
+            'argv': sys.argv[1:],
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seconds': round(time.perf_counter() - self.start_seconds, 4),
+            'cpu_seconds': round(cpu_seconds() - self.start_cpu, 4),
+            'peak_rss_mb': round(peak_rss_mb(), 1) if resource is not None else None,
+            'stages': {key: stage.as_dict() for key, stage in self.stages.items()},
+        }
+        # The profile files go next to the trace, so its directory comes first
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        profile = self._profile_entries(base)
+        if profile is not None:
+            record['profile'] = profile
+
+        if self.path.endswith('.jsonl'):
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+        else:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(record, f, indent=2)
+                f.write('\n')
+        return self.path
+
+
+# Stages that never run under a trace (the default for library functions)
+NULL_TRACE = Trace(None)
+
+
+def add_trace_arguments(parser):
+    parser.add_argument('--trace', default=None, metavar='PATH',
+                        help='Write per-stage timings to this JSON file (.jsonl: append one line per run)')
+    parser.add_argument('--profile', choices=PROFILERS, default=None,
+                        help='With --trace, also profile the run with cProfile or a sampling profiler')
+
+
+# Check the trace arguments after parsing (parser.error exits)
+def check_trace_arguments(parser, args):
+    if args.profile and not args.trace:
+        parser.error('--profile needs --trace')
+    if args.profile == 'sample' and not hasattr(signal, 'setitimer'):
+        parser.error('--profile sample needs SIGPROF, which this platform does not have (use cprofile)')
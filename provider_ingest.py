@@ -0,0 +1,581 @@
+import argparse
+import csv
+import io
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from cleaning_rules import CLEANING_RULES, CRITICAL_FIELDS, FLAG_COLUMNS, FLAG_VALUES, apply_cleaning_rules
+from dedupe_providers import host_keys, phone_keys, place_ids
+
+# Upsert ingest of crawler batches into the master provider table.
+#
+# A batch row is matched to a master row by Google place id, else by
+# normalized phone number, else by website host (shared hosts such as
+# facebook.com never match, and neither does a key several master rows
+# share). A match is merged column by column under the precedence policy;
+# anything else is appended. Rows about to be written get the same cleaning
+# rules as the full clean, so only the rows a batch touches are ever cleaned.
+#
+# The master is never loaded. A key index kept next to it holds a 64-bit hash
+# of every key with the row it belongs to, each row's byte span in the CSV,
+# and the hashes of rows already ingested (a batch row seen before is skipped
+# before any lookup). Lookups are sorted searches over the batch's keys, a
+# matched row is read by seeking to its span, new rows are appended and
+# changed rows are spliced in with a byte copy, so parsing, matching and
+# merging grow with the batch rather than the table. The index is rebuilt
+# from the master, once and in full, whenever something else changed it.
+#
+# Batches must have one field per column: run column_shift.py first on a
+# crawler CSV with unquoted commas.
+
+INDEX_FORMAT = 2
+
+# Crawler columns that go by another name in the master table
+COLUMN_ALIASES = {'title': 'name'}
+
+# Match keys, strongest first
+KEY_KINDS = ['place', 'phone', 'host']
+
+# Column precedence when a batch row matches a master row:
+#   'batch'    the batch value wins whenever it is not empty
+#   'master'   the master value stays unless it is empty
+#   'max'      the larger number
+#   'longest'  the longer text
+# '*' sets the policy for every column not listed.
+PRECEDENCE_POLICIES = ['batch', 'master', 'max', 'longest']
+
+# Validation results and hand-edited copy are only filled in by a batch,
+# never overwritten
+DEFAULT_PRECEDENCE = {
+    '*': 'batch',
+    'is_mobile_phlebotomy': 'master',
+    'is_nationwide': 'master',
+    'verified_service_areas': 'master',
+    'validation_notes': 'master',
+    'bio': 'master',
+    'reviewsCount': 'max',
+    'businessImages': 'longest',
+}
+
+# Address columns are taken from a batch row together, and only from one
+# with a full location: a listing with a state but no city never moves a
+# provider to another state
+ADDRESS_COLUMNS = ['street', 'city', 'state', 'countryCode']
+
+# Row of a key held by more than one master row (a chain's shared website),
+# and of a key no row holds
+AMBIGUOUS = -1
+UNKNOWN = -2
+
+
+def index_path(master_path):
+    return os.path.splitext(master_path)[0] + '.ingest-index.npz'
+
+
+def _hashes(values):
+    return pd.util.hash_array(np.asarray(values, dtype=object)) if len(values) else np.zeros(0, dtype=np.uint64)
+
+
+# Hash of each row's fields, in master column order
+def row_hashes(rows):
+    return _hashes(['\x1f'.join(row) for row in rows])
+
+
+# Hash of '<kind>:<key>' for every key, 0 where a row has none
+def key_hashes(kind, keys):
+    hashes = _hashes([f"{kind}:{key}" for key in keys])
+    hashes[np.array([key == '' for key in keys], dtype=bool)] = 0
+    return hashes
+
+
+# Columns the keys are derived from
+KEY_COLUMNS = ['googlePlaceId', 'url', 'phone', 'website']
+
+
+# Key of every kind for each row of `rows` ('' where a row has none)
+def row_keys(rows, header):
+    positions = [header.index(col) for col in KEY_COLUMNS if col in header]
+    df = pd.DataFrame([[row[i] for i in positions] for row in rows],
+                      columns=[header[i] for i in positions], dtype=object)
+    df = df.mask(df == '')
+    empty = [''] * len(df)
+    return {
+        'place': place_ids(df).tolist(),
+        'phone': phone_keys(df['phone']).tolist() if 'phone' in df else empty,
+        'host': host_keys(df['website']).tolist() if 'website' in df else empty,
+    }
+
+
+def _in_sorted(sorted_hashes, hashes):
+    if not len(sorted_hashes):
+        return np.zeros(len(hashes), dtype=bool), np.zeros(len(hashes), dtype=np.int64)
+    positions = np.searchsorted(sorted_hashes, hashes)
+    clipped = np.minimum(positions, len(sorted_hashes) - 1)
+    return sorted_hashes[clipped] == hashes, clipped
+
+
+# Byte span (start, length) of every CSV record. A newline ends a record only
+# outside quotes, i.e. after an even number of '"' ('""' escapes keep the
+# parity), so finding the records is two numpy searches instead of a parse.
+def record_spans(data):
+    raw = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(raw == 10)
+    quotes = np.flatnonzero(raw == 34)
+    ends = newlines[np.searchsorted(quotes, newlines) % 2 == 0] + 1
+    if len(data) and (not len(ends) or ends[-1] != len(data)):
+        ends = np.append(ends, len(data))
+    starts = np.concatenate([[0], ends[:-1]]).astype(np.int64)
+    return starts, ends - starts
+
+
+def parse_record(data, width=None):
+    fields = next(csv.reader(io.StringIO(data.decode('utf-8-sig'))), [])
+    return fields if width is None else (fields + [''] * width)[:width]
+
+
+def format_rows(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+def _number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+# A flag as the master spells it: read_csv takes TRUE, true and True alike
+# and to_csv writes True
+def _flag_text(value):
+    flag = FLAG_VALUES.get(value)
+    return value if flag is None else str(flag)
+
+
+# Merge one batch row into a master row, column by column
+def merge_row(master, batch, header, precedence):
+    merged = list(master)
+    located = all(batch[header.index(col)] != '' for col in ('city', 'state') if col in header)
+    for i, col in enumerate(header):
+        new, old = batch[i], master[i]
+        if col in FLAG_COLUMNS:
+            new, old = _flag_text(new), _flag_text(old)
+        if new == '' or new == old or (_number(new) is not None and _number(new) == _number(old)):
+            continue
+        if col in ADDRESS_COLUMNS and old != '' and not located:
+            continue
+        policy = precedence.get(col, precedence.get('*', 'batch'))
+        if old == '' or policy == 'batch':
+            merged[i] = new
+        elif policy == 'max':
+            a, b = _number(new), _number(old)
+            if a is not None and (b is None or a > b):
+                merged[i] = new
+        elif policy == 'longest' and len(new) > len(old):
+            merged[i] = new
+    return merged
+
+
+# Run the cleaning rules over rows about to be written (a master table
+# without the columns they use is written as given)
+def clean_rows(rows, header):
+    flags = {i for i, col in enumerate(header) if col in FLAG_COLUMNS}
+    rows = [[_flag_text(value) if i in flags else value for i, value in enumerate(row)] for row in rows]
+    needed = {col for _, col, _, _ in CLEANING_RULES} | set(CRITICAL_FIELDS) | {'bio'}
+    if not rows or not needed <= set(header):
+        return rows
+    df = pd.DataFrame(rows, columns=header, dtype=object)
+    df = df.mask(df == '')
+    apply_cleaning_rules(df)
+    return df.fillna('').astype(str).values.tolist()
+
+
+def load_precedence(path=None):
+    precedence = dict(DEFAULT_PRECEDENCE)
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            precedence.update(json.load(f))
+    bad = {col: policy for col, policy in precedence.items() if policy not in PRECEDENCE_POLICIES}
+    if bad:
+        raise ValueError(f"Unknown precedence policies: {bad} (expected one of {PRECEDENCE_POLICIES})")
+    return precedence
+
+
+# Persistent key index of a master CSV. Sorted arrays, so a batch is looked
+# up with one searchsorted per key kind.
+class KeyIndex:
+    def __init__(self, header):
+        self.header = header
+        self.key_hashes = np.zeros(0, dtype=np.uint64)
+        self.key_rows = np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(0, dtype=np.int64)
+        self.lengths = np.zeros(0, dtype=np.int64)
+        self.place_hashes = np.zeros(0, dtype=np.uint64)
+        self.seen = np.zeros(0, dtype=np.uint64)
+        # Every (key hash, row) pair of an ambiguous key, sorted, so a key is
+        # handed back to its last row when the others drop it
+        self.shared_hashes = np.zeros(0, dtype=np.uint64)
+        self.shared_rows = np.zeros(0, dtype=np.int64)
+        self.master_size = 0
+        self.master_mtime = 0
+
+    def __len__(self):
+        return len(self.offsets)
+
+    # Master row of each key hash (AMBIGUOUS or UNKNOWN)
+    def lookup(self, hashes):
+        found, positions = _in_sorted(self.key_hashes, hashes)
+        rows = self.key_rows[positions] if len(self.key_rows) else np.zeros(len(hashes), dtype=np.int64)
+        return np.where(found & (hashes != 0), rows, UNKNOWN)
+
+    # Point each key hash at its row; a key claimed by two rows becomes
+    # ambiguous
+    def add_keys(self, hashes, rows):
+        keep = hashes != 0
+        hashes, rows = hashes[keep], rows[keep]
+        unique, inverse = np.unique(hashes, return_inverse=True)
+        low = np.full(len(unique), np.iinfo(np.int64).max)
+        high = np.full(len(unique), AMBIGUOUS, dtype=np.int64)
+        np.minimum.at(low, inverse, rows)
+        np.maximum.at(high, inverse, rows)
+        owners = np.where(low == high, low, AMBIGUOUS)
+
+        found, positions = _in_sorted(self.key_hashes, unique)
+        clash = found & (self.key_rows[positions] != owners) if len(self.key_rows) else found
+        previous = self.key_rows[positions[clash]] if len(self.key_rows) else np.zeros(0, dtype=np.int64)
+        self.key_rows[positions[clash]] = AMBIGUOUS
+        insert_at = np.searchsorted(self.key_hashes, unique[~found])
+        self.key_hashes = np.insert(self.key_hashes, insert_at, unique[~found])
+        self.key_rows = np.insert(self.key_rows, insert_at, owners[~found])
+
+        # Remember who holds the keys that are now ambiguous
+        shared = self.lookup(hashes) == AMBIGUOUS
+        was_owned = previous != AMBIGUOUS
+        self._add_shared(np.concatenate([hashes[shared], unique[clash][was_owned]]),
+                         np.concatenate([rows[shared], previous[was_owned]]))
+
+    def _add_shared(self, hashes, rows):
+        hashes = np.concatenate([self.shared_hashes, hashes])
+        rows = np.concatenate([self.shared_rows, rows])
+        order = np.lexsort((rows, hashes))
+        hashes, rows = hashes[order], rows[order]
+        first = np.ones(len(hashes), dtype=bool)
+        first[1:] = (hashes[1:] != hashes[:-1]) | (rows[1:] != rows[:-1])
+        self.shared_hashes, self.shared_rows = hashes[first], rows[first]
+
+    # Drop the keys rows no longer hold. An ambiguous key goes back to its
+    # last remaining row, or away with the last one.
+    def remove_keys(self, hashes, rows):
+        found, positions = _in_sorted(self.key_hashes, hashes)
+        found &= hashes != 0
+        if not found.any():
+            return
+        holders = self.key_rows[positions]
+        owned = found & (holders == rows)
+        shared = found & (holders == AMBIGUOUS)
+
+        dropped = set(zip(hashes[shared].tolist(), rows[shared].tolist()))
+        keep = np.array([pair not in dropped for pair in zip(self.shared_hashes.tolist(), self.shared_rows.tolist())],
+                        dtype=bool)
+        self.shared_hashes, self.shared_rows = self.shared_hashes[keep], self.shared_rows[keep]
+        affected = np.unique(hashes[shared])
+        left = np.searchsorted(self.shared_hashes, affected, side='right') - \
+            np.searchsorted(self.shared_hashes, affected, side='left')
+        at = np.searchsorted(self.key_hashes, affected)
+        last = np.searchsorted(self.shared_hashes, affected[left == 1])
+        self.key_rows[at[left == 1]] = self.shared_rows[last]
+        self.shared_hashes = np.delete(self.shared_hashes, last)
+        self.shared_rows = np.delete(self.shared_rows, last)
+
+        gone = np.concatenate([positions[owned], at[left == 0]])
+        self.key_hashes = np.delete(self.key_hashes, gone)
+        self.key_rows = np.delete(self.key_rows, gone)
+
+    def is_seen(self, hashes):
+        return _in_sorted(self.seen, hashes)[0]
+
+    def mark_seen(self, hashes):
+        hashes = np.unique(hashes)
+        hashes = hashes[~self.is_seen(hashes)]
+        self.seen = np.insert(self.seen, np.searchsorted(self.seen, hashes), hashes)
+
+    # New rows: spans after the current end of the master, and their keys
+    def add_rows(self, start, lengths, keys):
+        first = len(self.offsets)
+        rows = np.arange(first, first + len(lengths))
+        self.offsets = np.append(self.offsets, start + np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64))
+        self.lengths = np.append(self.lengths, np.asarray(lengths, dtype=np.int64))
+        self.place_hashes = np.append(self.place_hashes, key_hashes('place', keys['place']))
+        self.add_row_keys(keys, rows)
+
+    def add_row_keys(self, keys, rows):
+        hashes = np.concatenate([key_hashes(kind, keys[kind]) for kind in KEY_KINDS])
+        self.add_keys(hashes, np.tile(np.asarray(rows, dtype=np.int64), len(KEY_KINDS)))
+
+    def remove_row_keys(self, keys, rows):
+        hashes = np.concatenate([key_hashes(kind, keys[kind]) for kind in KEY_KINDS])
+        self.remove_keys(hashes, np.tile(np.asarray(rows, dtype=np.int64), len(KEY_KINDS)))
+
+    # Rows rewritten in place: later rows move by the change in length
+    def resize_rows(self, rows, lengths):
+        rows = np.asarray(rows, dtype=np.int64)
+        shift = np.zeros(len(self.offsets) + 1, dtype=np.int64)
+        np.add.at(shift, rows + 1, np.asarray(lengths, dtype=np.int64) - self.lengths[rows])
+        self.offsets += np.cumsum(shift)[:-1]
+        self.lengths[rows] = lengths
+
+    def matches(self, master_path):
+        stat = os.stat(master_path)
+        return stat.st_size == self.master_size and stat.st_mtime_ns == self.master_mtime
+
+    def touch(self, master_path):
+        stat = os.stat(master_path)
+        self.master_size, self.master_mtime = stat.st_size, stat.st_mtime_ns
+
+    def save(self, path):
+        meta = {'format': INDEX_FORMAT, 'header': self.header,
+                'master_size': self.master_size, 'master_mtime': self.master_mtime}
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, meta=np.array(json.dumps(meta)), key_hashes=self.key_hashes, key_rows=self.key_rows,
+                 offsets=self.offsets, lengths=self.lengths, place_hashes=self.place_hashes, seen=self.seen,
+                 shared_hashes=self.shared_hashes, shared_rows=self.shared_rows)
+        os.replace(tmp_path, path)
+
+    # Saved index, or None when it is missing or of another format
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('format') != INDEX_FORMAT:
+                return None
+            index = cls(meta['header'])
+            for name in ('key_hashes', 'key_rows', 'offsets', 'lengths', 'place_hashes', 'seen',
+                         'shared_hashes', 'shared_rows'):
+                setattr(index, name, data[name])
+        index.master_size, index.master_mtime = meta['master_size'], meta['master_mtime']
+        return index
+
+    # Index of an existing master, from one full scan
+    @classmethod
+    def build(cls, master_path):
+        with open(master_path, 'rb') as f:
+            data = f.read()
+        starts, lengths = record_spans(data)
+        records = list(csv.reader(io.StringIO(data.decode('utf-8-sig'))))
+        if len(records) != len(starts):
+            records = [parse_record(data[s:s + n]) for s, n in zip(starts, lengths)]
+        header = records[0] if records else []
+        index = cls(header)
+        width = len(header)
+        rows = [row if len(row) == width else (row + [''] * width)[:width] for row in records[1:]]
+        index.add_rows(int(lengths[0]) if len(starts) else 0, lengths[1:], row_keys(rows, header))
+        index.seen = np.unique(row_hashes(rows))
+        index.touch(master_path)
+        return index
+
+
+# Saved index of `master_path`, rebuilt when stale
+def open_index(master_path, path=None, rebuild=False):
+    path = path or index_path(master_path)
+    index = None if rebuild else KeyIndex.load(path)
+    if index is None or not index.matches(master_path):
+        return KeyIndex.build(master_path), True
+    return index, False
+
+
+def read_batch(path):
+    try:
+        batch = pd.read_csv(path, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+    except pd.errors.ParserError as e:
+        raise SystemExit(f"{path}: {e}\nRealign it first: python column_shift.py --input {path}")
+    return batch.rename(columns=COLUMN_ALIASES)
+
+
+def _copy(src, dst, size, block=1 << 20):
+    while size > 0:
+        data = src.read(min(block, size))
+        if not data:
+            break
+        dst.write(data)
+        size -= len(data)
+
+
+# Rewrite the master with `updates` ({row: bytes}) spliced in and `appended`
+# added at the end; returns where the appended rows start
+def write_master(master_path, index, updates, appended):
+    size = os.path.getsize(master_path)
+    with open(master_path, 'rb') as f:
+        f.seek(max(size - 1, 0))
+        separator = b'' if size == 0 or f.read(1) == b'\n' else b'\n'
+    if updates and max(updates) == len(index) - 1:
+        separator = b''
+
+    if not updates:
+        with open(master_path, 'ab') as f:
+            f.write(separator + appended)
+        return size + len(separator)
+
+    tmp_path = f"{master_path}.tmp"
+    with open(master_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        position = 0
+        for row in sorted(updates):
+            _copy(src, dst, int(index.offsets[row]) - position)
+            dst.write(updates[row])
+            position = int(index.offsets[row] + index.lengths[row])
+            src.seek(position)
+        shutil.copyfileobj(src, dst, 1 << 20)
+        growth = sum(len(data) - int(index.lengths[row]) for row, data in updates.items())
+        dst.write(separator + appended)
+    os.replace(tmp_path, master_path)
+    return size + growth + len(separator)
+
+
+# Upsert one batch (a DataFrame of strings) into the master. Returns stats.
+def ingest_batch(master_path, index, batch, precedence, dry_run=False):
+    header = index.header
+    stats = {'rows': len(batch), 'seen': 0, 'unchanged': 0, 'updated': 0, 'inserted': 0, 'ambiguous': 0,
+             'ignored_columns': [col for col in batch.columns if col not in header]}
+    rows = batch.reindex(columns=header, fill_value='').values.tolist()
+    hashes = row_hashes(rows)
+    seen = index.is_seen(hashes)
+    stats['seen'] = int(seen.sum())
+
+    pending = [row for row, known in zip(rows, seen) if not known]
+    keys = row_keys(pending, header)
+    hashes_by_kind = {kind: key_hashes(kind, keys[kind]) for kind in KEY_KINDS}
+    master_rows = {kind: index.lookup(hashes_by_kind[kind]) for kind in KEY_KINDS}
+
+    # Match each row to a master row or to a row added earlier in the batch
+    originals, merged, inserts = {}, {}, []
+    batch_owners = {}
+    with open(master_path, 'rb') as f:
+        for i, row in enumerate(pending):
+            place = hashes_by_kind['place'][i]
+            target = None
+            shared = False
+            for kind in KEY_KINDS:
+                key = hashes_by_kind[kind][i]
+                if not key:
+                    continue
+                number = master_rows[kind][i]
+                if number == AMBIGUOUS:
+                    shared = True
+                    continue
+                candidate = batch_owners.get(key)
+                if candidate is None and number != UNKNOWN:
+                    candidate = ('master', int(number))
+                if candidate is None:
+                    continue
+                # Two different place ids are two listings, whatever else they share
+                other = (index.place_hashes[candidate[1]] if candidate[0] == 'master'
+                         else inserts[candidate[1]][1])
+                if place and other and place != other:
+                    continue
+                target = candidate
+                break
+
+            # A row known only by keys several providers share can't be placed
+            if target is None and shared and not place:
+                stats['ambiguous'] += 1
+                continue
+            if target is None:
+                inserts.append((row, place))
+                target = ('new', len(inserts) - 1)
+            elif target[0] == 'master':
+                number = target[1]
+                if number not in originals:
+                    f.seek(int(index.offsets[number]))
+                    originals[number] = parse_record(f.read(int(index.lengths[number])), len(header))
+                merged[number] = merge_row(merged.get(number, originals[number]), row, header, precedence)
+            else:
+                current, current_place = inserts[target[1]]
+                inserts[target[1]] = (merge_row(current, row, header, precedence), current_place or place)
+            for kind in KEY_KINDS:
+                if hashes_by_kind[kind][i]:
+                    batch_owners.setdefault(hashes_by_kind[kind][i], target)
+
+    numbers = list(merged)
+    cleaned = clean_rows([merged[n] for n in numbers] + [row for row, _ in inserts], header)
+    updated = {n: row for n, row in zip(numbers, cleaned) if row != originals[n]}
+    new_rows = cleaned[len(numbers):]
+    stats['updated'], stats['inserted'] = len(updated), len(new_rows)
+    stats['unchanged'] = len(numbers) - len(updated)
+    if dry_run or not (updated or new_rows):
+        if not dry_run:
+            index.mark_seen(hashes)
+        return stats
+
+    updates = {n: format_rows([row]) for n, row in updated.items()}
+    appended = [format_rows([row]) for row in new_rows]
+    start = write_master(master_path, index, updates, b''.join(appended))
+
+    if updates:
+        index.resize_rows(list(updates), [len(data) for data in updates.values()])
+        keys = row_keys(list(updated.values()), header)
+        changed = np.array(list(updated), dtype=np.int64)
+        places = key_hashes('place', keys['place'])
+        index.place_hashes[changed] = np.where(index.place_hashes[changed] == 0, places, index.place_hashes[changed])
+        # A merged phone or website replaces the row's old key
+        index.remove_row_keys(row_keys([originals[n] for n in updated], header), changed)
+        index.add_row_keys(keys, changed)
+    if new_rows:
+        # The newline added after a last row that had none is now part of it
+        if len(index):
+            index.lengths[-1] = start - index.offsets[-1]
+        index.add_rows(start, [len(data) for data in appended], row_keys(new_rows, header))
+    index.mark_seen(np.concatenate([hashes, row_hashes(list(updated.values()) + new_rows)]))
+    index.touch(master_path)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Upsert crawler batches into the master provider table')
+    parser.add_argument('batches', nargs='+', help='Batch CSVs, ingested in order')
+    parser.add_argument('--master', default='cleaned_providers.csv')
+    parser.add_argument('--index', help='Key index file (default: next to the master, *.ingest-index.npz)')
+    parser.add_argument('--precedence', help='JSON file of {column: policy} overriding the default precedence')
+    parser.add_argument('--rebuild-index', action='store_true', help='Rebuild the key index from the master')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+    args = parser.parse_args()
+    path = args.index or index_path(args.master)
+    precedence = load_precedence(args.precedence)
+
+    print("=" * 80)
+    print("PROVIDER INGEST")
+    print("=" * 80)
+    start = time.perf_counter()
+    index, rebuilt = open_index(args.master, path, args.rebuild_index)
+    print(f"Master: {args.master} ({len(index)} rows, {len(index.key_hashes)} keys, "
+          f"index {'rebuilt' if rebuilt else 'loaded'} in {(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    for batch_path in args.batches:
+        batch_start = time.perf_counter()
+        stats = ingest_batch(args.master, index, read_batch(batch_path), precedence, args.dry_run)
+        elapsed = time.perf_counter() - batch_start
+        print(f"\n{batch_path}: {stats['rows']} rows in {elapsed * 1000:.0f} ms")
+        print(f"  Already ingested: {stats['seen']}")
+        print(f"  Matched, unchanged: {stats['unchanged']}")
+        print(f"  Updated: {stats['updated']}")
+        print(f"  Inserted: {stats['inserted']}")
+        print(f"  Skipped, matching several providers: {stats['ambiguous']}")
+        if stats['ignored_columns']:
+            print(f"  Columns not in the master (ignored): {', '.join(stats['ignored_columns'])}")
+
+    if args.dry_run:
+        print("\n[OK] Dry run, nothing written")
+        return
+    index.save(path)
+    print(f"\n[OK] Master: {args.master} ({len(index)} rows)")
+    print(f"[OK] Key index: {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+import argparse
+import hashlib
+import json
+import os
+import textwrap
+
+# Incremental reading and writing of the provider JSON arrays
+# (data/providers.json and its backups, public/data/providers.json).
+#
+# The writer serializes one provider at a time and sends the bytes to every
+# target at once, so an export never exists as one big string and is never
+# serialized twice. The reader walks an existing array file a block at a
+# time and yields its elements (or their raw text) one by one. Either way
+# memory holds a block and a provider, whatever the size of the file.
+#
+# Arrays are laid out as json.dump(providers, indent=2) writes them, or with
+# compact=True one provider per line:
+#
+#   [\n  {\n    "id": ...\n  },\n  {...}\n]      [\n{"id":...},\n{...}\n]
+
+READ_BLOCK = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\r\n'
+
+
+# One array element as it appears in the file, from its opening brace
+def serialize(provider, compact=False):
+    if compact:
+        return json.dumps(provider, ensure_ascii=False, separators=(',', ':'))
+    return textwrap.indent(json.dumps(provider, indent=2, ensure_ascii=False), '  ')[2:]
+
+
+def file_sha256(path, block_size=1 << 20):
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# (value, raw text) of every element of the JSON array in `path`
+def _elements(path, block_size=READ_BLOCK):
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(block_size).lstrip(_WHITESPACE + '\ufeff')
+        if not buffer.startswith('['):
+            raise ValueError(f"{path}: not a JSON array")
+        position, eof = 1, False
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE + ',':
+                position += 1
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                value, end = _decoder.raw_decode(buffer, position)
+                # A number may continue in the next block
+                complete = end < len(buffer) or eof
+            except json.JSONDecodeError:
+                complete = False
+            if complete:
+                yield value, buffer[position:end]
+                position = end
+                continue
+            if eof:
+                raise ValueError(f"{path}: truncated JSON array")
+            block = f.read(block_size)
+            eof = not block
+            buffer = buffer[position:] + block
+            position = 0
+
+
+# Every element of the JSON array in `path`, without loading the array
+def iter_json_array(path, block_size=READ_BLOCK):
+    for value, _ in _elements(path, block_size):
+        yield value
+
+
+# Raw text of every element, from its opening brace (as serialize() returns it)
+def iter_elements(path, block_size=READ_BLOCK):
+    elements = _elements(path, block_size)
+    try:
+        for _, text in elements:
+            yield text
+    finally:
+        # Closing this generator early closes the file too
+        elements.close()
+
+
+# Writes one JSON array to several files in a single pass. Each target is
+# written to a temp file and renamed into place on close(); a target that
+# already holds exactly these bytes is left untouched, so its mtime (and any
+# cache validator) stays put.
+class JsonArrayWriter:
+    def __init__(self, paths, compact=False):
+        self.paths = list(paths)
+        self.compact = compact
+        self.prefix = '' if compact else '  '
+        self.count = 0
+        self.digest = hashlib.sha256()
+        self.files = []
+        for path in self.paths:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self.files.append(open(f"{path}.tmp", 'wb'))
+
+    def _emit(self, text):
+        data = text.encode('utf-8')
+        self.digest.update(data)
+        for f in self.files:
+            f.write(data)
+
+    # Append one element given as serialize() text; returns the fragment as
+    # laid out in the file
+    def write_text(self, text):
+        fragment = self.prefix + text
+        self._emit(('[\n' if self.count == 0 else ',\n') + fragment)
+        self.count += 1
+        return fragment
+
+    def write(self, provider):
+        return self.write_text(serialize(provider, self.compact))
+
+    # Finish every target; returns the sha256 of the array and the paths
+    # that were replaced
+    def close(self):
+        self._emit('\n]' if self.count else '[]')
+        for f in self.files:
+            f.close()
+        output_hash = self.digest.hexdigest()
+        written = []
+        for path in self.paths:
+            if file_sha256(path) == output_hash:
+                os.remove(f"{path}.tmp")
+            else:
+                os.replace(f"{path}.tmp", path)
+                written.append(path)
+        self.files = []
+        return output_hash, written
+
+    def abort(self):
+        for path, f in zip(self.paths, self.files):
+            f.close()
+            os.remove(f"{path}.tmp")
+        self.files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self.files:
+            self.abort()
+
+
+def _matches(provider, filters):
+    for field, expected in filters:
+        value = provider
+        for part in field.split('.'):
+            value = value.get(part) if isinstance(value, dict) else None
+        if str(value).lower() != expected.lower():
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print providers from a provider JSON array without loading it')
+    parser.add_argument('path', help='e.g. data/providers-backup.json')
+    parser.add_argument('--where', action='append', default=[], metavar='FIELD=VALUE',
+                        help='Only providers whose field equals the value (case-insensitive, dotted paths: address.state)')
+    parser.add_argument('--limit', type=int, default=5, help='Stop after this many matches (0: no limit)')
+    parser.add_argument('--count', action='store_true', help='Only count the matches')
+    args = parser.parse_args()
+    filters = [tuple(condition.split('=', 1)) for condition in args.where]
+
+    matches = 0
+    for provider in iter_json_array(args.path):
+        if not _matches(provider, filters):
+            continue
+        matches += 1
+        if not args.count:
+            print(json.dumps(provider, indent=2, ensure_ascii=False))
+            if args.limit and matches >= args.limit:
+                break
+    if args.count:
+        print(f"{matches} matching providers in {args.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+from provider_snapshot import load_providers
+
+# Canonical typed schema for provider frames.
+#
+# The CSV keeps every field as loosely typed text: `state` mixes 'CA' and
+# 'California', the flags are 'Yes'/'No'/'Unknown' or True/False, and numbers
+# arrive as floats or strings depending on the batch. apply_schema() turns a
+# frame into:
+#
+#   state                 2-letter categorical (anything unrecognised -> missing)
+#   flag columns          nullable boolean ('Unknown' / empty -> missing)
+#   numeric columns       float32 or nullable integers
+#   low-cardinality text  categorical
+#
+# Filtering on state is then a comparison of small integer codes.
+
+# State mapping
+STATE_NAMES = {
+    'AL': 'Alabama', 'AK': 'Alaska', 'AZ': 'Arizona', 'AR': 'Arkansas', 'CA': 'California',
+    'CO': 'Colorado', 'CT': 'Connecticut', 'DE': 'Delaware', 'FL': 'Florida', 'GA': 'Georgia',
+    'HI': 'Hawaii', 'ID': 'Idaho', 'IL': 'Illinois', 'IN': 'Indiana', 'IA': 'Iowa',
+    'KS': 'Kansas', 'KY': 'Kentucky', 'LA': 'Louisiana', 'ME': 'Maine', 'MD': 'Maryland',
+    'MA': 'Massachusetts', 'MI': 'Michigan', 'MN': 'Minnesota', 'MS': 'Mississippi', 'MO': 'Missouri',
+    'MT': 'Montana', 'NE': 'Nebraska', 'NV': 'Nevada', 'NH': 'New Hampshire', 'NJ': 'New Jersey',
+    'NM': 'New Mexico', 'NY': 'New York', 'NC': 'North Carolina', 'ND': 'North Dakota', 'OH': 'Ohio',
+    'OK': 'Oklahoma', 'OR': 'Oregon', 'PA': 'Pennsylvania', 'RI': 'Rhode Island', 'SC': 'South Carolina',
+    'SD': 'South Dakota', 'TN': 'Tennessee', 'TX': 'Texas', 'UT': 'Utah', 'VT': 'Vermont',
+    'VA': 'Virginia', 'WA': 'Washington', 'WV': 'West Virginia', 'WI': 'Wisconsin', 'WY': 'Wyoming'
+}
+
+STATE_CODES = {**STATE_NAMES, 'DC': 'District of Columbia', 'PR': 'Puerto Rico'}
+STATE_DTYPE = pd.CategoricalDtype(sorted(STATE_CODES))
+
+STATE_ALIASES = {name.lower(): code for code, name in STATE_CODES.items()}
+STATE_ALIASES.update({code.lower(): code for code in STATE_CODES})
+STATE_ALIASES.update({'washington dc': 'DC', 'washington d.c.': 'DC', 'd.c.': 'DC'})
+
+FLAG_COLUMNS = ['is_mobile_phlebotomy', 'is_nationwide', 'emergencyAvailable', 'weekendAvailable']
+FLAG_VALUES = {'yes': True, 'true': True, 'y': True, '1': True, 'no': False, 'false': False, 'n': False, '0': False}
+
+NUMERIC_TYPES = {
+    'totalScore': 'float32',
+    'reviewsCount': 'Int32',
+    'serviceRadius': 'float32',
+    'foundedYear': 'Int16',
+    'teamSize': 'Int32',
+    'yearsExperience': 'Int16',
+}
+
+CATEGORY_COLUMNS = ['countryCode', 'categoryName', 'certifications', 'specialties', 'languages', 'travelFee']
+
+
+# 2-letter state codes as a categorical; full names and any casing accepted
+def state_codes(series):
+    if isinstance(series.dtype, pd.CategoricalDtype) and series.dtype == STATE_DTYPE:
+        return series
+    keys = series.astype(object).where(series.notna(), '').astype(str).str.strip().str.lower()
+    return keys.map(STATE_ALIASES).astype(STATE_DTYPE)
+
+
+# Yes/No/True/False text (or real booleans) as a nullable boolean column
+def parse_flags(series):
+    if series.dtype == 'boolean':
+        return series
+    if series.dtype == np.bool_:
+        return series.astype('boolean')
+    keys = series.astype(object).where(series.notna(), '').astype(str).str.strip().str.lower()
+    return keys.map(FLAG_VALUES).astype('boolean')
+
+
+def _to_numeric(series, dtype):
+    values = pd.to_numeric(series, errors='coerce')
+    if dtype.startswith('Int'):
+        # Fractional values are not valid counts or years
+        values = values.where(values.isna() | (values == values.round()))
+    return values.astype(dtype)
+
+
+# Return `df` with the canonical dtypes applied to the columns it has.
+# Idempotent, so typed frames can be passed through again safely.
+def apply_schema(df):
+    typed = {}
+    if 'state' in df:
+        typed['state'] = state_codes(df['state'])
+    for col in FLAG_COLUMNS:
+        if col in df:
+            typed[col] = parse_flags(df[col])
+    for col, dtype in NUMERIC_TYPES.items():
+        if col in df:
+            typed[col] = _to_numeric(df[col], dtype)
+    for col in CATEGORY_COLUMNS:
+        if col in df and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            typed[col] = df[col].astype('category')
+    return df.assign(**typed) if typed else df
+
+
+# load_providers() with the canonical schema applied
+def load_typed_providers(csv_path, columns=None):
+    return apply_schema(load_providers(csv_path, columns))
+
+
+def memory_per_row(df):
+    return df.memory_usage(deep=True).sum() / max(len(df), 1)
+
+
+if __name__ == '__main__':
+    raw = load_providers('cleaned_providers.csv')
+    typed = apply_schema(raw)
+    print(f"Rows: {len(raw)}")
+    print(f"Memory per row: {memory_per_row(raw):.0f} bytes raw, {memory_per_row(typed):.0f} bytes typed")
+    print(f"Unrecognised states: {int(typed['state'].isna().sum() - raw['state'].isna().sum())}")
+    for col in FLAG_COLUMNS:
+        if col in typed:
+            counts = typed[col].value_counts(dropna=False)
+            print(f"  {col}: {counts.get(True, 0)} yes, {counts.get(False, 0)} no, {int(typed[col].isna().sum())} unknown")
@@ -0,0 +1,275 @@
+import argparse
+import json
+import math
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from field_normalizers import slugify
+from provider_shards import write_atomic
+from provider_snapshot import load_providers
+
+# Full-text search over the provider table, prebuilt as a static file.
+#
+# Every provider is a document made of weighted fields (name counts three
+# times as much as bio text, say) and ranked with BM25F: per field, term
+# frequencies are normalized by the field's length against its average,
+# weighted, summed, and saturated once per term. Text is folded to ASCII,
+# lowercased, split on anything that is not a letter or digit, stripped of
+# stopwords and stemmed with a light suffix stripper, so "Spanish-speaking"
+# finds "spanish" and "speak".
+#
+# The index is one JSON file (public/data/search-index.json by default):
+#
+#   docs        [slug, name, city, state] per provider
+#   lengths     token count per field, per provider
+#   terms       term -> [doc deltas, tf * len(fields) + field], one entry
+#               per field the term occurs in, in document order
+#
+# SearchIndex decodes a term's postings into numpy arrays the first time the
+# term is queried, so a query only touches the postings of its own terms.
+
+SEARCH_INDEX_PATH = 'public/data/search-index.json'
+SEARCH_INDEX_VERSION = 1
+
+# (column, weight); columns missing from the table are left out of the index
+SEARCH_FIELDS = [
+    ('name', 3.0),
+    ('specialties', 2.0),
+    ('languages', 2.0),
+    ('description', 1.0),
+    ('bio', 1.0),
+]
+DOC_COLUMNS = ['name', 'city', 'state']
+
+K1 = 1.2
+B = 0.75
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+STOPWORDS = frozenset('''
+    a an and are as at be by for from has have in is it its of on or our that the their this to we with you your
+'''.split())
+
+# (suffix, replacement) tried in order; the first that applies wins
+SUFFIXES = [
+    ('ational', 'ate'), ('ization', 'ize'), ('fulness', 'ful'), ('iveness', 'ive'),
+    ('ations', 'ate'), ('ation', 'ate'), ('ingly', ''), ('ments', ''), ('ment', ''),
+    ('ness', ''), ('ings', ''), ('ing', ''), ('edly', ''), ('ied', 'y'), ('ies', 'y'),
+    ('ed', ''), ('ly', ''), ('sses', 'ss'), ('es', ''), ('s', ''),
+]
+KEEP_ENDINGS = ('ss', 'us', 'is')
+VOWELS = set('aeiouy')
+
+
+def _is_stem(base):
+    return len(base) >= 3 and bool(VOWELS & set(base))
+
+
+# Light English stemmer: strips one common suffix as long as a syllable
+# (a vowel and at least three letters) is left, undoubles a final consonant
+# left behind ('shipping' -> 'ship') and drops a final 'e' ('nurse',
+# 'nurses' and 'nursing' -> 'nurs'). Not full Porter, but it maps the
+# inflections providers actually write onto one term.
+@lru_cache(maxsize=100_000)
+def stem(word):
+    if len(word) <= 3 or word.isdigit():
+        return word
+    for suffix, replacement in SUFFIXES:
+        if not word.endswith(suffix) or (suffix == 's' and word.endswith(KEEP_ENDINGS)):
+            continue
+        base = word[:-len(suffix)]
+        if not _is_stem(base):
+            continue
+        if (not replacement and len(base) > 3 and base[-1] == base[-2] and
+                base[-1] not in VOWELS and base[-1] not in 'lsz'):
+            base = base[:-1]
+        word = base + replacement
+        break
+    if word.endswith('e') and _is_stem(word[:-1]):
+        word = word[:-1]
+    return word
+
+
+def fold(text):
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii').lower()
+
+
+# Search terms of a piece of text, in order (repeats kept)
+def analyze(text):
+    return [stem(token) for token in TOKEN_PATTERN.findall(fold(text)) if token not in STOPWORDS]
+
+
+def _text_values(series):
+    return series.fillna('').astype(str).where(lambda values: values.str.lower() != 'nan', '')
+
+
+# Builds the index one frame (or one chunk of a frame) at a time
+class SearchIndexBuilder:
+    def __init__(self, fields=SEARCH_FIELDS):
+        self.all_fields = fields
+        self.fields = None
+        self.docs = []
+        self.lengths = None
+        self.postings = {}
+        self.last_doc = {}
+
+    def add(self, df):
+        if self.fields is None:
+            self.fields = [(column, weight) for column, weight in self.all_fields if column in df.columns]
+            self.lengths = [[] for _ in self.fields]
+        named = df[df['name'].notna() & (df['name'].astype(str).str.strip() != '')]
+        docs = [slugify(named['name'])[0].tolist()]
+        docs += [_text_values(named[column]).str.strip().tolist() if column in named else [''] * len(named)
+                 for column in DOC_COLUMNS]
+        texts = [_text_values(named[column]).tolist() for column, _ in self.fields]
+        field_count = len(self.fields)
+
+        for position, doc in enumerate(zip(*docs)):
+            doc_id = len(self.docs)
+            self.docs.append(list(doc))
+            for field, values in enumerate(texts):
+                terms = analyze(values[position])
+                self.lengths[field].append(len(terms))
+                for term, tf in Counter(terms).items():
+                    entries = self.postings.get(term)
+                    if entries is None:
+                        entries = self.postings[term] = ([], [])
+                        self.last_doc[term] = 0
+                    entries[0].append(doc_id - self.last_doc[term])
+                    entries[1].append(tf * field_count + field)
+                    self.last_doc[term] = doc_id
+        return len(named)
+
+    def to_dict(self):
+        fields = self.fields or []
+        return {
+            'version': SEARCH_INDEX_VERSION,
+            'fields': [column for column, _ in fields],
+            'weights': [weight for _, weight in fields],
+            'k1': K1,
+            'b': B,
+            'docs': self.docs,
+            'lengths': self.lengths or [],
+            'terms': {term: [deltas, codes] for term, (deltas, codes) in sorted(self.postings.items())},
+        }
+
+    def write(self, path=SEARCH_INDEX_PATH):
+        write_atomic(path, json.dumps(self.to_dict(), ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        return path
+
+
+def build_search_index(df, path=SEARCH_INDEX_PATH, fields=SEARCH_FIELDS):
+    builder = SearchIndexBuilder(fields)
+    builder.add(df)
+    return builder.write(path)
+
+
+class SearchIndex:
+    def __init__(self, data):
+        if data.get('version') != SEARCH_INDEX_VERSION:
+            raise ValueError(f"Unsupported search index version: {data.get('version')}")
+        self.fields = data['fields']
+        self.weights = np.asarray(data['weights'], dtype=float)
+        self.k1 = data['k1']
+        self.docs = data['docs']
+        self.terms = data['terms']
+        self.decoded = {}
+
+        # Per field and document: weight / (1 - b + b * length / average length)
+        lengths = np.asarray(data['lengths'], dtype=float).reshape(len(self.fields), len(self.docs))
+        averages = lengths.mean(axis=1, keepdims=True) if len(self.docs) else np.ones((len(self.fields), 1))
+        averages[averages == 0] = 1.0
+        self.field_factor = self.weights[:, None] / (1 - data['b'] + data['b'] * lengths / averages)
+
+    @classmethod
+    def load(cls, path=SEARCH_INDEX_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    # (documents, weighted normalized term frequency) for one term
+    def _postings(self, term):
+        if term not in self.decoded:
+            deltas, codes = self.terms[term]
+            docs = np.cumsum(np.asarray(deltas, dtype=np.int64))
+            codes = np.asarray(codes, dtype=np.int64)
+            fields, tfs = codes % len(self.fields), codes // len(self.fields)
+            unique_docs, inverse = np.unique(docs, return_inverse=True)
+            weighted = np.bincount(inverse, weights=tfs * self.field_factor[fields, docs])
+            self.decoded[term] = (unique_docs, weighted)
+        return self.decoded[term]
+
+    # Top `k` providers for the query as (doc, score), best first; doc is
+    # {'slug', 'name', 'city', 'state'}. Any query term may match.
+    def search(self, query, k=10):
+        terms = [term for term in dict.fromkeys(analyze(query)) if term in self.terms]
+        if not terms:
+            return []
+
+        total = len(self.docs)
+        matched, scores = [], []
+        for term in terms:
+            docs, weighted = self._postings(term)
+            idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            matched.append(docs)
+            scores.append(idf * weighted / (self.k1 + weighted))
+        docs, inverse = np.unique(np.concatenate(matched), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(scores))
+
+        if len(docs) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(docs))
+        # Best score first; ties in document order
+        top = top[np.lexsort((docs[top], -scores[top]))]
+        return [(self._doc(docs[i]), float(scores[i])) for i in top]
+
+    def _doc(self, position):
+        slug, name, city, state = self.docs[position]
+        return {'slug': slug, 'name': name, 'city': city, 'state': state}
+
+
+# Columns of `path` the index reads
+def search_columns(path, fields=SEARCH_FIELDS):
+    available = set(pd.read_csv(path, nrows=0).columns)
+    wanted = set(DOC_COLUMNS) | {column for column, _ in fields}
+    return [column for column in available if column in wanted]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Search provider names, bios, specialties and languages')
+    parser.add_argument('queries', nargs='*', help='Queries to run, e.g. "paternity DNA" "spanish speaking"')
+    parser.add_argument('--input', default='cleaned_providers.csv')
+    parser.add_argument('--index', default=SEARCH_INDEX_PATH)
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the index from --input first')
+    parser.add_argument('-k', type=int, default=10, help='Results per query (default: 10)')
+    args = parser.parse_args()
+
+    if args.rebuild or not os.path.exists(args.index):
+        df = load_providers(args.input, search_columns(args.input))
+        start = time.perf_counter()
+        build_search_index(df, args.index)
+        print(f"Indexed {len(df)} providers into {args.index} "
+              f"({os.path.getsize(args.index) / 1024:.0f} KB) in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    index = SearchIndex.load(args.index)
+    print(f"Loaded {len(index.docs)} providers, {len(index.terms)} terms in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    for query in args.queries:
+        start = time.perf_counter()
+        results = index.search(query, args.k)
+        elapsed = time.perf_counter() - start
+        print(f"\n{query!r}: {len(results)} results in {elapsed * 1000:.2f}ms")
+        for doc, score in results:
+            print(f"  {score:6.2f}  {doc['name']} ({doc['city']}, {doc['state']})  /{doc['slug']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import re
+
+# Per-state (and optionally per-metro) shards of the provider export, plus a
+# manifest so a page can fetch only the shard it needs:
+#
+#   public/data/providers/manifest.json
+#   public/data/providers/by-state/<ST>.json
+#   public/data/providers/by-metro/<metro-slug>.json
+
+SHARD_DIR = 'public/data/providers'
+MANIFEST_NAME = 'manifest.json'
+
+METRO_PATTERN = re.compile(r"slug: '([^']+)',\s*city: '([^']+)',\s*state: '[^']*',\s*stateAbbr: '([A-Z]{2})'")
+
+
+# Write through a temp file and rename, so readers never see a partial file
+def write_atomic(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+# Read (slug, city, state abbreviation) for every metro in data/top-metros.ts
+def load_top_metros(path='data/top-metros.ts'):
+    with open(path, 'r', encoding='utf-8') as f:
+        return METRO_PATTERN.findall(f.read())
+
+
+def serves_metro(provider, city, state_abbr):
+    if provider['address']['state'] != state_abbr:
+        return False
+    normalized_city = city.lower()
+    return (provider['address']['city'].lower() == normalized_city or
+            normalized_city in provider['coverage']['serviceAreas'].lower())
+
+
+# Same layout as the full export: '[\n' + elements + '\n]'
+def join_fragments(fragments):
+    return ('[\n' + ',\n'.join(fragments) + '\n]' if fragments else '[]').encode('utf-8')
+
+
+def load_manifest(shard_dir=SHARD_DIR):
+    path = os.path.join(shard_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# Write the shards for `providers`, reusing each provider's serialized
+# fragment from the full export. Unchanged shards are not rewritten (so
+# their cache validators stay put), shards that disappeared are removed, and
+# the manifest is replaced last. Returns the manifest and the number of
+# shard files written.
+def write_shards(providers, fragments, export_hash, metros=None, shard_dir=SHARD_DIR):
+    groups = {}
+    for provider, fragment in zip(providers, fragments):
+        state = provider['address']['state']
+        if state:
+            groups.setdefault(f"by-state/{state}.json", []).append(fragment)
+        for slug, city, state_abbr in metros or []:
+            if serves_metro(provider, city, state_abbr):
+                groups.setdefault(f"by-metro/{slug}.json", []).append(fragment)
+
+    previous = load_manifest(shard_dir).get('shards', {})
+    shards = {}
+    written = 0
+    for name in sorted(groups):
+        data = join_fragments(groups[name])
+        digest = hashlib.sha256(data).hexdigest()
+        path = os.path.join(shard_dir, name)
+        if previous.get(name, {}).get('sha256') != digest or not os.path.exists(path):
+            write_atomic(path, data)
+            written += 1
+        shards[name] = {'count': len(groups[name]), 'bytes': len(data), 'sha256': digest}
+
+    manifest = {
+        'export': export_hash,
+        'total': len(providers),
+        'shards': shards,
+    }
+    write_atomic(os.path.join(shard_dir, MANIFEST_NAME),
+                 (json.dumps(manifest, indent=2, sort_keys=True) + '\n').encode('utf-8'))
+
+    for name in set(previous) - set(shards):
+        path = os.path.join(shard_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    return manifest, written
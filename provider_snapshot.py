@@ -0,0 +1,290 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Typed columnar snapshot of a provider CSV.
+#
+# A snapshot is a directory next to the CSV (cleaned_providers.csv ->
+# cleaned_providers.snapshot/) holding one raw little-endian file per column
+# plus manifest.json:
+#
+#   float64 / int64          c<i>.bin          values, memory-mapped on load
+#   flag (True/False/empty)  c<i>.bin          int8: 1, 0, -1 for missing
+#   text                     c<i>.offsets.bin  int64 start offsets, n + 1 of them
+#                            c<i>.data.bin     UTF-8 bytes of all values
+#                            c<i>.valid.bin    bool, False for missing
+#
+# Loading only touches the files of the requested columns, and numeric
+# columns are read straight out of the page cache without a copy. The
+# manifest records the size, mtime and SHA-256 of the CSV it was built from.
+
+SNAPSHOT_VERSION = 1
+MANIFEST = 'manifest.json'
+
+
+def snapshot_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.snapshot'
+
+
+def _column_kind(series):
+    if series.dtype == np.float64:
+        return 'float64'
+    if series.dtype == np.int64:
+        return 'int64'
+    if _is_flag(series):
+        return 'flag'
+    return 'text'
+
+
+def _is_flag(series):
+    if series.dtype == np.bool_:
+        return True
+    values = series.dropna()
+    return len(values) > 0 and values.map(type).eq(bool).all()
+
+
+# Writes a snapshot one frame (or one chunk) at a time. The first chunk fixes
+# the column kinds; later chunks are converted to them.
+class SnapshotWriter:
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = path + '.tmp'
+        self.columns = None
+        self.rows = 0
+        self.files = {}
+        self.text_offsets = {}
+
+        if os.path.exists(self.tmp_path):
+            shutil.rmtree(self.tmp_path)
+        os.makedirs(self.tmp_path)
+
+    def _open(self, name):
+        if name not in self.files:
+            self.files[name] = open(os.path.join(self.tmp_path, name), 'wb')
+        return self.files[name]
+
+    def append(self, df):
+        if self.columns is None:
+            self.columns = [{'name': col, 'kind': _column_kind(df[col])} for col in df.columns]
+            for i, column in enumerate(self.columns):
+                if column['kind'] == 'text':
+                    self.text_offsets[i] = 0
+                    self._open(f'c{i}.offsets.bin').write(np.zeros(1, dtype='<i8').tobytes())
+        elif [column['name'] for column in self.columns] != list(df.columns):
+            raise ValueError(f"Snapshot chunk columns do not match: {list(df.columns)}")
+
+        for i, column in enumerate(self.columns):
+            series = df[column['name']]
+
+            # A flag column that turns out to hold other values too becomes text
+            if column['kind'] == 'flag' and series.notna().any() and not _is_flag(series):
+                self._flags_to_text(i)
+
+            kind = column['kind']
+            if kind in ('float64', 'int64'):
+                values = series.to_numpy(dtype=kind)
+                self._open(f'c{i}.bin').write(values.astype(values.dtype.newbyteorder('<')).tobytes())
+            elif kind == 'flag':
+                values = np.where(series.isna(), -1, series.eq(True)).astype('i1')
+                self._open(f'c{i}.bin').write(values.tobytes())
+            else:
+                self._write_text(i, series)
+
+        self.rows += len(df)
+
+    def _write_text(self, i, values):
+        # Empty strings are stored as missing, exactly as they read back from the CSV
+        encoded = [str(value).encode('utf-8') if isinstance(value, str) or pd.notna(value) else b''
+                   for value in values]
+        lengths = np.fromiter((len(value) for value in encoded), dtype='<i8', count=len(encoded))
+        offsets = self.text_offsets[i] + np.cumsum(lengths)
+        if len(offsets):
+            self.text_offsets[i] = int(offsets[-1])
+        self._open(f'c{i}.data.bin').write(b''.join(encoded))
+        self._open(f'c{i}.offsets.bin').write(offsets.astype('<i8').tobytes())
+        self._open(f'c{i}.valid.bin').write((lengths > 0).tobytes())
+
+    # Re-encode the flags written so far as 'True'/'False' text
+    def _flags_to_text(self, i):
+        self.files.pop(f'c{i}.bin').close()
+        path = os.path.join(self.tmp_path, f'c{i}.bin')
+        flags = np.fromfile(path, dtype='i1')
+        os.remove(path)
+
+        self.columns[i]['kind'] = 'text'
+        self.text_offsets[i] = 0
+        self._open(f'c{i}.offsets.bin').write(np.zeros(1, dtype='<i8').tobytes())
+        self._write_text(i, np.array([np.nan, 'False', 'True'], dtype=object)[flags.astype(np.int64) + 1])
+
+    # Finish the snapshot and swap it into place. `source` is the fingerprint
+    # of the CSV it mirrors, taken once that CSV is completely written.
+    def close(self, source=None):
+        for f in self.files.values():
+            f.close()
+        with open(os.path.join(self.tmp_path, MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': SNAPSHOT_VERSION,
+                'rows': self.rows,
+                'source': source,
+                'columns': self.columns or [],
+            }, f, indent=2)
+
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.replace(self.tmp_path, self.path)
+
+
+def content_hash(csv_path):
+    digest = hashlib.sha256()
+    with open(csv_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(csv_path):
+    stat = os.stat(csv_path)
+    return {'path': os.path.basename(csv_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'sha256': content_hash(csv_path)}
+
+
+# `source` defaults to the CSV's current fingerprint; pass the one taken
+# before parsing when the file could change in between
+def write_snapshot(df, csv_path, source=None):
+    writer = SnapshotWriter(snapshot_path(csv_path))
+    writer.append(df)
+    writer.close(source or source_fingerprint(csv_path))
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version in {path}: {manifest.get('version')}")
+    return manifest
+
+
+def _map(path, dtype, count):
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+
+# Raw column values: a read-only memory map for numeric columns, or
+# (offsets, data, valid) arrays for text columns
+def read_column(path, manifest, name):
+    rows = manifest['rows']
+    for i, column in enumerate(manifest['columns']):
+        if column['name'] != name:
+            continue
+        kind = column['kind']
+        if kind in ('float64', 'int64'):
+            return _map(os.path.join(path, f'c{i}.bin'), np.dtype(kind).newbyteorder('<'), rows)
+        if kind == 'flag':
+            return _map(os.path.join(path, f'c{i}.bin'), 'i1', rows)
+        offsets = _map(os.path.join(path, f'c{i}.offsets.bin'), '<i8', rows + 1)
+        data = _map(os.path.join(path, f'c{i}.data.bin'), 'u1', int(offsets[-1]))
+        valid = _map(os.path.join(path, f'c{i}.valid.bin'), np.bool_, rows)
+        return offsets, data, valid
+    raise KeyError(name)
+
+
+def _to_series(kind, raw):
+    if kind in ('float64', 'int64'):
+        return pd.Series(raw, copy=False)
+    if kind == 'flag':
+        # Plain booleans unless something is missing, like read_csv
+        if not (raw < 0).any():
+            return pd.Series(raw > 0)
+        return pd.Series(np.array([np.nan, False, True], dtype=object)[raw.astype(np.int64) + 1])
+
+    offsets, data, valid = raw
+    blob = data.tobytes()
+    starts, ends = offsets[:-1].tolist(), offsets[1:].tolist()
+    values = [blob[start:end].decode('utf-8') if ok else np.nan
+              for start, end, ok in zip(starts, ends, valid.tolist())]
+    return pd.Series(values, dtype=None if len(values) else object)
+
+
+# Load a snapshot as a DataFrame, optionally projected onto `columns`
+# (kept in file order, like read_csv's usecols)
+def load_snapshot(path, columns=None):
+    manifest = read_manifest(path)
+    wanted = set(columns) if columns is not None else None
+    if wanted is not None:
+        missing = wanted - {column['name'] for column in manifest['columns']}
+        if missing:
+            raise ValueError(f"Columns not in snapshot {path}: {sorted(missing)}")
+
+    data = {}
+    for column in manifest['columns']:
+        if wanted is None or column['name'] in wanted:
+            data[column['name']] = _to_series(column['kind'], read_column(path, manifest, column['name']))
+    return pd.DataFrame(data, index=pd.RangeIndex(manifest['rows']))
+
+
+# Whether the snapshot mirrors the CSV as it is now. Size and mtime decide
+# the common case without reading the file; when only the mtime moved (a
+# checkout, a copy, a touch) the content hash decides, and a match is
+# recorded so the next check is cheap again.
+def is_fresh(csv_path):
+    path = snapshot_path(csv_path)
+    if not os.path.exists(os.path.join(path, MANIFEST)):
+        return False
+    try:
+        manifest = read_manifest(path)
+    except ValueError:
+        return False
+
+    source = manifest.get('source') or {}
+    stat = os.stat(csv_path)
+    if 'sha256' not in source or source.get('size') != stat.st_size:
+        return False
+    if source.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    if content_hash(csv_path) != source['sha256']:
+        return False
+
+    manifest['source']['mtime_ns'] = stat.st_mtime_ns
+    try:
+        _write_manifest(path, manifest)
+    except OSError:
+        pass
+    return True
+
+
+def _write_manifest(path, manifest):
+    tmp_path = os.path.join(path, MANIFEST + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, MANIFEST))
+
+
+# Load a provider CSV through its snapshot, projected onto `columns` (kept
+# in file order, like read_csv's usecols). A missing or stale snapshot is
+# rebuilt from a full parse of the CSV, so only the first load after a change
+# pays for tokenizing it; pass cache=False to leave the snapshot alone.
+def load_providers(csv_path, columns=None, cache=True):
+    if is_fresh(csv_path):
+        return load_snapshot(snapshot_path(csv_path), columns)
+    if not cache:
+        return pd.read_csv(csv_path, usecols=columns)
+
+    source = source_fingerprint(csv_path)
+    df = pd.read_csv(csv_path)
+    try:
+        write_snapshot(df, csv_path, source)
+    except OSError:
+        pass
+
+    if columns is None:
+        return df
+    missing = set(columns) - set(df.columns)
+    if missing:
+        raise ValueError(f"Usecols do not match columns, columns expected but not found: {sorted(missing)}")
+    wanted = set(columns)
+    return df[[col for col in df.columns if col in wanted]]
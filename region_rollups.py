@@ -0,0 +1,143 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+from coverage_matrix import MATRIX_COLUMNS, CoverageMatrix, city_id, provider_keys
+from provider_snapshot import load_providers
+
+# Region rollups for data/regions.json.
+#
+# A region is a list of member cities. Its providers are the union of its
+# members' city-specific providers (address city or a service-area mention,
+# as on the city pages), deduplicated, plus the state-level providers every
+# member city shows. Per-city sets come from one CoverageMatrix pass over the
+# providers and are held as sorted position arrays, so each region is a single
+# concatenate-and-unique instead of a loop over its cities.
+#
+# A member city is in the region's 'state' unless the optional 'cityStates'
+# map names another one ("Newark": "NJ" in the NY-based Tri-State Area), so
+# each city is looked up in its own state only. The region's regional
+# providers come from every state its cities are in.
+
+REGIONS_PATH = 'data/regions.json'
+OUTPUT_PATH = 'data/region-providers.json'
+
+EMPTY = np.zeros(0, dtype=np.int64)
+
+
+def load_regions(path=REGIONS_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# (city, state) for every member city of `region`
+def member_cities(region):
+    city_states = region.get('cityStates', {})
+    return [(city, city_states.get(city, region['state'])) for city in region['cities']]
+
+
+def region_states(region):
+    return list(dict.fromkeys(state for _, state in member_cities(region)))
+
+
+# (city, state) for every member city of every region, in first-seen order
+def region_cities(regions):
+    return list(dict.fromkeys(cell for region in regions for cell in member_cities(region)))
+
+
+def _positions(keys, positions_by_key):
+    return np.array(sorted(positions_by_key[key] for key in keys), dtype=np.int64) if keys else EMPTY
+
+
+def _union(arrays):
+    arrays = [array for array in arrays if len(array)]
+    if not arrays:
+        return EMPTY
+    return arrays[0] if len(arrays) == 1 else np.unique(np.concatenate(arrays))
+
+
+# Rollup for every region: deduplicated counts plus the city-specific
+# providers (positions into `df`), one matrix pass for all of them
+def rollup_regions(df, regions):
+    df = df.reset_index(drop=True)
+    matrix = CoverageMatrix(region_cities(regions))
+    matrix.sync(df)
+    positions_by_key = {key: position for position, key in enumerate(provider_keys(df))}
+
+    by_city = {cell: _positions(keys, positions_by_key) for cell, keys in matrix.by_city.items()}
+    by_state = {state: _positions(keys, positions_by_key) for state, keys in matrix.by_state.items()}
+    nationwide = _positions(matrix.nationwide, positions_by_key)
+
+    rollups = []
+    for region in regions:
+        members = [by_city[city_id(city, state)] for city, state in member_cities(region)]
+        city_specific = _union(members)
+        in_state = _union([by_state.get(state, EMPTY) for state in region_states(region)])
+        rollups.append({
+            'region': region,
+            'city_specific': city_specific,
+            'regional': np.setdiff1d(in_state, city_specific, assume_unique=True),
+            'nationwide': nationwide,
+            'cities_with_providers': sum(1 for member in members if len(member)),
+        })
+    return rollups
+
+
+def to_json(df, rollups):
+    df = df.reset_index(drop=True)
+    keys = provider_keys(df)
+    names = df['name'].fillna('').astype(str).tolist()
+    output = []
+    for rollup in rollups:
+        region = rollup['region']
+        city_specific, regional, nationwide = rollup['city_specific'], rollup['regional'], rollup['nationwide']
+        output.append({
+            'slug': region['slug'],
+            'name': region['name'],
+            'states': region_states(region),
+            'cities': len(region['cities']),
+            'citiesWithProviders': rollup['cities_with_providers'],
+            'counts': {
+                'citySpecific': len(city_specific),
+                'regional': len(regional),
+                'nationwide': len(nationwide),
+                'total': len(city_specific) + len(regional) + len(nationwide),
+            },
+            'providers': [{'key': keys[i], 'name': names[i]} for i in city_specific],
+        })
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Roll provider coverage up to the regions in data/regions.json')
+    parser.add_argument('--input', default='cleaned_providers.csv')
+    parser.add_argument('--regions', default=REGIONS_PATH)
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    df = load_providers(args.input, MATRIX_COLUMNS)
+    regions = load_regions(args.regions)
+    start = time.perf_counter()
+    rollups = rollup_regions(df, regions)
+    elapsed = time.perf_counter() - start
+
+    output = to_json(df, rollups)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+
+    print("=" * 80)
+    print("REGION ROLLUPS")
+    print("=" * 80)
+    for region in output:
+        counts = region['counts']
+        print(f"{region['name']:<24} {counts['total']:>6} providers  ({counts['citySpecific']} city-specific "
+              f"in {region['citiesWithProviders']}/{region['cities']} cities, {counts['regional']} regional, "
+              f"{counts['nationwide']} nationwide)")
+    print(f"\nRolled up {len(regions)} regions over {len(df)} providers in {elapsed * 1000:.1f} ms")
+    print(f"[OK] Written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,60 +1,159 @@
+import argparse
 import csv
+import os
 import re
+import sys
+from collections import deque
+from contextlib import nullcontext
+from multiprocessing import Pool
+
+# The shared pipeline modules live in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline_trace import NULL_TRACE, Trace, add_trace_arguments, check_trace_arguments
+
+# Compiled once per process instead of on every call
+REPEATED_CHAR = re.compile(r'(.)\1{3,}')
+SENTENCE_END = re.compile(r'[.!?]+')
+
 
 def clean_bio(bio):
     if not bio:
         return bio
-    
+
     # Remove excessive emoji repetition (more than 3 of the same character in a row)
-    bio = re.sub(r'(.)\1{3,}', r'\1\1\1', bio)
-    
+    bio = REPEATED_CHAR.sub(r'\1\1\1', bio)
+
     # Remove repetitive sentence patterns
-    sentences = [s.strip() for s in re.split(r'[.!?]+', bio) if s.strip()]
+    sentences = [s.strip() for s in SENTENCE_END.split(bio) if s.strip()]
     cleaned_sentences = []
     seen = {}
-    
+
     for sentence in sentences:
         # Track how many times we've seen this sentence
         if sentence not in seen:
             seen[sentence] = 0
         seen[sentence] += 1
-        
+
         # Only keep up to 2 repetitions
         if seen[sentence] <= 2:
             cleaned_sentences.append(sentence)
-    
+
     bio = '. '.join(cleaned_sentences)
-    
+
     # Truncate if too long (max 800 chars for readability)
     if len(bio) > 800:
         bio = bio[:797] + '...'
-    
+
     return bio.strip()
 
-# Read and clean CSV
-rows = []
-with open('cleaned_providers.csv', 'r', encoding='utf-8', newline='') as f:
-    reader = csv.DictReader(f)
-    fieldnames = reader.fieldnames
-    
+
+def clean_bios(bios):
+    return [clean_bio(bio) for bio in bios]
+
+
+# Stand-in for an AsyncResult when cleaning without worker processes
+class InlineResult:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+# Group the CSV rows into lists of `size` rows
+def read_batches(reader, size):
+    batch = []
     for row in reader:
-        if 'bio' in row:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Write one batch once its cleaned bios are back, printing the providers
+# whose bio shrank by more than 100 characters. Returns the rows written.
+def write_batch(writer, batch, pending):
+    if pending is not None:
+        for row, bio in zip(batch, pending.get()):
             original_length = len(row['bio']) if row['bio'] else 0
-            row['bio'] = clean_bio(row['bio'])
+            row['bio'] = bio
             new_length = len(row['bio']) if row['bio'] else 0
-            
+
             if original_length > new_length + 100:
                 print(f"Cleaned {row['name']}: {original_length} -> {new_length} chars")
-        
-        rows.append(row)
-
-# Write cleaned CSV
-with open('cleaned_providers.csv', 'w', encoding='utf-8', newline='') as f:
-    writer = csv.DictWriter(f, fieldnames=fieldnames)
-    writer.writeheader()
-    writer.writerows(rows)
-
-print(f"\n✅ Processed {len(rows)} providers")
-print("   - Removed excessive emoji repetitions")
-print("   - Removed repetitive sentences")
-print("   - Truncated overly long bios")
+
+    writer.writerows(batch)
+    return len(batch)
+
+
+# Stream `path` through the worker pool in order, writing to `tmp_path`.
+# Returns the number of rows written. With a pool, the 'write' stage also
+# covers waiting for the workers to return each batch.
+def clean_file(path, tmp_path, workers, batch_size, trace=NULL_TRACE):
+    processed = 0
+    with open(path, 'r', encoding='utf-8', newline='') as f, \
+            open(tmp_path, 'w', encoding='utf-8', newline='') as out, \
+            (Pool(workers) if workers > 1 else nullcontext()) as pool:
+        reader = csv.DictReader(f)
+        writer = csv.DictWriter(out, fieldnames=reader.fieldnames)
+        writer.writeheader()
+        has_bio = 'bio' in reader.fieldnames
+
+        # Keep a bounded number of batches in flight so memory stays flat
+        in_flight = deque()
+        for batch in trace.iter('read', read_batches(reader, batch_size), rows=len):
+            pending = None
+            if has_bio:
+                bios = [row['bio'] for row in batch]
+                with trace.stage('submit' if pool else 'clean_bios', rows=len(bios)):
+                    pending = pool.apply_async(clean_bios, (bios,)) if pool else InlineResult(clean_bios(bios))
+            in_flight.append((batch, pending))
+            if len(in_flight) > workers * 2:
+                with trace.stage('write', rows=len(in_flight[0][0])):
+                    processed += write_batch(writer, *in_flight.popleft())
+
+        while in_flight:
+            with trace.stage('write', rows=len(in_flight[0][0])):
+                processed += write_batch(writer, *in_flight.popleft())
+
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Clean provider bios in place')
+    parser.add_argument('--input', default='cleaned_providers.csv',
+                        help='CSV to clean (default: cleaned_providers.csv)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes, 1 cleans in-process (default: one per CPU)')
+    parser.add_argument('--batch-size', type=int, default=2000,
+                        help='Rows sent to a worker at a time (default: 2000)')
+    add_trace_arguments(parser)
+    args = parser.parse_args()
+    check_trace_arguments(parser, args)
+    trace = Trace.from_args('clean-bios', args)
+
+    # The temp file only replaces the input once every row is written, so a
+    # crash leaves the original CSV untouched
+    tmp_path = f"{args.input}.tmp"
+    try:
+        with trace.stage('clean_file') as call:
+            processed = call.rows = clean_file(args.input, tmp_path, args.workers, args.batch_size, trace)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, args.input)
+
+    print(f"\n✅ Processed {processed} providers")
+    print("   - Removed excessive emoji repetitions")
+    print("   - Removed repetitive sentences")
+    print("   - Truncated overly long bios")
+    if trace.close():
+        print(f"   - Timing trace: {args.trace}")
+
+
+if __name__ == '__main__':
+    main()
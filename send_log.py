@@ -0,0 +1,209 @@
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from provider_shards import write_atomic
+
+# Append-only email send log.
+#
+# data/email-send-log.jsonl holds one send per line (the same fields the send
+# scripts have always logged: email, name, campaign, sentAt, status, error),
+# so recording a send is a single appended line instead of a rewrite of the
+# whole log. The index next to it maps (campaign, email) to the latest
+# outcome and remembers how many bytes of the log it covers: opening the log
+# reads the saved index and only the lines appended since.
+#
+# The send scripts still write data/email-send-log.json (a JSON array);
+# import_legacy() copies over the entries of it the log does not have yet,
+# matched on (email, campaign, sentAt) against the log itself, so an import
+# run again, or from a fresh clone without the index, adds nothing twice.
+# Entries without a status predate status logging and were all sent.
+
+LOG_PATH = 'data/email-send-log.jsonl'
+LEGACY_PATH = 'data/email-send-log.json'
+
+INDEX_FORMAT = 1
+
+SENT = 'sent'
+
+
+def index_path(log_path):
+    return os.path.splitext(log_path)[0] + '.index.json'
+
+
+def email_key(email):
+    return (email or '').strip().lower()
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+# What identifies one send when comparing the legacy array with the log
+def send_key(entry):
+    return email_key(entry.get('email')), entry.get('campaign'), entry.get('sentAt')
+
+
+class SendLog:
+    def __init__(self, path=LOG_PATH):
+        self.path = path
+        # campaign -> email -> [status, sentAt, sends]
+        self.campaigns = {}
+        self.covered = 0
+        self.entries = 0
+
+    def _record(self, entry):
+        email = email_key(entry.get('email'))
+        campaign = entry.get('campaign')
+        if not email or not campaign:
+            return
+        sends = self.campaigns.setdefault(campaign, {})
+        previous = sends.get(email)
+        status = entry.get('status') or SENT
+        # A campaign's outcome for an address is its latest send; a failed
+        # retry never hides an earlier successful one
+        if previous and previous[0] == SENT and status != SENT:
+            previous[2] += 1
+        else:
+            sends[email] = [status, entry.get('sentAt'), previous[2] + 1 if previous else 1]
+        self.entries += 1
+
+    # Read the log from the covered offset on
+    def catch_up(self):
+        if not os.path.exists(self.path):
+            return 0
+        if os.path.getsize(self.path) < self.covered:
+            # Log replaced or truncated: start over
+            self.campaigns, self.covered, self.entries = {}, 0, 0
+        read = 0
+        with open(self.path, 'rb') as f:
+            f.seek(self.covered)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # a send still being written
+                if line.strip():
+                    self._record(json.loads(line))
+                    read += 1
+                self.covered += len(line)
+        return read
+
+    # Append sends; each is one line, written with a single write call
+    def append(self, *entries):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.catch_up()
+        with open(self.path, 'ab') as f:
+            for entry in entries:
+                entry = {**entry, 'email': email_key(entry['email'])}
+                entry.setdefault('sentAt', now_iso())
+                entry.setdefault('status', SENT)
+                line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+                f.write(line)
+                self._record(entry)
+                self.covered += len(line)
+
+    def status(self, email, campaign):
+        outcome = self.campaigns.get(campaign, {}).get(email_key(email))
+        return outcome[0] if outcome else None
+
+    def has_sent(self, email, campaign):
+        return self.status(email, campaign) == SENT
+
+    # Addresses a campaign was successfully sent to
+    def sent_emails(self, campaign):
+        return {email for email, outcome in self.campaigns.get(campaign, {}).items() if outcome[0] == SENT}
+
+    # How many times each send key occurs in the log, from a full read of it
+    def logged_keys(self):
+        keys = Counter()
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    if line.endswith(b'\n') and line.strip():
+                        keys[send_key(json.loads(line))] += 1
+        return keys
+
+    # Entries of the legacy JSON array missing from the log. Keys are
+    # counted, so a send the array holds twice is imported twice.
+    def pending_legacy(self, legacy_path=LEGACY_PATH):
+        if not os.path.exists(legacy_path):
+            return []
+        with open(legacy_path, 'r', encoding='utf-8') as f:
+            legacy = json.load(f)
+        logged = self.logged_keys()
+        pending = []
+        for entry in legacy:
+            key = send_key(entry)
+            if logged[key]:
+                logged[key] -= 1
+            else:
+                pending.append(entry)
+        return pending
+
+    # Copy the legacy entries the log does not have yet. sentAt is kept as
+    # logged (even when missing) so the entry matches itself next time.
+    def import_legacy(self, legacy_path=LEGACY_PATH):
+        pending = self.pending_legacy(legacy_path)
+        if pending:
+            self.append(*({**entry, 'sentAt': entry.get('sentAt')} for entry in pending))
+        return len(pending)
+
+    # Count sends in memory only, without writing them to the log (so the
+    # index must not be saved afterwards)
+    def merge(self, entries):
+        for entry in entries:
+            self._record(entry)
+
+    def save_index(self, path=None):
+        data = {
+            'format': INDEX_FORMAT,
+            'covered': self.covered,
+            'entries': self.entries,
+            'campaigns': self.campaigns,
+        }
+        write_atomic(path or index_path(self.path), json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+    # Saved index (if any) brought up to date with the log
+    @classmethod
+    def open(cls, path=LOG_PATH, index=None):
+        log = cls(path)
+        index = index or index_path(path)
+        if os.path.exists(index):
+            with open(index, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') == INDEX_FORMAT:
+                log.campaigns = data['campaigns']
+                log.covered = data['covered']
+                log.entries = data['entries']
+        log.catch_up()
+        return log
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain the append-only email send log')
+    parser.add_argument('--log', default=LOG_PATH)
+    parser.add_argument('--import-legacy', nargs='?', const=LEGACY_PATH, metavar='PATH',
+                        help=f'Copy new entries from the JSON array log (default: {LEGACY_PATH})')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    log = SendLog.open(args.log)
+    imported = log.import_legacy(args.import_legacy) if args.import_legacy else 0
+    log.save_index()
+    elapsed = time.perf_counter() - start
+
+    print("=" * 80)
+    print("EMAIL SEND LOG")
+    print("=" * 80)
+    print(f"Sends logged: {log.entries} ({imported} imported from {args.import_legacy})" if args.import_legacy
+          else f"Sends logged: {log.entries}")
+    for campaign, sends in sorted(log.campaigns.items()):
+        sent = sum(1 for outcome in sends.values() if outcome[0] == SENT)
+        print(f"  {campaign:<44} {sent:>5} sent, {len(sends) - sent} not delivered")
+    print(f"\n[OK] Index: {index_path(args.log)} ({elapsed * 1000:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from coverage_index import load_site_cities
+from provider_schema import STATE_NAMES
+
+# Seeded generator of realistic provider rows for benchmarking.
+#
+# Rows use the same 37-column schema as fully_enriched_providers_batch.csv /
+# cleaned_providers.csv. Missing-value rates follow the real enriched batch,
+# cities come from data/cities-full.ts, and a few percent of rows carry the
+# problems the cleaning rules exist for: Google Place IDs in the wrong
+# column, invalid emails, bios with a trailing asterisk or just a city name.
+
+PROVIDER_COLUMNS = [
+    'name', 'totalScore', 'reviewsCount', 'street', 'regions serviced', 'city', 'state', 'countryCode', 'website',
+    'phone', 'categoryName', 'url', 'is_mobile_phlebotomy', 'is_nationwide', 'verified_service_areas',
+    'validation_notes', 'logo', 'profileImage', 'businessImages', 'bio', 'foundedYear', 'teamSize', 'yearsExperience',
+    'zipCodes', 'serviceRadius', 'travelFee', 'googlePlaceId', 'testimonials', 'certifications', 'licenseNumber',
+    'insuranceAmount', 'specialties', 'emergencyAvailable', 'weekendAvailable', 'email', 'contactPerson', 'languages',
+]
+
+# Share of missing values per column, as measured on the enriched batch
+NULL_RATES = {
+    'totalScore': 0.19, 'reviewsCount': 0.01, 'street': 0.28, 'regions serviced': 0.91, 'city': 0.13,
+    'website': 0.16, 'phone': 0.03, 'categoryName': 0.04, 'url': 0.03, 'is_mobile_phlebotomy': 0.04,
+    'is_nationwide': 0.04, 'verified_service_areas': 0.04, 'validation_notes': 0.04, 'logo': 0.65,
+    'profileImage': 0.96, 'businessImages': 0.96, 'bio': 0.31, 'foundedYear': 0.97, 'teamSize': 0.99,
+    'yearsExperience': 0.89, 'zipCodes': 0.61, 'serviceRadius': 0.99, 'travelFee': 0.995, 'googlePlaceId': 0.04,
+    'testimonials': 1.0, 'certifications': 0.71, 'licenseNumber': 1.0, 'insuranceAmount': 0.95, 'specialties': 0.76,
+    'emergencyAvailable': 0.01, 'weekendAvailable': 0.01, 'email': 0.65, 'contactPerson': 0.99, 'languages': 0.01,
+}
+
+# Rates of the data problems the cleaning rules fix
+CONTAMINATION_RATES = {
+    'testimonials_place_id': 0.02,
+    'insurance_place_id': 0.02,
+    'invalid_email': 0.30,
+    'bio_asterisk': 0.03,
+    'bio_only_city': 0.02,
+}
+
+NAME_PREFIXES = ['Premier', 'Elite', 'Gentle', 'Rapid', 'Caring', 'Precision', 'Reliable', 'Golden', 'Angel', 'Swift',
+                 'Comfort', 'Healing', 'Stat', 'Sunrise', 'Liberty', 'Summit', 'Coastal', 'Metro', 'Family', 'Trusted']
+NAME_CORES = ['Mobile Phlebotomy', 'Lab Services', 'Blood Draw', 'Mobile Lab', 'Diagnostics', 'Phlebotomy Services',
+              'Health Labs', 'Specimen Collection', 'Wellness Draws', 'Testing Services']
+NAME_SUFFIXES = ['', '', '', ' LLC', ' Inc.', ' Co.', ' PLLC']
+STREET_NAMES = ['Main St', 'Oak Ave', 'Maple Dr', 'Park Blvd', 'Cedar Ln', 'Washington St', 'Lake Rd', 'Hill St',
+                'Pine Ave', 'Elm St', 'Broadway', 'Market St', 'Center Dr', 'Church Rd', 'Highland Ave']
+CATEGORIES = ['Blood testing service', 'Medical laboratory', 'Medical Center', 'Laboratory', 'Training center',
+              'Home health care service', 'Diagnostic center']
+CERTIFICATIONS = ['CERTIFIED', 'NHA', 'CERTIFIED,NHA', 'ASCP', 'CPT', 'NHA,CPT', 'AMT']
+SPECIALTIES = ['Corporate,Nursing Homes', 'Home Visits', 'Corporate,Pediatric', 'Pediatric', 'Geriatric',
+               'Home Visits,Corporate', 'Nursing Homes']
+LANGUAGES = ['English', 'English', 'English', 'English,Spanish', 'English,German', 'English,French']
+INVALID_EMAILS = ['info@', 'contact', 'N/A', 'nan', 'office@site', 'user@@example.com']
+BIO_SENTENCES = [
+    'We bring certified phlebotomists to your home or office.',
+    'Same-day appointments are available for most lab orders.',
+    'Our team partners with all major reference laboratories.',
+    'We specialize in pediatric and geriatric blood draws.',
+    'Specimens are delivered to the lab within hours of collection.',
+    'Corporate wellness screenings and drug testing are also offered.',
+]
+PLACE_ID_CHARS = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_-'))
+
+
+def _choice(rng, values, n):
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), n)]
+
+
+def _digits(rng, n, count, low=0):
+    return pd.Series(rng.integers(low * 10 ** (count - 1) if low else 0, 10 ** count, n)).astype(str).str.zfill(count)
+
+
+def _place_ids(rng, n):
+    tails = PLACE_ID_CHARS[rng.integers(0, len(PLACE_ID_CHARS), (n, 24))]
+    return pd.Series(['ChIJ' + ''.join(tail) for tail in tails])
+
+
+def _flags(rng, n, true_rate):
+    return pd.Series(np.where(rng.random(n) < true_rate, 'True', 'False'))
+
+
+# Generate `rows` provider rows as a DataFrame of strings (missing values are
+# None), the way they sit in the CSV
+def generate_providers(rows, seed=0, cities=None):
+    rng = np.random.default_rng(seed)
+    cities = cities or load_site_cities()
+    n = rows
+
+    city_pairs = np.array(cities, dtype=object)[rng.integers(0, len(cities), n)]
+    city = pd.Series(city_pairs[:, 0])
+    abbr = pd.Series(city_pairs[:, 1])
+    state = abbr.map(STATE_NAMES).fillna(abbr)
+
+    name = (pd.Series(_choice(rng, NAME_PREFIXES, n)) + ' ' + pd.Series(_choice(rng, NAME_CORES, n)) +
+            pd.Series(_choice(rng, NAME_SUFFIXES, n)))
+    # Some providers have several listings (same name in another city)
+    repeat = rng.random(n) < 0.05
+    name[repeat] = name.shift(1, fill_value=name[0])[repeat]
+    slug = name.str.lower().str.replace(r'[^a-z0-9]+', '', regex=True)
+
+    place_id = _place_ids(rng, n)
+    phone = '(' + _digits(rng, n, 3, low=2) + ') ' + _digits(rng, n, 3, low=2) + '-' + _digits(rng, n, 4)
+    statewide = rng.random(n) < 0.3
+    nationwide = rng.random(n) < 0.03
+
+    email = pd.Series(np.where(rng.random(n) < 0.5, 'info@', 'contact@'), dtype=object) + slug + '.com'
+    bad_email = rng.random(n) < CONTAMINATION_RATES['invalid_email']
+    email[bad_email] = _choice(rng, INVALID_EMAILS, int(bad_email.sum()))
+
+    sentence_count = rng.integers(1, 5, n)
+    sentences = np.array(BIO_SENTENCES, dtype=object)
+    bio = pd.Series([' '.join(sentences[rng.integers(0, len(sentences), k)]) for k in sentence_count])
+    bio = name + ' provides mobile phlebotomy in ' + city + '. ' + bio
+    bio_asterisk = rng.random(n) < CONTAMINATION_RATES['bio_asterisk']
+    bio[bio_asterisk] = bio[bio_asterisk] + '*'
+    bio_city = rng.random(n) < CONTAMINATION_RATES['bio_only_city']
+    bio[bio_city] = city[bio_city]
+
+    testimonials = pd.Series([None] * n, dtype=object)
+    contaminated = rng.random(n) < CONTAMINATION_RATES['testimonials_place_id']
+    testimonials[contaminated] = place_id[contaminated]
+    insurance = '$' + pd.Series(rng.integers(1, 100, n)).astype(str) + ' '
+    contaminated = rng.random(n) < CONTAMINATION_RATES['insurance_place_id']
+    insurance[contaminated] = place_id[contaminated]
+
+    df = pd.DataFrame({
+        'name': name,
+        'totalScore': pd.Series(np.round(rng.triangular(1.0, 5.0, 5.0, n) * 2) / 2).astype(str),
+        'reviewsCount': pd.Series(rng.geometric(0.02, n).astype(float)).astype(str),
+        'street': pd.Series(rng.integers(1, 9999, n)).astype(str) + ' ' + pd.Series(_choice(rng, STREET_NAMES, n)),
+        'regions serviced': city + ' area',
+        'city': city,
+        'state': state,
+        'countryCode': 'US',
+        'website': 'https://www.' + slug + '.com/',
+        'phone': phone,
+        'categoryName': pd.Series(_choice(rng, CATEGORIES, n)),
+        'url': 'https://www.google.com/maps/search/?api=1&query=' + name.str.replace(' ', '%20') +
+               '&query_place_id=' + place_id,
+        'is_mobile_phlebotomy': pd.Series(_choice(rng, ['Yes'] * 8 + ['No', 'Unknown'], n)),
+        'is_nationwide': pd.Series(np.where(nationwide, 'Yes', 'No')),
+        'verified_service_areas': pd.Series(np.where(nationwide, 'Nationwide',
+                                                     np.where(statewide, state + ' (statewide)',
+                                                              city + ', ' + abbr + ' and surrounding areas'))),
+        'validation_notes': 'Mobile phlebotomy service operating in ' + city + ', ' + state + '.',
+        'logo': 'https://www.' + slug + '.com/wp-content/uploads/logo.png',
+        'profileImage': 'https://static.wixstatic.com/media/' + slug + '.jpg',
+        'businessImages': 'https://static.wixstatic.com/media/' + slug + '-office.jpg',
+        'bio': bio,
+        'foundedYear': pd.Series(rng.integers(1990, 2025, n).astype(float)).astype(str),
+        'teamSize': pd.Series(rng.integers(1, 50, n).astype(float)).astype(str),
+        'yearsExperience': pd.Series(rng.integers(1, 40, n).astype(float)).astype(str),
+        'zipCodes': _digits(rng, n, 5, low=1),
+        'serviceRadius': pd.Series(_choice(rng, ['10.0', '25.0', '30.0', '50.0', '60.0'], n)),
+        'travelFee': '$16-60',
+        'googlePlaceId': place_id,
+        'testimonials': testimonials,
+        'certifications': pd.Series(_choice(rng, CERTIFICATIONS, n)),
+        'licenseNumber': None,
+        'insuranceAmount': insurance,
+        'specialties': pd.Series(_choice(rng, SPECIALTIES, n)),
+        'emergencyAvailable': _flags(rng, n, 0.3),
+        'weekendAvailable': _flags(rng, n, 0.6),
+        'email': email,
+        'contactPerson': pd.Series(_choice(rng, ['Becky Connors', 'Office Manager', 'Front Desk'], n)),
+        'languages': pd.Series(_choice(rng, LANGUAGES, n)),
+    }, columns=PROVIDER_COLUMNS).astype(object)
+
+    # Knock out values at the measured rates (the Google IDs planted above stay)
+    for col, rate in NULL_RATES.items():
+        missing = rng.random(n) < rate
+        if col in ('testimonials', 'insuranceAmount'):
+            missing &= ~df[col].astype(str).str.startswith('ChIJ')
+        df.loc[missing, col] = None
+    return df
+
+
+# Write `rows` synthetic providers to `path`, in blocks so a million rows
+# never sit in memory at once
+def write_providers(path, rows, seed=0, cities=None, block_size=100_000):
+    cities = cities or load_site_cities()
+    for block, start in enumerate(range(0, rows, block_size)):
+        df = generate_providers(min(block_size, rows - start), seed=[seed, block], cities=cities)
+        df.to_csv(path, mode='w' if block == 0 else 'a', header=block == 0, index=False, encoding='utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic provider CSV for benchmarking')
+    parser.add_argument('rows', type=int)
+    parser.add_argument('--output', default='synthetic_providers.csv')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    write_providers(args.output, args.rows, args.seed)
+    print(f"[OK] Wrote {args.rows} synthetic providers to '{args.output}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import asyncio
+import struct
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from check_image_urls import ImageCache, check_urls
+
+# End-to-end checks of the image URL checker against a local HTTP server:
+# an image, a missing file and a redirect to the image.
+
+
+def png(width, height):
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    pixels = zlib.compress((b'\x00' + b'\x00' * 3 * width) * height)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', pixels) + chunk(b'IEND', b'')
+
+
+LOGO = png(120, 80)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/logo.png':
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(LOGO)))
+            self.end_headers()
+            self.wfile.write(LOGO)
+        elif self.path == '/old-logo.png':
+            self.send_response(301)
+            self.send_header('Location', '/logo.png')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_check_urls(server):
+    urls = [f'{server}/logo.png', f'{server}/missing.png', f'{server}/old-logo.png']
+
+    results = asyncio.run(check_urls(urls, concurrency=2, per_host=1, timeout=5.0))
+
+    logo, missing, moved = (results[url] for url in urls)
+    assert (logo['status'], logo['width'], logo['height'], logo['problem']) == (200, 120, 80, None)
+    assert (missing['status'], missing['problem']) == (404, 'broken')
+    assert (moved['status'], moved['width'], moved['height']) == (200, 120, 80)
+    assert moved['finalUrl'] == f'{server}/logo.png'
+
+
+def test_cache_skips_fresh_results(server, tmp_path):
+    urls = [f'{server}/logo.png', f'{server}/missing.png']
+    cache = ImageCache(str(tmp_path / 'providers.image-cache.json'))
+    cache.update(asyncio.run(check_urls(urls[:1], timeout=5.0)))
+    cache.save()
+
+    cache = ImageCache(cache.path)
+    checked_at = cache.results[urls[0]]['checkedAt']
+    assert cache.stale(urls, ttl_hours=1) == urls[1:]
+    assert cache.stale(urls, ttl_hours=1, now=checked_at + 2 * 3600) == urls
@@ -0,0 +1,13 @@
+import numpy as np
+import pandas as pd
+
+from cleaning_rules import valid_email_mask
+
+# Regression tests for the cleaning rules shared by clean_and_export.py and
+# clean_csv.py: they must accept and reject what the original per-row checks
+# did.
+
+
+def test_valid_email_mask_matches_the_raw_value():
+    emails = pd.Series(['a@b.com', 'First.Last@Example.org', ' a@b.com', 'a@b.com ', 'a@b', 'nan', '', np.nan])
+    assert valid_email_mask(emails).tolist() == [True, True, False, False, False, False, False, False]
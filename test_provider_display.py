@@ -1,8 +1,13 @@
 import pandas as pd
 import json
 
-# Load the cleaned data
-df = pd.read_csv('cleaned_providers.csv')
+from provider_snapshot import load_providers
+
+# Load the cleaned data (only the columns displayed below)
+df = load_providers('cleaned_providers.csv', [
+    'name', 'city', 'state', 'phone', 'email', 'website', 'bio', 'languages', 'certifications',
+    'emergencyAvailable', 'weekendAvailable', 'regions serviced', 'testimonials', 'insuranceAmount', 'specialties'
+])
 
 print("=" * 80)
 print("SAMPLE PROVIDER DATA FROM CLEANED CSV")
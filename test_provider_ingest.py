@@ -0,0 +1,156 @@
+import csv
+
+import numpy as np
+import pandas as pd
+
+from provider_ingest import DEFAULT_PRECEDENCE, KeyIndex, ingest_batch, record_spans
+
+# Regression tests for the byte-offset splice in provider_ingest: after every
+# batch the master must parse to the expected rows, and the live index must
+# match one rebuilt from scratch (same spans, same keys).
+
+HEADER = ['name', 'googlePlaceId', 'phone', 'website', 'city', 'state', 'bio']
+
+MASTER_ROWS = [
+    ['Alpha Draws', 'place-a', '(555) 111-2222', 'https://alpha.example', 'Austin', 'TX', 'Short bio'],
+    ['Beta Lab', 'place-b', '', '', 'Dallas', 'TX', 'Visits homes,\n"offices" and more'],
+    ['Gamma Mobile', 'place-c', '555-333-4444', '', 'Houston', 'TX', ''],
+]
+
+
+def write_master(path, rows, trailing_newline=True):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f, lineterminator='\n').writerows([HEADER] + rows)
+    if not trailing_newline:
+        with open(path, 'rb+') as f:
+            f.truncate(f.seek(0, 2) - 1)
+
+
+def read_master(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return list(csv.reader(f))[1:]
+
+
+def batch_frame(rows):
+    return pd.DataFrame(rows, columns=HEADER, dtype=str)
+
+
+# Ingest `rows` and check the master and its index against a full rebuild
+def ingest(master, rows):
+    index = KeyIndex.build(master)
+    stats = ingest_batch(master, index, batch_frame(rows), DEFAULT_PRECEDENCE)
+    rebuilt = KeyIndex.build(master)
+    np.testing.assert_array_equal(index.offsets, rebuilt.offsets)
+    np.testing.assert_array_equal(index.lengths, rebuilt.lengths)
+    np.testing.assert_array_equal(index.key_hashes, rebuilt.key_hashes)
+    np.testing.assert_array_equal(index.key_rows, rebuilt.key_rows)
+    np.testing.assert_array_equal(index.shared_hashes, rebuilt.shared_hashes)
+    np.testing.assert_array_equal(index.shared_rows, rebuilt.shared_rows)
+    assert index.matches(master)
+    return stats
+
+
+def test_record_spans_skip_quoted_newlines():
+    data = b'a,b\n1,"x\ny"\n2,"say ""hi""\n"\n3,z'
+    starts, lengths = record_spans(data)
+    assert [data[s:s + n] for s, n in zip(starts, lengths)] == [
+        b'a,b\n', b'1,"x\ny"\n', b'2,"say ""hi""\n"\n', b'3,z']
+
+
+def test_update_in_place(tmp_path):
+    master = tmp_path / 'master.csv'
+    write_master(master, MASTER_ROWS)
+    # Longer than the stored row, and in the middle of the file
+    update = ['Beta Laboratory Services', 'place-b', '', 'https://beta.example', 'Dallas', 'TX', '']
+
+    stats = ingest(master, [update])
+
+    assert (stats['updated'], stats['inserted']) == (1, 0)
+    expected = [list(row) for row in MASTER_ROWS]
+    expected[1][0], expected[1][3] = update[0], update[3]
+    assert read_master(master) == expected
+
+
+def test_append(tmp_path):
+    master = tmp_path / 'master.csv'
+    write_master(master, MASTER_ROWS)
+    new = ['Delta Phlebotomy', 'place-d', '555-999-0000', '', 'El Paso', 'TX', 'New']
+
+    stats = ingest(master, [new])
+
+    assert (stats['updated'], stats['inserted']) == (0, 1)
+    assert read_master(master) == MASTER_ROWS + [new]
+
+
+def test_update_and_append_without_trailing_newline(tmp_path):
+    master = tmp_path / 'master.csv'
+    write_master(master, MASTER_ROWS, trailing_newline=False)
+    update = ['Gamma Mobile Draws', 'place-c', '', '', 'Houston', 'TX', '']
+    new = ['Delta Phlebotomy', 'place-d', '', '', 'El Paso', 'TX', '']
+
+    stats = ingest(master, [update, new])
+
+    assert (stats['updated'], stats['inserted']) == (1, 1)
+    assert read_master(master) == MASTER_ROWS[:2] + [['Gamma Mobile Draws'] + MASTER_ROWS[2][1:], new]
+
+
+def test_append_without_trailing_newline(tmp_path):
+    master = tmp_path / 'master.csv'
+    write_master(master, MASTER_ROWS, trailing_newline=False)
+    new = ['Delta Phlebotomy', 'place-d', '', '', 'El Paso', 'TX', '']
+
+    ingest(master, [new])
+
+    assert read_master(master) == MASTER_ROWS + [new]
+
+
+def test_rerun_is_a_no_op(tmp_path):
+    master = tmp_path / 'master.csv'
+    write_master(master, MASTER_ROWS)
+    index = KeyIndex.build(master)
+    batch = batch_frame([['Delta Phlebotomy', 'place-d', '', '', 'El Paso', 'TX', '']])
+    ingest_batch(master, index, batch, DEFAULT_PRECEDENCE)
+    before = master.read_bytes()
+
+    stats = ingest_batch(master, index, batch, DEFAULT_PRECEDENCE)
+
+    assert stats['seen'] == 1 and stats['inserted'] == 0
+    assert master.read_bytes() == before
+
+
+def test_update_replaces_old_keys(tmp_path):
+    master = tmp_path / 'master.csv'
+    write_master(master, MASTER_ROWS)
+    update = ['Alpha Draws', 'place-a', '(555) 777-8888', 'https://alpha-draws.example', 'Austin', 'TX', '']
+
+    stats = ingest(master, [update])
+
+    assert stats['updated'] == 1
+    assert read_master(master)[0][2:4] == update[2:4]
+
+
+def test_update_hands_a_shared_key_to_the_row_left(tmp_path):
+    master = tmp_path / 'master.csv'
+    rows = [list(row) for row in MASTER_ROWS]
+    rows[0][3] = rows[2][3] = 'https://chain.example'
+    write_master(master, rows)
+    update = ['Alpha Draws', 'place-a', '', 'https://alpha.example', 'Austin', 'TX', '']
+
+    ingest(master, [update])
+
+    assert KeyIndex.build(master).shared_hashes.size == 0
+
+
+def test_flag_spellings_are_not_changes(tmp_path):
+    master = tmp_path / 'master.csv'
+    header = HEADER + ['emergencyAvailable']
+    with open(master, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f, lineterminator='\n').writerows([header] + [row + ['True'] for row in MASTER_ROWS])
+    index = KeyIndex.build(master)
+    before = master.read_bytes()
+    batch = pd.DataFrame([MASTER_ROWS[0] + ['TRUE'], MASTER_ROWS[2] + ['true']], columns=header, dtype=str)
+
+    stats = ingest_batch(master, index, batch, DEFAULT_PRECEDENCE)
+
+    assert (stats['unchanged'], stats['updated']) == (2, 0)
+    assert master.read_bytes() == before
@@ -1,8 +1,13 @@
 import pandas as pd
 
-# Load the cleaned data
-cleaned_df = pd.read_csv('cleaned_providers.csv')
-flagged_df = pd.read_csv('flagged_providers.csv')
+from provider_snapshot import load_providers
+
+sample_cols = ['name', 'city', 'state', 'email', 'languages', 'bio',
+               'certifications', 'emergencyAvailable', 'weekendAvailable', 'regions serviced']
+
+# Load the cleaned data (only the columns verified below)
+cleaned_df = load_providers('cleaned_providers.csv', sample_cols + ['testimonials', 'insuranceAmount'])
+flagged_df = load_providers('flagged_providers.csv', ['name', 'phone', 'city', 'state'])
 
 print("=" * 80)
 print("VERIFICATION OF CLEANED DATA")
@@ -12,9 +17,6 @@ print("=" * 80)
 print("\nSAMPLE CLEANED RECORDS (First 3 with previously problematic fields):")
 print("-" * 80)
 
-sample_cols = ['name', 'city', 'state', 'email', 'languages', 'bio',
-               'certifications', 'emergencyAvailable', 'weekendAvailable', 'regions serviced']
-
 for i in range(min(3, len(cleaned_df))):
     print(f"\nRecord {i+1}:")
     for col in sample_cols:
@@ -0,0 +1,234 @@
+import argparse
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from provider_schema import state_codes
+from provider_snapshot import load_providers
+
+# "Providers near me" lookups by ZIP code, fully offline.
+#
+# ZIP centroids come from data/zip-centroids.csv (the US entries of the
+# zipcodes dataset the site uses), with lib/zip-overrides.ts filling in ZIPs
+# created after that data was cut. Providers are placed the way
+# lib/cityGeography.ts places them: the first ZIP on the record, else the
+# centroid of their city. Each provider lands in a grid of GRID_DEGREES cells,
+# so a query only measures distances to providers in the cells around it.
+
+ZIP_CENTROIDS_PATH = 'data/zip-centroids.csv'
+ZIP_OVERRIDES_PATH = 'lib/zip-overrides.ts'
+
+# Columns the provider index reads
+ZIP_INDEX_COLUMNS = ['name', 'city', 'state', 'zipCodes', 'serviceRadius']
+
+EARTH_RADIUS_MILES = 3959
+MILES_PER_DEGREE_LAT = 69.05
+
+# Same radius rules as lib/serviceRadius.ts
+DEFAULT_SERVICE_RADIUS_MILES = 50
+MAX_SERVICE_RADIUS_MILES = 150
+
+GRID_DEGREES = 0.5
+
+ZIP_PATTERN = r'(?<!\d)(\d{5})(?!\d)'
+OVERRIDE_PATTERN = re.compile(r"'(\d{5})':\s*\{\s*lat:\s*(-?[\d.]+),\s*lng:\s*(-?[\d.]+),\s*city:\s*'([^']*)',\s*state:\s*'([A-Z]{2})'")
+
+
+# Read the overrides table from lib/zip-overrides.ts as centroid rows
+def load_zip_overrides(path=ZIP_OVERRIDES_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = OVERRIDE_PATTERN.findall(f.read())
+    return pd.DataFrame(entries, columns=['zip', 'lat', 'lng', 'city', 'state']).astype({'lat': float, 'lng': float})
+
+
+# ZIP -> centroid table. The bundled data wins over the overrides, like
+# getZipCoordinates() in lib/zip-geocode.ts.
+def load_zip_centroids(path=ZIP_CENTROIDS_PATH, overrides_path=ZIP_OVERRIDES_PATH):
+    centroids = pd.read_csv(path, dtype={'zip': str, 'city': str, 'state': str})
+    overrides = load_zip_overrides(overrides_path)
+    overrides = overrides[~overrides['zip'].isin(centroids['zip'])]
+    return pd.concat([centroids, overrides], ignore_index=True)
+
+
+# First five-digit ZIP of each free-text zipCodes value ('' when none)
+def first_zips(values):
+    return values.fillna('').astype(str).str.extract(ZIP_PATTERN)[0].fillna('')
+
+
+# Great-circle distance in miles; any argument may be an array
+def haversine_miles(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = (np.radians(value) for value in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+# Grid row and column ranges covering `miles` around each point; works on
+# scalars and arrays alike
+def cell_ranges(lat, lng, miles):
+    lat_span = miles / MILES_PER_DEGREE_LAT
+    lng_span = lat_span / np.maximum(np.cos(np.radians(np.minimum(np.abs(lat) + lat_span, 89.0))), 0.01)
+    rows = np.floor((lat - lat_span) / GRID_DEGREES), np.floor((lat + lat_span) / GRID_DEGREES)
+    cols = np.floor((lng - lng_span) / GRID_DEGREES), np.floor((lng + lng_span) / GRID_DEGREES)
+    return rows, cols
+
+
+# Grid cells within `miles` of (lat, lng), as (row, col) pairs
+def cells_around(lat, lng, miles):
+    (row0, row1), (col0, col1) = cell_ranges(lat, lng, miles)
+    return [(row, col) for row in range(int(row0), int(row1) + 1) for col in range(int(col0), int(col1) + 1)]
+
+
+def cell_of(lat, lng):
+    return int(np.floor(lat / GRID_DEGREES)), int(np.floor(lng / GRID_DEGREES))
+
+
+# {(row, col): positions} for points at the given grid rows and columns
+def group_cells(positions, rows, cols):
+    groups = pd.Series(positions).groupby([rows.astype(np.int64), cols.astype(np.int64)]).indices
+    return {(int(row), int(col)): positions[indices] for (row, col), indices in groups.items()}
+
+
+class ZipIndex:
+    def __init__(self, df, centroids=None):
+        if centroids is None:
+            centroids = load_zip_centroids()
+        self.zips = {zip_code: (lat, lng) for zip_code, lat, lng
+                     in zip(centroids['zip'], centroids['lat'], centroids['lng'])}
+
+        # City centroid: the first ZIP listed for the city, as lib/cityGeography.ts does
+        first_city_zip = centroids.assign(key=centroids['city'].str.lower() + '|' + centroids['state'])
+        first_city_zip = first_city_zip.drop_duplicates('key').set_index('key')
+
+        self.labels = df.index.to_numpy()
+        zips = first_zips(df['zipCodes']) if 'zipCodes' in df else pd.Series('', index=df.index)
+        city_keys = df['city'].fillna('').astype(str).str.strip().str.lower() + '|' + state_codes(df['state']).astype(object).fillna('')
+        zip_table = centroids.drop_duplicates('zip').set_index('zip')
+
+        lat = zips.map(zip_table['lat']).fillna(city_keys.map(first_city_zip['lat']))
+        lng = zips.map(zip_table['lng']).fillna(city_keys.map(first_city_zip['lng']))
+        radius = (pd.to_numeric(df['serviceRadius'], errors='coerce') if 'serviceRadius' in df
+                  else pd.Series(np.nan, index=df.index))
+        radius = radius.where(radius >= 1).fillna(DEFAULT_SERVICE_RADIUS_MILES).clip(upper=MAX_SERVICE_RADIUS_MILES)
+
+        # Providers that cannot be placed are left out rather than guessed at
+        self.located = lat.notna().to_numpy()
+        self.lat = lat.to_numpy(dtype=float)
+        self.lng = lng.to_numpy(dtype=float)
+        self.radius = radius.to_numpy(dtype=float)
+
+        # Two grids: providers by their own cell, and by every cell their
+        # declared radius reaches
+        positions = np.flatnonzero(self.located)
+        lat, lng, radius = self.lat[positions], self.lng[positions], self.radius[positions]
+        self.by_cell = group_cells(positions, np.floor(lat / GRID_DEGREES), np.floor(lng / GRID_DEGREES))
+
+        (row0, row1), (col0, col1) = cell_ranges(lat, lng, radius)
+        widths = (col1 - col0 + 1).astype(np.int64)
+        counts = (row1 - row0 + 1).astype(np.int64) * widths
+        owner = np.repeat(np.arange(len(positions)), counts)
+        offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        self.by_reach = group_cells(positions[owner], row0[owner] + offset // widths[owner],
+                                    col0[owner] + offset % widths[owner])
+
+    def locate(self, zip_code):
+        return self.zips.get(str(zip_code).strip()[:5])
+
+    def _nearby(self, lat, lng, miles):
+        cells = [self.by_cell[cell] for cell in cells_around(lat, lng, miles) if cell in self.by_cell]
+        if not cells:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(cells) if len(cells) > 1 else cells[0]
+
+    # Providers located within `miles` of the ZIP, nearest first, as
+    # (row labels, distances). Unknown ZIPs match nothing.
+    def providers_within(self, zip_code, miles):
+        point = self.locate(zip_code)
+        if point is None:
+            return self.labels[:0], np.zeros(0)
+        candidates = self._nearby(point[0], point[1], miles)
+        distances = haversine_miles(point[0], point[1], self.lat[candidates], self.lng[candidates])
+        keep = distances <= miles
+        order = np.argsort(distances[keep], kind='stable')
+        return self.labels[candidates[keep][order]], distances[keep][order]
+
+    # Providers whose declared service radius reaches the ZIP, nearest first
+    def providers_covering(self, zip_code):
+        point = self.locate(zip_code)
+        if point is None:
+            return self.labels[:0], np.zeros(0)
+        candidates = self.by_reach.get(cell_of(*point), np.zeros(0, dtype=np.int64))
+        distances = haversine_miles(point[0], point[1], self.lat[candidates], self.lng[candidates])
+        keep = distances <= self.radius[candidates]
+        order = np.argsort(distances[keep], kind='stable')
+        return self.labels[candidates[keep][order]], distances[keep][order]
+
+    # Batch versions: {zip: (row labels, distances)}. ZIPs in the same grid
+    # cell share one candidate set and one vectorized distance matrix.
+    def providers_within_many(self, zip_codes, miles):
+        return self._batch(zip_codes, lambda lat, lng: self._nearby(lat, lng, miles), lambda candidates: miles)
+
+    def providers_covering_many(self, zip_codes):
+        return self._batch(zip_codes, lambda lat, lng: self.by_reach.get(cell_of(lat, lng), np.zeros(0, dtype=np.int64)),
+                           lambda candidates: self.radius[candidates])
+
+    def _batch(self, zip_codes, candidates_for, limit_for):
+        results = {}
+        groups = {}
+        for zip_code in dict.fromkeys(zip_codes):
+            point = self.locate(zip_code)
+            if point is None:
+                results[zip_code] = (self.labels[:0], np.zeros(0))
+            else:
+                groups.setdefault(cell_of(*point), []).append((zip_code, point))
+
+        for members in groups.values():
+            candidates = [candidates_for(*point) for _, point in members]
+            candidates = candidates[0] if len(candidates) == 1 else np.unique(np.concatenate(candidates))
+            points = np.array([point for _, point in members])
+            distances = haversine_miles(points[:, :1], points[:, 1:], self.lat[candidates], self.lng[candidates])
+            within = distances <= limit_for(candidates)
+            for (zip_code, _), row_distances, keep in zip(members, distances, within):
+                order = np.argsort(row_distances[keep], kind='stable')
+                results[zip_code] = (self.labels[candidates[keep][order]], row_distances[keep][order])
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find providers near a ZIP code')
+    parser.add_argument('zips', nargs='+', help='ZIP codes to look up')
+    parser.add_argument('--input', default='cleaned_providers.csv')
+    parser.add_argument('--miles', type=float,
+                        help='Search radius; without it, list providers whose service radius covers the ZIP')
+    args = parser.parse_args()
+
+    df = load_providers(args.input, ZIP_INDEX_COLUMNS)
+    centroids = load_zip_centroids()
+    start = time.perf_counter()
+    index = ZipIndex(df, centroids)
+    build_time = time.perf_counter() - start
+    print(f"Indexed {int(index.located.sum())} of {len(df)} providers in {build_time * 1000:.1f}ms")
+
+    start = time.perf_counter()
+    if args.miles is None:
+        results = index.providers_covering_many(args.zips)
+    else:
+        results = index.providers_within_many(args.zips, args.miles)
+    lookup_time = time.perf_counter() - start
+    print(f"Answered {len(args.zips)} lookups in {lookup_time * 1e6:.0f}us")
+
+    for zip_code in args.zips:
+        labels, distances = results[zip_code]
+        point = index.locate(zip_code)
+        if point is None:
+            print(f"\n{zip_code}: unknown ZIP")
+            continue
+        print(f"\n{zip_code}: {len(labels)} providers")
+        for label, distance in zip(labels[:10], distances[:10]):
+            row = df.loc[label]
+            print(f"  {distance:6.1f} mi  {row['name']} ({row['city']}, {row['state']})")
+
+
+if __name__ == '__main__':
+    main()